@@ -1,6 +1,10 @@
 import streamlit as st
 from PIL import Image
 import os
+from src.llm_chat_engine import warm_up
+
+# Build the chat engine in the background while the user looks around
+warm_up()
 
 st.set_page_config(page_title="DeepPlayr", layout="centered")
 
@@ -1,5 +1,11 @@
+import time
 import streamlit as st
-from src.llm_chat_engine import get_llm_chain
+from src.llm_chat_engine import init_timings, record_response, response_stats, MODEL, PROMPT_VERSION
+from src.chat_server import get_chat_server, Overloaded
+from src.answer_cache import get_answer_cache, database_version
+from src.repository import get_repository
+from src.intent_router import route
+from src.query_guard import guard_stats, QueryRejected, QueryTimeout
 
 st.set_page_config(page_title="DeepPlayr AI Chat", layout="wide")
 st.title("⚽ DeepPlayr AI Chat Interface")
@@ -7,20 +13,72 @@ st.title("⚽ DeepPlayr AI Chat Interface")
 user_question = st.text_input("Ask AI ได้เลย:")
 
 if user_question:
-    with st.spinner("Processing..."):
-        try:
-            chain = get_llm_chain()
-            result = chain(user_question)
+    start = time.perf_counter()
+    try:
+        # common question shapes -> prepared query, no LLM call
+        routed = route(user_question)
+        cached = None
 
-            # get SQL from LLM build (maybe not appear)
-            sql_query = result["intermediate_steps"][0] if "intermediate_steps" in result else "Can't Create SQL"
-            final_answer = result["result"]
+        if routed:
+            sql_query, final_answer = routed["sql"], routed["result"]
+        else:
+            # same question, model, prompt and database -> answer from the cache
+            cache = get_answer_cache()
+            cache_key = cache.key(user_question, MODEL, PROMPT_VERSION, database_version(get_repository().path))
+            cached = cache.get(cache_key)
+            if cached:
+                sql_query, final_answer = cached
 
+        if routed or cached:
             st.subheader("🧠 SQL from AI:")
             st.code(sql_query, language="sql")
 
             st.subheader("✅ Answer:")
             st.success(final_answer)
+            st.caption(f"⚡ Answered without the LLM ({routed['intent']})" if routed else "⚡ Answered from cache")
+            elapsed = time.perf_counter() - start
+            record_response("router" if routed else "cache", elapsed, elapsed, elapsed)
+        else:
+            # show the SQL as soon as it is generated, then stream the answer while it is written
+            # (bounded / coalesced with the other sessions by the chat server)
+            with st.spinner("Writing SQL..."):
+                events = get_chat_server().ask_stream(user_question)
+                _, sql_query = next(events)
+            st.subheader("🧠 SQL from AI:")
+            st.code(sql_query, language="sql")
+            first_output = time.perf_counter() - start
+
+            first_token = []
+            def answer_tokens():
+                for _, text in events:
+                    if not first_token:
+                        first_token.append(time.perf_counter() - start)
+                    yield text
+
+            st.subheader("✅ Answer:")
+            final_answer = st.write_stream(answer_tokens())
+            cache.put(cache_key, user_question, sql_query, final_answer)
+            total = time.perf_counter() - start
+            record_response("llm", first_output, first_token[0] if first_token else total, total)
+
+    except (QueryRejected, QueryTimeout, Overloaded) as e:
+        st.warning(f"⛔ {e}")
+    except Exception as e:
+        st.error(f"An Error: {e}")
+
+with st.expander("⏱️ Response times"):
+    st.json(response_stats())
+
+with st.expander("📈 Chat server"):
+    server = get_chat_server()
+    st.json(server.stats())
+    st.download_button("Prometheus metrics", server.metrics_text(), file_name="chat_metrics.prom")
+
+with st.expander("⏱️ Chat engine start-up"):
+    st.json({phase: round(seconds, 3) for phase, seconds in init_timings().items()})
+
+with st.expander("🗄️ Answer cache"):
+    st.json(get_answer_cache().stats())
 
-        except Exception as e:
-            st.error(f"An Error: {e}")
+with st.expander("🛡️ Query guard"):
+    st.json(guard_stats())
@@ -1,11 +1,13 @@
 # player_bio.py
+import html
 import streamlit as st
-import sqlite3
 import pandas as pd
-import os
 from datetime import datetime
-import gdown
-import platform
+from src.repository import get_repository
+from src.player_search import build_player_index
+from src.player_data import prefetch_player
+from src.player_thumbnails import thumbnail_file, STATIC_URL
+from settings import player_thumbnails_path
 
 # https://drive.google.com/file/d/1Kpv8ySZh-0SHgmSftHbtdgxji8KQEpRz/view?usp=sharing
 # --------------------------------------------------
@@ -31,25 +33,6 @@ st.markdown(
 # 2) LOAD DATA
 # --------------------------------------------------
 
-def download_db_path():
-    if platform.system() == "Windows":
-        return "D:/Data Project/exercise/Football/database/clean_football.db"
-    else:
-        # สำหรับ Streamlit Cloud หรือ Linux
-        db_path = "/tmp/clean_football.db"
-        if not os.path.exists(db_path):
-            file_id = "1Kpv8ySZh-0SHgmSftHbtdgxji8KQEpRz"
-            url = f"https://drive.google.com/uc?id={file_id}"
-            gdown.download(url, db_path, quiet=False)
-        return db_path
-
-@st.cache_resource
-def get_db_path():
-    return download_db_path()
-
-# DB_PATH = r"D:\Data Project\exercise\Football\database\clean_football.db"
-DB_PATH = get_db_path()
-
 # from sqlalchemy import create_engine
 #
 # @st.cache_data
@@ -62,27 +45,24 @@ DB_PATH = get_db_path()
 
 @st.cache_data(show_spinner=False)
 def load_players():
-    with sqlite3.connect(DB_PATH) as conn:
-        sql = """
-            SELECT  player_id,
-                    name,
-                    first_name,
-                    last_name,
-                    country_of_birth,
-                    country_of_citizenship,
-                    date_of_birth,
-                    position,
-                    sub_position,
-                    foot,
-                    height_in_cm,
-                    current_club_name,
-                    market_value_in_eur
-            FROM players
-        """
-        df = pd.read_sql(sql, conn)
-    return df.drop_duplicates("player_id")
+    columns = [
+        "player_id", "name", "first_name", "last_name", "country_of_birth", "country_of_citizenship",
+        "date_of_birth", "position", "sub_position", "foot", "height_in_cm", "current_club_name",
+        "market_value_in_eur",
+    ]
+    df = get_repository().players(columns)
+    # text on SQLite, DATE on the columnar backends
+    dob = pd.to_datetime(df["date_of_birth"], errors="coerce")
+    df["date_of_birth"] = dob.dt.strftime("%Y-%m-%d").where(dob.notna(), None)
+    return df.drop_duplicates("player_id").reset_index(drop=True)
+
+# accent-insensitive, typo-tolerant name index, ranked by market value
+@st.cache_resource(show_spinner=False)
+def load_player_index():
+    return build_player_index(load_players())
 
 df_players = load_players()
+player_index = load_player_index()
 
 # --------------------------------------------------
 # 3) SEARCH BOX + AUTOCOMPLETE (show max 10)
@@ -91,20 +71,29 @@ st.title("DeepPlayr Bio")
 
 search = st.text_input("Enter player name", placeholder="e.g.Lewandowski")
 
-suggested_name = None
+selected_id = None
 if search:
-    filtered = df_players[df_players["name"].str.contains(search, case=False, na=False)]
-    suggested_name = st.selectbox(
+    filtered = df_players.iloc[player_index.search(search, k=5)]
+    # options are player_ids: namesakes stay separate choices, told apart by birth date and club
+    labels = {
+        int(row.player_id): f"{row.name} ({row.date_of_birth or '?'}, {row.current_club_name or '-'})"
+        for row in filtered.itertuples(index=False)
+    }
+    selected_id = st.selectbox(
         "Did you mean :",
-        filtered["name"].head(5).tolist(),
-        index=0 if not filtered.empty else None,
+        list(labels),
+        format_func=labels.get,
+        index=0 if labels else None,
     )
 
 # --------------------------------------------------
 # 4) SHOW PLAYER BIO
 # --------------------------------------------------
-if suggested_name:
-    p = df_players.query("name == @suggested_name").iloc[0]
+if selected_id is not None:
+    p = df_players.loc[df_players["player_id"] == selected_id].iloc[0]
+    player_id = int(p["player_id"])
+    # warm the Stat / Transfer payloads while the bio is read
+    prefetch_player(player_id)
 
     st.markdown("___")  # เส้นคั่นยาวเต็มหน้ากว้าง
 
@@ -112,18 +101,31 @@ if suggested_name:
     spacer_l, left, right, spacer_r = st.columns([1, 2, 5, 1])
 
     with left:
-        # mock
-        st.markdown(
-            f"""
-            <div style='width:180px;height:240px;background:#cfcfcf;
-                        display:flex;align-items:center;justify-content:center;
-                        font-weight:bold;color:#333;border-radius:6px;
-                        border:1px solid #999;margin-bottom:0.75rem;'>
-                {p['name']}
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+        thumbnail = thumbnail_file(player_id)
+        if thumbnail and st.get_option("server.enableStaticServing"):
+            # content-addressed static file: a new picture gets a new URL. Streamlit sends no
+            # Cache-Control, long-lived browser caching needs the reverse proxy rule of the README
+            st.markdown(
+                f"""
+                <img src='{STATIC_URL}/{thumbnail}' alt='{html.escape(p['name'])}' width='180' height='240'
+                     style='object-fit:cover;border-radius:6px;border:1px solid #999;margin-bottom:0.75rem;'>
+                """,
+                unsafe_allow_html=True,
+            )
+        elif thumbnail:
+            st.image(str(player_thumbnails_path / thumbnail), width=180)
+        else:
+            st.markdown(
+                f"""
+                <div style='width:180px;height:240px;background:#cfcfcf;
+                            display:flex;align-items:center;justify-content:center;
+                            font-weight:bold;color:#333;border-radius:6px;
+                            border:1px solid #999;margin-bottom:0.75rem;'>
+                    {html.escape(p['name'])}
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
 
     with right:
         dob = (
@@ -158,10 +160,12 @@ if suggested_name:
 
     with col_stat:
         if st.button("Stat", use_container_width=True):
+            st.session_state["player_id"] = player_id
             st.session_state["player_name"] = p["name"]
             st.switch_page("pages/player_stat.py")
 
     with col_tx:
         if st.button("Transfer History", use_container_width=True):
+            st.session_state["player_id"] = player_id
             st.session_state["player_name"] = p["name"]
             st.switch_page("pages/player_transfer.py")
@@ -1,9 +1,11 @@
+import time
+import functools
 import streamlit as st
-import sqlite3
 import pandas as pd
 import plotly.graph_objects as go
 import duckdb
-from settings import get_db_path
+from src.player_data import load_season_stats, load_season_positions, load_appearances
+from src.query_guard import run_duckdb, limit_duckdb_memory, QueryRejected, QueryTimeout
 
 # --------------------------------------------------
 # 1) PAGE HEADER
@@ -11,238 +13,277 @@ from settings import get_db_path
 st.title("📊 Player Stat")
 
 # --------------------------------------------------
-# 2) GET PLAYER NAME FROM SESSION
+# 2) GET PLAYER FROM SESSION
 # --------------------------------------------------
+player_id = st.session_state.get("player_id")
 player_name = st.session_state.get("player_name")
-if not player_name:
+if player_id is None:
     st.warning("Please select a player from the Bio page first.")
     st.stop()
 
 # --------------------------------------------------
 # 3) DB + LOADERS
 # --------------------------------------------------
-DB_PATH = get_db_path()
-
-@st.cache_data
-def load_appearances(name):
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql("SELECT * FROM appearances WHERE player_name = ?", conn, params=(name,))
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    return df
-
-@st.cache_data
-def load_positions(name):
-    with sqlite3.connect(DB_PATH) as conn:
-        q = """
-        SELECT gl.position, gl.date, gl.club_id
-        FROM appearances ap
-        JOIN game_lineups gl
-          ON ap.game_id = gl.game_id AND ap.player_id = gl.player_id
-        WHERE ap.player_name = ?
-        """
-        df = pd.read_sql(q, conn, params=(name,))
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    return df
-
-@st.cache_data
-def load_club_map():
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql("SELECT club_id, name FROM clubs", conn)
-    return dict(zip(df["club_id"], df["name"]))
+# Per season / club totals and position counts are materialized by clean_data.py.
+# The loaders in src/player_data.py are keyed on player_id and prefetched by the Bio page.
+# Everything below them is memoized on the filter selection (player_id, club ids, first and
+# last season), and each section is a fragment: the chart-mode radio redraws one chart, the
+# SQL explorer reruns only itself, and a filter change reruns the page from cached results.
+
+def timed_fragment(name):
+    # st.fragment that logs how long each of its runs takes
+    def decorate(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                print(f"⏱️ player_stat {name}: {(time.perf_counter() - start) * 1000:.1f} ms")
+        return st.fragment(run)
+    return decorate
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def filtered_stats(player_id, club_ids, start_year, end_year):
+    df_season = load_season_stats(player_id)
+    mask = df_season["player_club_id"].isin(club_ids) & df_season["season_start"].between(start_year, end_year)
+    return df_season.loc[mask]
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def filtered_positions(player_id, club_ids, start_year, end_year):
+    df_pos = load_season_positions(player_id)
+    mask = df_pos["club_id"].isin(club_ids) & df_pos["season_start"].between(start_year, end_year)
+    return df_pos.loc[mask]
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def filtered_appearances(player_id, club_ids, start_year, end_year):
+    df_raw = load_appearances(player_id)
+    in_range = df_raw["date"].between(f"{start_year}-07-01", f"{end_year + 1}-06-30")
+    return df_raw.loc[df_raw["player_club_id"].isin(club_ids) & in_range]
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def overview_totals(player_id, club_ids, start_year, end_year):
+    df_filt = filtered_stats(player_id, club_ids, start_year, end_year)
+    return {col: int(df_filt[col].sum())
+            for col in ("matches", "goals", "assists", "yellow_cards", "red_cards", "minutes_played")}
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def season_figures(player_id, club_ids, start_year, end_year, mode):
+    df_filt = filtered_stats(player_id, club_ids, start_year, end_year)
+
+    # ---------- COMMON PREP: season, team rows are already aggregated ----------
+    season_team_summary = df_filt[["season", "player_club_id", "goals", "assists"]].assign(
+        team_name=df_filt["club_name"]
+    )
+
+    # ---------- MODE 1 : Single line with team label ----------
+    if mode.startswith("Single"):
+
+        # Aggregate per season (sum across teams)
+        summary_single = (
+            season_team_summary
+              .groupby("season", as_index=False)[["goals", "assists"]]
+              .sum()
+        )
+
+        # Create label: 2021/22 (Chelsea, Inter)
+        team_per_season = (
+            season_team_summary.groupby("season")["team_name"]
+            .apply(lambda x: ", ".join(sorted(set(x))))
+            .reset_index()
+        )
+        summary_single = summary_single.merge(team_per_season, on="season")
+        summary_single["season_label"] = summary_single["season"] + " (" + summary_single["team_name"] + ")"
+
+        fig = go.Figure()
+        fig.add_trace(
+            go.Scatter(
+                x=summary_single["season_label"], y=summary_single["goals"],
+                mode="lines+markers", name="Goals"
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=summary_single["season_label"], y=summary_single["assists"],
+                mode="lines+markers", name="Assists"
+            )
+        )
+        fig.update_layout(
+            title="Goals & Assists per Season",
+            xaxis_title="Season (Team)",
+            yaxis_title="Count",
+            template="plotly_dark"
+        )
+        return [fig]
+
+    # ---------- MODE 2 : Multi‑line per team ----------
+    figures = []
+    for value, title in (("goals", "Goals"), ("assists", "Assists")):
+        # Pivot so each team is its own column
+        pivot = season_team_summary.pivot(index="season", columns="team_name", values=value).fillna(0)
+        fig = go.Figure()
+        for team in pivot.columns:
+            fig.add_trace(go.Scatter(
+                x=pivot.index, y=pivot[team],
+                mode="lines+markers", name=team
+            ))
+        fig.update_layout(
+            title=f"{title} per Season (by Team)",
+            xaxis_title="Season",
+            yaxis_title=title,
+            template="plotly_dark"
+        )
+        figures.append(fig)
+    return figures
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def position_figure(player_id, club_ids, start_year, end_year):
+    df_pos_filt = filtered_positions(player_id, club_ids, start_year, end_year)
+    if df_pos_filt.empty:
+        return None
+    pos_counts = df_pos_filt.groupby("position")["matches"].sum().sort_values(ascending=False)
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=pos_counts.index,
+        values=pos_counts.values,
+        hole=0.4,
+        textinfo="label+percent",
+        pull=[0.03]*len(pos_counts)
+    )])
+    fig_pie.update_layout(title="Most Frequent Positions Played", template="plotly_dark")
+    return fig_pie
+
+@st.cache_resource(show_spinner=False)
+def explorer_database():
+    # one in-process DuckDB per server; every explorer run gets its own cursor with the
+    # frames registered on it. Only those frames: no files, URLs or extensions, and the
+    # guard's memory cap for the database as a whole
+    con = duckdb.connect()
+    con.execute("SET enable_external_access = false")
+    return limit_duckdb_memory(con)
 
 # --------------------------------------------------
 # 4) LOAD DATA
 # --------------------------------------------------
-df_appear = load_appearances(player_name)
-df_pos    = load_positions(player_name)
-id2name   = load_club_map()
+df_season = load_season_stats(player_id)
 
-if df_appear.empty:
+if df_season.empty:
     st.info("No data for this player.")
     st.stop()
 
 # --------------------------------------------------
 # 5) FILTERS
 # --------------------------------------------------
-unique_ids = df_appear["player_club_id"].fillna(-1).astype(int).unique()
-unique_names = [id2name.get(cid, f"Club {cid}") for cid in unique_ids]
+@timed_fragment("filters")
+def filters_section(player_id, df_season):
+    club_names = df_season.drop_duplicates("player_club_id").set_index("player_club_id")["club_name"]
+    unique_names = club_names.tolist()
 
-sel_names = st.multiselect("🧑‍🤝‍🧑 Select team(s)", unique_names, default=unique_names)
-sel_ids   = [k for k, v in id2name.items() if v in sel_names]
+    sel_names = st.multiselect("🧑‍🤝‍🧑 Select team(s)", unique_names, default=unique_names)
+    sel_ids   = club_names[club_names.isin(sel_names)].index.tolist()
 
-min_dt, max_dt = df_appear["date"].min().date(), df_appear["date"].max().date()
-start_dt, end_dt = st.date_input("📆 Select date range", (min_dt, max_dt),
-                                 min_value=min_dt, max_value=max_dt)
+    seasons = df_season.drop_duplicates("season_start").set_index("season_start")["season"]
+    start_season, end_season = st.select_slider(
+        "📆 Select season range", options=seasons.tolist(), value=(seasons.iloc[0], seasons.iloc[-1])
+    )
+    start_year = seasons.index[seasons.tolist().index(start_season)]
+    end_year = seasons.index[seasons.tolist().index(end_season)]
 
-mask_app = df_appear["player_club_id"].astype(int).isin(sel_ids) & df_appear["date"].dt.date.between(start_dt, end_dt)
-df_filt = df_appear.loc[mask_app].copy()
+    selection = (player_id, tuple(sorted(int(i) for i in sel_ids)), int(start_year), int(end_year))
+    previous = st.session_state.get("stat_filters")
+    st.session_state["stat_filters"] = selection
+    # the other sections read the selection: a change made in this fragment reruns the page
+    if previous is not None and previous[0] == player_id and previous != selection:
+        st.rerun()
 
-mask_pos = df_pos["club_id"].astype(int).isin(sel_ids) & df_pos["date"].dt.date.between(start_dt, end_dt)
-df_pos_filt = df_pos.loc[mask_pos]
+filters_section(player_id, df_season)
+selection = st.session_state["stat_filters"]
 
-if df_filt.empty:
+if filtered_stats(*selection).empty:
     st.info("No appearances in selected filters.")
     st.stop()
 
-# --------------------------------------------------
-# 6) SEASON COLUMN
-# --------------------------------------------------
-def to_season(ts):
-    y = ts.year
-    return f"{y}/{str(y+1)[-2:]}" if ts.month >= 7 else f"{y-1}/{str(y)[-2:]}"
-df_filt["season"] = df_filt["date"].apply(to_season)
-df_pos_filt["season"] = df_pos_filt["date"].apply(to_season)
-
 # --------------------------------------------------
 # 7) OVERALL STAT
 # --------------------------------------------------
-st.subheader(f"Stat overview · {player_name}")
-st.markdown(
-    f"""
-**Matches Played:** {len(df_filt)}  
-**Goals:** {df_filt['goals'].sum()}  
-**Assists:** {df_filt['assists'].sum()}  
-**Yellow Cards:** {df_filt['yellow_cards'].sum()}  
-**Red Cards:** {df_filt['red_cards'].sum()}  
-**Minutes per Goal:** {f"{df_filt['minutes_played'].sum() / df_filt['goals'].sum():.1f} min/goal" if df_filt['goals'].sum() else "—"}  
+@timed_fragment("overview")
+def overview_section(selection):
+    totals = overview_totals(*selection)
+    st.subheader(f"Stat overview · {player_name}")
+    st.markdown(
+        f"""
+**Matches Played:** {totals['matches']}  
+**Goals:** {totals['goals']}  
+**Assists:** {totals['assists']}  
+**Yellow Cards:** {totals['yellow_cards']}  
+**Red Cards:** {totals['red_cards']}  
+**Minutes per Goal:** {f"{totals['minutes_played'] / totals['goals']:.1f} min/goal" if totals['goals'] else "—"}  
 """
-)
+    )
+
+overview_section(selection)
 
 # --------------------------------------------------
 # 9) GOALS & ASSISTS PER SEASON  – TWO MODES
 # --------------------------------------------------
-
-st.subheader("Goals & Assists per Season")
-
-chart_mode = st.radio(
-    "Visualisation mode",
-    ["Single line (with team label)", "Compare teams (multi‑line)"],
-    horizontal=True,
-    help="Switch between overall curve and team‑by‑team comparison"
-)
-
-# ---------- COMMON PREP: build season, team mapping ----------
-season_team_summary = (
-    df_filt
-      .groupby(["season", "player_club_id"], as_index=False)
-      .agg(goals=("goals", "sum"), assists=("assists", "sum"))
-)
-
-# Build readable team name column
-season_team_summary["team_name"] = season_team_summary["player_club_id"].apply(
-    lambda cid: id2name.get(cid, f"Club {cid}")
-)
-
-# ---------- MODE 1 : Single line with team label ----------
-if chart_mode.startswith("Single"):
-
-    # Aggregate per season (sum across teams)
-    summary_single = (
-        season_team_summary
-          .groupby("season", as_index=False)[["goals", "assists"]]
-          .sum()
+@timed_fragment("season_charts")
+def season_section(selection):
+    st.subheader("Goals & Assists per Season")
+
+    chart_mode = st.radio(
+        "Visualisation mode",
+        ["Single line (with team label)", "Compare teams (multi‑line)"],
+        horizontal=True,
+        help="Switch between overall curve and team‑by‑team comparison"
     )
+    for fig in season_figures(*selection, chart_mode):
+        st.plotly_chart(fig, use_container_width=True)
 
-    # Create label: 2021/22 (Chelsea, Inter)
-    team_per_season = (
-        season_team_summary.groupby("season")["team_name"]
-        .apply(lambda x: ", ".join(sorted(set(x))))
-        .reset_index()
-    )
-    summary_single = summary_single.merge(team_per_season, on="season")
-    summary_single["season_label"] = summary_single["season"] + " (" + summary_single["team_name"] + ")"
-
-    fig = go.Figure()
-    fig.add_trace(
-        go.Scatter(
-            x=summary_single["season_label"], y=summary_single["goals"],
-            mode="lines+markers", name="Goals"
-        )
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=summary_single["season_label"], y=summary_single["assists"],
-            mode="lines+markers", name="Assists"
-        )
-    )
-    fig.update_layout(
-        title="Goals & Assists per Season",
-        xaxis_title="Season (Team)",
-        yaxis_title="Count",
-        template="plotly_dark"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# ---------- MODE 2 : Multi‑line per team ----------
-else:
-    # Pivot so each team is its own column
-    pivot_goals   = season_team_summary.pivot(index="season", columns="team_name", values="goals").fillna(0)
-    pivot_assists = season_team_summary.pivot(index="season", columns="team_name", values="assists").fillna(0)
-
-    # Plot Goals
-    fig_goals = go.Figure()
-    for team in pivot_goals.columns:
-        fig_goals.add_trace(go.Scatter(
-            x=pivot_goals.index, y=pivot_goals[team],
-            mode="lines+markers", name=team
-        ))
-    fig_goals.update_layout(
-        title="Goals per Season (by Team)",
-        xaxis_title="Season",
-        yaxis_title="Goals",
-        template="plotly_dark"
-    )
-    st.plotly_chart(fig_goals, use_container_width=True)
-
-    # Plot Assists
-    fig_ast = go.Figure()
-    for team in pivot_assists.columns:
-        fig_ast.add_trace(go.Scatter(
-            x=pivot_assists.index, y=pivot_assists[team],
-            mode="lines+markers", name=team
-        ))
-    fig_ast.update_layout(
-        title="Assists per Season (by Team)",
-        xaxis_title="Season",
-        yaxis_title="Assists",
-        template="plotly_dark"
-    )
-    st.plotly_chart(fig_ast, use_container_width=True)
+season_section(selection)
 
 # --------------------------------------------------
 # 9) POSITION DISTRIBUTION
 # --------------------------------------------------
-if not df_pos_filt.empty:
-    pos_counts = df_pos_filt["position"].value_counts()
-    fig_pie = go.Figure(data=[go.Pie(
-        labels=pos_counts.index,
-        values=pos_counts.values,
-        hole=0.4,
-        textinfo="label+percent",
-        pull=[0.03]*len(pos_counts)
-    )])
-    fig_pie.update_layout(title="Most Frequent Positions Played", template="plotly_dark")
-    st.subheader("Position Distribution")
-    st.plotly_chart(fig_pie, use_container_width=True)
+@timed_fragment("positions")
+def position_section(selection):
+    fig_pie = position_figure(*selection)
+    if fig_pie is not None:
+        st.subheader("Position Distribution")
+        st.plotly_chart(fig_pie, use_container_width=True)
 
-# --------------------------------------------------
-# 10) RAW DATA EXPANDER
-# --------------------------------------------------
-with st.expander("📄 Raw appearance data"):
-    st.dataframe(df_filt, use_container_width=True)
+position_section(selection)
 
 # --------------------------------------------------
-# 11) SQL QUERY EXPLORER
+# 10) RAW DATA EXPANDER + 11) SQL QUERY EXPLORER
 # --------------------------------------------------
-st.subheader("🔍 SQL Query Explorer")
-
-con = duckdb.connect()
-con.register("df_filt", df_filt)
-con.register("df_pos_filt", df_pos_filt)
-
-sql_input = st.text_area("Enter SQL query", "SELECT * FROM df_filt LIMIT 100")
-try:
-    df_query = con.execute(sql_input).df()
-    st.dataframe(df_query, use_container_width=True)
-except Exception as e:
-    st.error(f"❌ SQL Error: {e}")
+@timed_fragment("explorer")
+def explorer_section(selection):
+    df_raw = None
+    with st.expander("📄 Raw appearance data"):
+        # raw rows are only queried on demand
+        if st.toggle("Load raw appearances"):
+            df_raw = filtered_appearances(*selection)
+            st.dataframe(df_raw, use_container_width=True)
+
+    st.subheader("🔍 SQL Query Explorer")
+
+    cursor = explorer_database().cursor()
+    try:
+        cursor.register("df_filt", filtered_stats(*selection))
+        cursor.register("df_pos_filt", filtered_positions(*selection))
+        if df_raw is not None:
+            cursor.register("df_raw", df_raw)
+
+        sql_input = st.text_area("Enter SQL query", "SELECT * FROM df_filt LIMIT 100")
+        try:
+            df_query, truncated = run_duckdb(cursor, sql_input)
+            st.dataframe(df_query, use_container_width=True)
+            if truncated:
+                st.caption(f"Showing the first {len(df_query):,} rows")
+        except (QueryRejected, QueryTimeout) as e:
+            st.warning(f"⛔ {e}")
+        except Exception as e:
+            st.error(f"❌ SQL Error: {e}")
+    finally:
+        cursor.close()
+
+explorer_section(selection)
@@ -1,40 +1,25 @@
 # pages/player_transfer.py
 import streamlit as st
-import sqlite3
 import pandas as pd
 import plotly.graph_objects as go
 from collections import defaultdict
-from settings import get_db_path
+from src.player_data import load_transfers, load_club_map
 
 # --------------------------
 # PAGE HEADER
 # --------------------------
 st.title("🔁 Player Transfer History")
 
-player_name = st.session_state.get("player_name")
-if not player_name:
+player_id = st.session_state.get("player_id")
+if player_id is None:
     st.warning("Please select a player from the Bio page first.")
     st.stop()
 
 # --------------------------
 # LOAD DATA
 # --------------------------
-DB_PATH = get_db_path()
-
-@st.cache_data
-def load_transfers(name):
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql("SELECT * FROM transfers WHERE player_name = ?", conn, params=(name,))
-    df["transfer_date"] = pd.to_datetime(df["transfer_date"], errors="coerce")
-    return df.sort_values("transfer_date")
-
-@st.cache_data
-def load_club_map():
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql("SELECT club_id, name FROM clubs", conn)
-    return dict(zip(df["club_id"], df["name"]))
-
-df_transfers = load_transfers(player_name)
+# Loaders keyed on player_id, prefetched by the Bio page
+df_transfers = load_transfers(player_id)
 id2name = load_club_map()
 
 if df_transfers.empty:
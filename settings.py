@@ -1,8 +1,8 @@
 import os
 from pathlib import Path
 import platform
-import gdown
 import streamlit as st
+from src.snapshot import fetch_database
 
 project_root = Path(__file__).resolve().parent
 # print(project_root)
@@ -16,9 +16,18 @@ os.makedirs(images_path, exist_ok=True)
 player_images_path = images_path / "player"
 os.makedirs(player_images_path, exist_ok=True)
 
+# served by Streamlit at app/static/... (server.enableStaticServing in .streamlit/config.toml)
+static_path = project_root / "static"
+player_thumbnails_path = static_path / "players"
+os.makedirs(player_thumbnails_path, exist_ok=True)
+
 pages_path = project_root / 'pages'
 os.makedirs(pages_path, exist_ok=True)
 
+# Store the pages / chat engine read from: "sqlite" (clean_football.db),
+# "duckdb" or "parquet" (columnar copy written by src/columnar_store.py)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "sqlite")
+
 
 def download_db_path():
     if platform.system() == "Windows":
@@ -27,14 +36,12 @@ def download_db_path():
         # Path on Streamlit
         db_path = "/tmp/clean_football.db"
 
-        # Check exist file if already not download
-        if not os.path.exists(db_path):
-            file_id = "1Kpv8ySZh-0SHgmSftHbtdgxji8KQEpRz"
-            url = f"https://drive.google.com/uc?id={file_id}"
-            try:
-                gdown.download(url, db_path, quiet=False)
-            except Exception as e:
-                st.error(f"❌ Cannot download database: {e}")
+        # Compressed snapshot when SNAPSHOT_MANIFEST_URL is set, else the Google Drive file.
+        # Locked and renamed into place, so concurrent workers never see a partial file
+        try:
+            fetch_database(db_path)
+        except Exception as e:
+            st.error(f"❌ Cannot download database: {e}")
 
         return db_path
 
@@ -0,0 +1,131 @@
+# Persistent cache of chat answers (generated SQL + final answer), shared by every
+# session and worker of the app. An entry is keyed on the normalized question, the
+# model, the prompt version and the version of the clean database, so a new data
+# load or prompt change never serves a stale answer.
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from contextlib import contextmanager
+from settings import *
+
+# generated data next to the databases (git-ignored with them)
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(db_path, 'answer_cache.db'))
+TTL_SECONDS = 7 * 24 * 3600
+MAX_ENTRIES = 5000
+
+
+def normalize_question(question):
+    # 'How many goals did  Haaland score?' == 'how many goals did haaland score'
+    text = ' '.join(unicodedata.normalize('NFKC', question).casefold().split())
+    return text.rstrip('?!.。 ')
+
+def database_version(path):
+    """Checksum of the installed snapshot (src/snapshot.py), else size + mtime of the file."""
+    checksum_path = f'{path}.sha256'
+    if os.path.exists(checksum_path):
+        with open(checksum_path) as f:
+            return f.read().strip()
+    stat = os.stat(path)
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+
+class AnswerCache:
+    """SQLite-backed answer cache with TTL expiry and least-recently-used eviction."""
+
+    def __init__(self, path=ANSWER_CACHE_PATH, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY, question TEXT, sql TEXT, answer TEXT,
+                created REAL, last_used REAL, hits INTEGER DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER)")
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    @staticmethod
+    def key(question, model, prompt_version, db_version):
+        parts = [normalize_question(question), model, prompt_version, db_version]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def _count(self, name, n=1):
+        self.conn.execute(
+            "INSERT INTO cache_stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, n),
+        )
+
+    def get(self, key):
+        """(sql, answer) of a live entry, else None."""
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute("SELECT sql, answer, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row and row[2] >= now - self.ttl:
+                self.conn.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+                self._count('hits')
+            else:
+                if row:
+                    self.conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                    self._count('expired')
+                self._count('misses')
+                row = None
+        return row[:2] if row else None
+
+    def put(self, key, question, sql, answer):
+        now = time.time()
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO answers (key, question, sql, answer, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, question, sql, answer, now, now),
+            )
+            self._count('stores')
+            evicted = self.conn.execute(
+                "DELETE FROM answers WHERE key IN "
+                "(SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            if evicted:
+                self._count('evicted', evicted)
+
+    def stats(self):
+        """Counters since the cache file was created, across every process using it."""
+        with self._lock:
+            counters = dict(self.conn.execute("SELECT name, value FROM cache_stats"))
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        stats = {name: counters.get(name, 0) for name in ('hits', 'misses', 'stores', 'expired', 'evicted')}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['entries'] = entries
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+    return _cache
+
@@ -0,0 +1,272 @@
+# Serving layer between the chat page and the LLM chain. Every Streamlit session thread
+# hands its question to one asyncio loop per process, which:
+# - bounds the LLM calls and SQL executions running at once (semaphores),
+# - coalesces identical in-flight questions into one computation whose events are
+#   replayed to every session asking it,
+# - sheds new questions when too many are waiting (Overloaded), and
+# - records per-stage latency histograms (queue, sql, db, first_token, answer, total).
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from settings import *
+from src.answer_cache import normalize_question
+from src.llm_chat_engine import (get_llm_chain, prepare, sql_input, answer_input, clean_sql, message_text,
+                                 SQL_STOP, MODEL, PROMPT_VERSION, CHAT_LLM)
+
+LLM_CONCURRENCY = int(os.getenv("CHAT_LLM_CONCURRENCY", 8))     # model calls at once
+DB_CONCURRENCY = int(os.getenv("CHAT_DB_CONCURRENCY", 4))       # generated queries at once (= read pool size)
+MAX_WAITING = int(os.getenv("CHAT_MAX_WAITING", 32))            # distinct questions queued before shedding
+QUEUE_TIMEOUT = 20.0          # seconds a question may wait for a model slot
+EVENT_TIMEOUT = 120.0         # seconds a session waits for the next event before giving up
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+STAGES = ('queue', 'sql', 'db', 'first_token', 'answer', 'total')
+
+
+class Overloaded(RuntimeError):
+    """Too many questions in flight: the client should try again later."""
+
+
+class Histogram:
+    """Cumulative latency buckets (Prometheus style) of one stage."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, seconds):
+        self.n += 1
+        self.total += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if not self.n:
+            return 0.0
+        return next(bound for bound, count in zip(self.buckets, self.counts) if count >= q * self.n)
+
+
+class _Flight:
+    """One computation of a question, shared by every session that asked it while in flight."""
+
+    def __init__(self):
+        self.history = []          # events published so far, replayed to late subscribers
+        self.subscribers = []      # queue.Queue per session
+
+    def subscribe(self, events):
+        for event in self.history:
+            events.put_nowait(event)
+        self.subscribers.append(events)
+
+    def publish(self, kind, value=None):
+        event = (kind, value)
+        self.history.append(event)
+        for events in self.subscribers:
+            events.put_nowait(event)
+
+
+class ChatServer:
+    def __init__(self, llm_concurrency=LLM_CONCURRENCY, db_concurrency=DB_CONCURRENCY, max_waiting=MAX_WAITING):
+        self.loop = asyncio.new_event_loop()
+        self.max_waiting = max_waiting
+        self.llm_slots = asyncio.Semaphore(llm_concurrency)
+        self.db_slots = asyncio.Semaphore(db_concurrency)
+        # blocking work: chain build, prompt preparation and the guarded queries
+        self.executor = ThreadPoolExecutor(max_workers=db_concurrency + 2, thread_name_prefix="chat-db")
+        self.flights = {}          # question key -> _Flight
+        self.waiting = 0           # flights not yet holding their model slot (under _lock)
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.counters = {'requests': 0, 'coalesced': 0, 'shed': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="chat-server", daemon=True)
+        self._thread.start()
+
+    def _observe(self, stage, seconds):
+        with self._lock:
+            self.histograms[stage].observe(seconds)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _add_waiting(self, delta):
+        with self._lock:
+            self.waiting += delta
+
+    @asynccontextmanager
+    async def _slot(self, semaphore, timeout=QUEUE_TIMEOUT):
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._count('shed')
+            raise Overloaded(f"No free slot after {timeout:.0f}s, please try again")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    async def _compute(self, key, question, flight):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        waiting = True
+        try:
+            llm, prompt, db, table_info = await loop.run_in_executor(self.executor, prepare, question)
+            # one model slot for the whole flight: once its SQL is published, the answer
+            # never waits for (or is shed by) a second one. The DB slot is waited for without
+            # a timeout: at most llm_concurrency flights wait, each query has a deadline
+            async with self._slot(self.llm_slots):
+                self._add_waiting(-1)
+                waiting = False
+                stage = time.perf_counter()
+                self._observe('queue', stage - start)
+                message = await llm.ainvoke(prompt.format(input=sql_input(question), table_info=table_info),
+                                            stop=SQL_STOP)
+                sql = clean_sql(message)
+                self._observe('sql', time.perf_counter() - stage)
+                flight.publish('sql', sql)
+
+                async with self._slot(self.db_slots, timeout=None):
+                    stage = time.perf_counter()
+                    result = await loop.run_in_executor(self.executor, db.run, sql)
+                    self._observe('db', time.perf_counter() - stage)
+
+                stage = time.perf_counter()
+                first = True
+                async for chunk in llm.astream(prompt.format(input=answer_input(question, sql, result),
+                                                             table_info=table_info)):
+                    if message_text(chunk):
+                        if first:
+                            self._observe('first_token', time.perf_counter() - start)
+                            first = False
+                        flight.publish('token', message_text(chunk))
+                self._observe('answer', time.perf_counter() - stage)
+            self._observe('total', time.perf_counter() - start)
+            flight.publish('done')
+        except Exception as e:
+            self._count('errors')
+            flight.publish('error', e)
+        finally:
+            if waiting:
+                self._add_waiting(-1)
+            del self.flights[key]
+
+    async def _subscribe(self, question, events):
+        self._count('requests')
+        key = (normalize_question(question), MODEL, PROMPT_VERSION)
+        flight = self.flights.get(key)
+        if flight is not None:
+            self._count('coalesced')
+        else:
+            with self._lock:
+                waiting = self.waiting
+            if waiting >= self.max_waiting:
+                self._count('shed')
+                raise Overloaded("Too many questions in progress, please try again in a moment")
+            flight = self.flights[key] = _Flight()
+            self._add_waiting(1)
+            asyncio.get_running_loop().create_task(self._compute(key, question, flight))
+        flight.subscribe(events)
+
+    def ask_stream(self, question, timeout=EVENT_TIMEOUT):
+        """Same events as llm_chat_engine.ask_stream(), served by the loop. Raises Overloaded when shedding."""
+        events = queue.Queue()
+        asyncio.run_coroutine_threadsafe(self._subscribe(question, events), self.loop).result()
+        while True:
+            kind, value = events.get(timeout=timeout)
+            if kind == 'done':
+                return
+            if kind == 'error':
+                raise value
+            yield kind, value
+
+    def stats(self):
+        """Counters, in-flight questions and p50 / p95 (bucket bounds) of every stage."""
+        with self._lock:
+            stats = dict(self.counters, in_flight=len(self.flights), waiting=self.waiting)
+            for stage, histogram in self.histograms.items():
+                stats[stage] = {'count': histogram.n, 'p50': histogram.quantile(0.5), 'p95': histogram.quantile(0.95)}
+        return stats
+
+    def metrics_text(self):
+        """Histograms and counters in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            for stage, histogram in self.histograms.items():
+                name = f'chat_{stage}_seconds'
+                lines.append(f'# TYPE {name} histogram')
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    le = '+Inf' if bound == float('inf') else bound
+                    lines.append(f'{name}_bucket{{le="{le}"}} {count}')
+                lines.append(f'{name}_sum {histogram.total:.6f}')
+                lines.append(f'{name}_count {histogram.n}')
+            for name, value in self.counters.items():
+                lines.append(f'# TYPE chat_{name}_total counter')
+                lines.append(f'chat_{name}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_chat_server():
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ChatServer()
+    return _server
+
+
+if __name__ == "__main__":
+    # Load test on the local stub model: concurrent sessions asking a few distinct questions,
+    # one thread per session as in Streamlit, served directly (before) vs through the server
+    import argparse
+    parser = argparse.ArgumentParser(description="Load test the chat serving layer on the fake model")
+    parser.add_argument('--sessions', type=int, default=64)
+    parser.add_argument('--questions', type=int, default=8, help="distinct questions among the sessions")
+    parser.add_argument('--max-waiting', type=int, default=MAX_WAITING)
+    args = parser.parse_args()
+    if CHAT_LLM != "fake":
+        parser.error("run with CHAT_LLM=fake, the load test uses the local stub model")
+
+    from src.llm_chat_engine import ask_stream
+    from src.fake_llm import CALLS
+    get_llm_chain()
+    questions = [f"How many players are in the database? ({i % args.questions})" for i in range(args.sessions)]
+
+    def run(stream):
+        timings, failures = [], []
+
+        def session(question):
+            start = time.perf_counter()
+            try:
+                for _ in stream(question):
+                    pass
+                timings.append(time.perf_counter() - start)
+            except Exception as e:
+                failures.append(type(e).__name__)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=session, args=(q,)) for q in questions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        timings.sort()
+        p95 = timings[int(0.95 * (len(timings) - 1))] if timings else 0
+        print(f"  {len(timings)} answered, {len(failures)} failed, wall {time.perf_counter() - start:.2f}s, "
+              f"p95 {p95:.2f}s, model calls {dict(CALLS)}")
+        CALLS.clear()
+
+    print(f"direct ({args.sessions} sessions, {args.questions} distinct questions):")
+    run(ask_stream)
+    server = ChatServer(max_waiting=args.max_waiting)
+    print("chat server:")
+    run(server.ask_stream)
+    print(server.stats())
@@ -1,7 +1,14 @@
+import hashlib
 import sqlite3
-import time
+import argparse
 
 from settings import *
+from src.pipeline import run_dag
+from src.db_writer import BulkWriter
+from src.serving_indexes import build_and_check
+from src.columnar_store import export_columnar
+from src.normalize import title_names, yes_no, fill_missing, parse_money
+from src.schemas import read_table
 import os
 import pandas as pd
 from datetime import timedelta
@@ -13,9 +20,16 @@ def clean_data():
     print(tables_df)
     return conn
 
-def clean_appearances(conn):
+def read_raw(conn, table, since=None, date_col='date'):
+    # Registry columns / dtypes of src/schemas.py
+    # since: only rows on/after this raw date (incremental mode)
+    if since is None:
+        return read_table(conn, table)
+    return read_table(conn, table, f"WHERE {date_col} >= ?", (since,))
+
+def clean_appearances(conn, since=None):
     # appearances table
-    df_appearances = pd.read_sql("SELECT * FROM appearances", conn)
+    df_appearances = read_raw(conn, 'appearances', since)
     print(df_appearances.head(10))
 
     # column date to datetime
@@ -25,7 +39,7 @@ def clean_appearances(conn):
     df_appearances = df_appearances.drop_duplicates(subset=['appearance_id'])
 
     # clean player name
-    df_appearances['player_name'] = df_appearances['player_name'].str.strip().str.title()
+    df_appearances['player_name'] = title_names(df_appearances['player_name'])
 
     # Fill missing value
     cols_to_fill = ['goals', 'assists', 'minutes_played', 'yellow_cards', 'red_cards']
@@ -34,11 +48,17 @@ def clean_appearances(conn):
     # Filter Only not null player_id, game_id
     df_appearances = df_appearances[df_appearances['player_id'].notna() & df_appearances['game_id'].notna()]
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_appearances.to_sql('appearances', conn_clean, index=False, if_exists='replace')
-
-def clean_club_games(conn):
-    df_club_games = pd.read_sql(f"SELECT * FROM club_games", conn)
+    return df_appearances
+
+def clean_club_games(conn, since=None):
+    if since is None:
+        df_club_games = read_raw(conn, 'club_games')
+    else:
+        # club_games has no date, take the rows of the games in the window
+        df_club_games = read_table(
+            conn, 'club_games', "WHERE g.date >= ? ORDER BY cg.rowid", (since,),
+            source="club_games cg JOIN games g ON g.game_id = cg.game_id", alias='cg',
+        )
     print(df_club_games.head(10))
     print(df_club_games.dtypes)
 
@@ -46,58 +66,35 @@ def clean_club_games(conn):
     df_club_games = df_club_games.drop_duplicates(subset=['game_id'])
 
     # clean player name
-    df_club_games['own_manager_name'] = df_club_games['own_manager_name'].str.strip().str.title()
-    df_club_games['opponent_manager_name'] = df_club_games['opponent_manager_name'].str.strip().str.title()
+    df_club_games['own_manager_name'] = title_names(df_club_games['own_manager_name'])
+    df_club_games['opponent_manager_name'] = title_names(df_club_games['opponent_manager_name'])
 
     # position check (null value is mean it not league game)
     df_club_games['own_position'] = df_club_games['own_position'].fillna(-1).astype(int)
     df_club_games['opponent_position'] = df_club_games['opponent_position'].fillna(-1).astype(int)
-    df_club_games['is_league_game'] = df_club_games.apply(
-        lambda row: "Yes" if row['own_position'] != -1 and row['opponent_position'] != -1 else "No",
-        axis=1
+    df_club_games['is_league_game'] = yes_no(
+        (df_club_games['own_position'] != -1) & (df_club_games['opponent_position'] != -1)
     )
 
     # dtype
     df_club_games['own_goals'] = df_club_games['own_goals'].fillna(0).astype(int)
     df_club_games['opponent_goals'] = df_club_games['opponent_goals'].fillna(0).astype(int)
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_club_games.to_sql('club_games', conn_clean, index=False, if_exists='replace')
+    return df_club_games
 
 
 def clean_clubs(conn):
-    df_clubs = pd.read_sql(f"SELECT * FROM clubs", conn)
+    df_clubs = read_raw(conn, 'clubs')
     print(df_clubs.dtypes)
     print(df_clubs.head(10))
 
-    # clean net_transfer_record
-    def clean_net_transfer_record(col):
-        col = col.fillna('0').astype(str)
-
-        # Remove € and +
-        col = col.str.replace('€', '', regex=False)
-        col = col.str.replace('+', '', regex=False)
-
-        # k → x / 1000
-        k_mask = col.str.contains('k', case=False, na=False)
-        col[k_mask] = col[k_mask].str.replace('k', '', regex=False).astype(float) / 1000
-
-        # m → x (Million)
-        m_mask = col.str.contains('m', case=False, na=False)
-        col[m_mask] = col[m_mask].str.replace('m', '', regex=False).astype(float)
-
-        # Clean leftover invalid strings
-        col = col.replace(['', '-', '+-0'], '0')
-
-        return col.astype(float)
-
-    df_clubs['net_transfer_record'] = clean_net_transfer_record(df_clubs['net_transfer_record'])
-    print(df_clubs['total_market_value'], df_clubs['net_transfer_record'])
+    # net_transfer_record: '€+3.05m' / '€500k' / '+-0' -> millions of euros
+    df_clubs['net_transfer_record'] = parse_money(df_clubs['net_transfer_record'], unit=1e6).fillna(0)
+    print(df_clubs['net_transfer_record'])
     # print(len(df_clubs))
 
-    # delete not use column (meta data)
-    col_to_del = ['domestic_competition_id', 'coach_name', 'filename', 'url', 'total_market_value']
-    df_clubs = df_clubs.drop(columns=col_to_del)
+    # not use column (meta data: domestic_competition_id, coach_name, filename, url, total_market_value)
+    # are not in the schema registry, so they are never read
     print(df_clubs.columns)
 
     # dtypes
@@ -105,26 +102,17 @@ def clean_clubs(conn):
     df_clubs['foreigners_percentage'] = pd.to_numeric(df_clubs['foreigners_percentage'], errors='coerce')
 
     # Stadium name Title
-    df_clubs['stadium_name'] = df_clubs['stadium_name'].str.strip().str.title()
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_clubs.to_sql('clubs', conn_clean, index=False, if_exists='replace')
+    df_clubs['stadium_name'] = title_names(df_clubs['stadium_name'])
 
     # null value
-    df_clubs['average_age'] = pd.to_numeric(df_clubs['average_age'], errors='coerce')
-    df_clubs['foreigners_percentage'] = pd.to_numeric(df_clubs['foreigners_percentage'], errors='coerce')
-
     df_clubs[['average_age', 'foreigners_percentage']] = df_clubs[['average_age', 'foreigners_percentage']].fillna(0)
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_clubs.to_sql('clubs', conn_clean, index=False, if_exists='replace')
+    return df_clubs
 
 def clean_competitions(conn):
-    df_competitions = pd.read_sql(f"SELECT * FROM competitions", conn)
+    df_competitions = read_raw(conn, 'competitions')
     print(df_competitions)
 
-    # delete metada
-    df_competitions = df_competitions.drop(columns='url')
-
     # UCL match domestic_league_code
     mapping = {
         'uefa_super_cup': 'SUPERCUP',
@@ -155,11 +143,10 @@ def clean_competitions(conn):
     mask = df_competitions['country_name'].isnull()
     df_competitions.loc[mask, 'country_name'] = df_competitions.loc[mask, 'sub_type'].map(mapping)
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_competitions.to_sql('competitions', conn_clean, index=False, if_exists='replace')
+    return df_competitions
 
-def clean_game_events(conn):
-    df_game_events = pd.read_sql(f"SELECT * FROM game_events", conn)
+def clean_game_events(conn, since=None):
+    df_game_events = read_raw(conn, 'game_events', since)
     print(df_game_events.dtypes)
 
     # Schema convert
@@ -169,33 +156,30 @@ def clean_game_events(conn):
     df_game_events['player_in_id'] = df_game_events['player_in_id'].fillna('unknown').astype(str)
     df_game_events['player_assist_id'] = df_game_events['player_assist_id'].fillna('unknown').astype(str)
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_game_events.to_sql('game_events', conn_clean, index=False, if_exists='replace')
+    return df_game_events
 
-def clean_game_lineups(conn):
-    df_game_lineups = pd.read_sql(f"SELECT * FROM game_lineups", conn)
+def clean_game_lineups(conn, since=None):
+    df_game_lineups = read_raw(conn, 'game_lineups', since)
     print(df_game_lineups.columns)
     print(df_game_lineups.dtypes)
 
     # Schema convert
     df_game_lineups['date'] = pd.to_datetime(df_game_lineups['date'], errors='coerce')
-    df_game_lineups['player_name'] = df_game_lineups['player_name'].str.strip().str.title()
+    df_game_lineups['player_name'] = title_names(df_game_lineups['player_name'])
     df_game_lineups['team_captain'] = df_game_lineups['team_captain'].fillna(0).astype(int)
     df_game_lineups['number'] = (df_game_lineups['number'].replace('-', 0).replace('', 0).astype(int))
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_game_lineups.to_sql('game_lineups', conn_clean, index=False, if_exists='replace')
+    return df_game_lineups
 
-def clean_games(conn):
-    df_games = pd.read_sql(f'SELECT * FROM games', conn)
+def clean_games(conn, since=None):
+    df_games = read_raw(conn, 'games', since)
     print(df_games.dtypes)
 
     df_games['season'] = pd.to_datetime(df_games['season'], format='%Y', errors='coerce').dt.year
     df_games['date'] = pd.to_datetime(df_games['date'], errors='coerce')
-    df_games['home_club_manager_name'] = df_games['home_club_manager_name'].str.strip().str.title()
+    df_games['home_club_manager_name'] = title_names(df_games['home_club_manager_name'])
     print(df_games['season'])
     print(df_games.dtypes)
-    df_games.drop(columns='url', inplace=True)
 
     # fill na (float)
     df_games[['home_club_id', 'away_club_id', 'home_club_goals',
@@ -205,92 +189,337 @@ def clean_games(conn):
               'away_club_position', 'attendance']].fillna(-1)
 
     df_games = df_games.dropna(subset=['home_club_id'])
-    df_games.fillna('-', inplace=True)
+    for col in df_games.columns:
+        df_games[col] = fill_missing(df_games[col], '-')
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_games.to_sql('games', conn_clean, index=False, if_exists='replace')
+    return df_games
 
 
-def clean_player_valuations(conn):
-    df_value = pd.read_sql(f'SELECT * FROM player_valuations', conn)
+def clean_player_valuations(conn, since=None):
+    df_value = read_raw(conn, 'player_valuations', since)
     print(df_value.dtypes)
     df_value['date'] = pd.to_datetime(df_value['date'], errors='coerce')
+    df_value['market_value_in_eur'] = parse_money(df_value['market_value_in_eur'])
 
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_value.to_sql('player_valuations', conn_clean, index=False, if_exists='replace')
+    return df_value
 
 def clean_players(conn):
-    df_players = pd.read_sql(f'SELECT * FROM players', conn)
+    df_players = read_raw(conn, 'players')
     print(df_players.dtypes)
 
     df_players['first_name'] = df_players['first_name'].fillna('')
-    df_players['country_of_birth'] = df_players['country_of_birth'].fillna('Unknown')
+    df_players['country_of_birth'] = fill_missing(df_players['country_of_birth'], 'Unknown')
     df_players['city_of_birth'] = df_players['city_of_birth'].fillna('Unknown')
-    df_players['country_of_citizenship'] = df_players['country_of_citizenship'].fillna('Unknown')
-    df_players['sub_position'] = df_players['sub_position'].fillna('Missing')
-    df_players['foot'] = df_players['foot'].fillna('Unknown')
+    df_players['country_of_citizenship'] = fill_missing(df_players['country_of_citizenship'], 'Unknown')
+    df_players['sub_position'] = fill_missing(df_players['sub_position'], 'Missing')
+    df_players['foot'] = fill_missing(df_players['foot'], 'Unknown')
     df_players['height_in_cm'] = df_players['height_in_cm'].fillna(-1).astype(int)
     df_players['agent_name'] = df_players['agent_name'].fillna('Unknown')
-    df_players['market_value_in_eur'] = df_players['market_value_in_eur'].fillna(-1)
-    df_players['highest_market_value_in_eur'] = df_players['highest_market_value_in_eur'].fillna(-1)
+    df_players['market_value_in_eur'] = parse_money(df_players['market_value_in_eur']).fillna(-1)
+    df_players['highest_market_value_in_eur'] = parse_money(df_players['highest_market_value_in_eur']).fillna(-1)
 
     placeholder_date = pd.Timestamp('1900-01-01').date()
     df_players['date_of_birth'] = pd.to_datetime(df_players['date_of_birth'], errors='coerce').dt.date
     df_players['date_of_birth'] = df_players['date_of_birth'].fillna(placeholder_date)
 
-    df_players.drop(columns=['contract_expiration_date', 'image_url', 'url'], inplace=True)
-
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_players.to_sql('players', conn_clean, index=False, if_exists='replace')
+    return df_players
 
-def clean_transfers(conn):
-    df_transfers = pd.read_sql(f'SELECT * FROM transfers', conn)
+def clean_transfers(conn, since=None):
+    df_transfers = read_raw(conn, 'transfers', since, date_col='transfer_date')
     print(df_transfers.dtypes)
 
     # convert to datetime col
     df_transfers['transfer_date'] = pd.to_datetime(df_transfers['transfer_date'], errors='coerce').dt.date
 
-    # Convert string to float first, then fillna, then to int
-    df_transfers['transfer_fee'] = pd.to_numeric(df_transfers['transfer_fee'], errors='coerce')
-    df_transfers['transfer_fee'] = df_transfers['transfer_fee'].fillna(-1).astype(int)
-
-    df_transfers['market_value_in_eur'] = pd.to_numeric(df_transfers['market_value_in_eur'], errors='coerce')
-    df_transfers['market_value_in_eur'] = df_transfers['market_value_in_eur'].fillna(-1).astype(int)
-
-    conn_clean = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
-    df_transfers.to_sql('transfers', conn_clean, index=False, if_exists='replace')
+    # Parse to float first, then fillna, then to int
+    df_transfers['transfer_fee'] = parse_money(df_transfers['transfer_fee']).fillna(-1).astype(int)
+    df_transfers['market_value_in_eur'] = parse_money(df_transfers['market_value_in_eur']).fillna(-1).astype(int)
+
+    return df_transfers
+
+
+# --------------------------------------------------
+# Materialized per-player aggregates for pages/player_stat.py
+# --------------------------------------------------
+
+# (CASTs give the CREATE TABLE AS columns a declared type)
+
+# Football season starts in July: 2021-08-14 -> 2021 (2021/22), 2022-03-01 -> 2021
+SEASON_START_SQL = "CAST(strftime('%Y', {col}) AS INTEGER) - (CAST(strftime('%m', {col}) AS INTEGER) < 7)"
+SEASON_LABEL_SQL = "season_start || '/' || substr('0' || ((season_start + 1) % 100), -2)"
+
+PLAYER_SEASON_STATS_SQL = f"""
+    SELECT s.player_id,
+           s.player_name,
+           s.season_start,
+           CAST({SEASON_LABEL_SQL} AS TEXT) AS season,
+           s.player_club_id,
+           CAST(COALESCE(c.name, 'Club ' || s.player_club_id) AS TEXT) AS club_name,
+           s.matches,
+           s.goals,
+           s.assists,
+           s.minutes_played,
+           s.yellow_cards,
+           s.red_cards,
+           s.first_date,
+           s.last_date
+    FROM (
+        -- one row per (player, season, club) even when the name is spelled differently across appearances
+        SELECT player_id,
+               MAX(player_name) AS player_name,
+               CAST({SEASON_START_SQL.format(col='date')} AS INTEGER) AS season_start,
+               player_club_id,
+               CAST(COUNT(*) AS INTEGER) AS matches,
+               CAST(SUM(goals) AS INTEGER) AS goals,
+               CAST(SUM(assists) AS INTEGER) AS assists,
+               CAST(SUM(minutes_played) AS INTEGER) AS minutes_played,
+               CAST(SUM(yellow_cards) AS INTEGER) AS yellow_cards,
+               CAST(SUM(red_cards) AS INTEGER) AS red_cards,
+               CAST(MIN(date) AS TEXT) AS first_date,
+               CAST(MAX(date) AS TEXT) AS last_date
+        FROM appearances
+        WHERE date IS NOT NULL
+        GROUP BY player_id, season_start, player_club_id
+    ) s
+    LEFT JOIN clubs c ON c.club_id = s.player_club_id
+"""
+
+PLAYER_SEASON_POSITIONS_SQL = f"""
+    SELECT player_id,
+           player_name,
+           season_start,
+           CAST({SEASON_LABEL_SQL} AS TEXT) AS season,
+           club_id,
+           position,
+           matches
+    FROM (
+        SELECT ap.player_id,
+               MAX(ap.player_name) AS player_name,
+               CAST({SEASON_START_SQL.format(col='gl.date')} AS INTEGER) AS season_start,
+               gl.club_id,
+               gl.position,
+               CAST(COUNT(*) AS INTEGER) AS matches
+        FROM appearances ap
+        JOIN game_lineups gl
+          ON ap.game_id = gl.game_id AND ap.player_id = gl.player_id
+        WHERE gl.date IS NOT NULL
+        GROUP BY ap.player_id, season_start, gl.club_id, gl.position
+    )
+"""
+
+def build_player_aggregates(writer):
+    writer.replace_table_from_query('player_season_stats', PLAYER_SEASON_STATS_SQL)
+    writer.replace_table_from_query('player_season_positions', PLAYER_SEASON_POSITIONS_SQL)
+
+# incremental: how a stage is refreshed in --incremental mode
+#   watermark: (raw table, date column) whose max is stored as the high-water mark
+#   source: raw rows checksummed per month of that date, when not the watermark table
+#   window_col: clean rows with this date >= the old mark are replaced
+#   key: natural key, clean rows with the same key as an incoming row are replaced
+# Stages without it (small dimension tables) are always rebuilt.
+STAGES = {
+    'appearances': {'func': clean_appearances, 'deps': [],
+                    'incremental': {'watermark': ('appearances', 'date'), 'window_col': 'date',
+                                    'key': ['appearance_id']}},
+    'club_games': {'func': clean_club_games, 'deps': [],
+                   'incremental': {'watermark': ('games', 'date'), 'window_col': None,
+                                   'source': "club_games cg JOIN games g ON g.game_id = cg.game_id",
+                                   'key': ['game_id']}},
+    'clubs': {'func': clean_clubs, 'deps': []},
+    'competitions': {'func': clean_competitions, 'deps': []},
+    'game_events': {'func': clean_game_events, 'deps': [],
+                    'incremental': {'watermark': ('game_events', 'date'), 'window_col': 'date',
+                                    'key': ['game_event_id']}},
+    'game_lineups': {'func': clean_game_lineups, 'deps': [],
+                     'incremental': {'watermark': ('game_lineups', 'date'), 'window_col': 'date',
+                                     'key': ['game_lineups_id']}},
+    'games': {'func': clean_games, 'deps': [],
+              'incremental': {'watermark': ('games', 'date'), 'window_col': 'date',
+                              'key': ['game_id']}},
+    'player_valuations': {'func': clean_player_valuations, 'deps': [],
+                          'incremental': {'watermark': ('player_valuations', 'date'), 'window_col': 'date',
+                                          'key': None}},
+    'players': {'func': clean_players, 'deps': []},
+    'transfers': {'func': clean_transfers, 'deps': [],
+                  'incremental': {'watermark': ('transfers', 'transfer_date'), 'window_col': 'transfer_date',
+                                  'key': None}},
+}
+
+STAGES['player_aggregates'] = {'func': build_player_aggregates, 'deps': ['appearances', 'game_lineups', 'clubs'],
+                               'local': True}
+
+# Serving indexes for the page / chat queries, after every table is written
+STAGES['serving_indexes'] = {'func': build_and_check, 'deps': list(STAGES), 'local': True, 'always': True}
+
+# --------------------------------------------------
+# Incremental state (high-water marks) in clean_football.db
+# --------------------------------------------------
+
+def read_watermarks(writer):
+    writer.execute("""
+        CREATE TABLE IF NOT EXISTS _pipeline_state (
+            table_name TEXT PRIMARY KEY,
+            watermark TEXT,
+            updated_at TEXT
+        )
+    """)
+    return dict(writer.execute("SELECT table_name, watermark FROM _pipeline_state"))
+
+def current_watermarks(raw_conn):
+    watermarks = {}
+    for name, stage in STAGES.items():
+        if 'incremental' in stage:
+            table, date_col = stage['incremental']['watermark']
+            watermarks[name] = raw_conn.execute(f"SELECT MAX({date_col}) FROM {table}").fetchone()[0]
+    return watermarks
+
+def partition_checksums(raw_conn, name):
+    # {month of the raw date ('YYYY-MM', None for undated rows): checksum of its raw rows},
+    # to find rows changed below the high-water mark
+    incremental = STAGES[name]['incremental']
+    table, date_col = incremental['watermark']
+    source = incremental.get('source', table)
+    hashes = {}
+    for part, *row in raw_conn.execute(f"SELECT substr({date_col}, 1, 7), * FROM {source}"):
+        if part not in hashes:
+            hashes[part] = hashlib.blake2b(digest_size=16)
+        hashes[part].update(repr(row).encode())
+    return {part: digest.hexdigest() for part, digest in hashes.items()}
+
+def current_checksums(raw_conn):
+    return {name: partition_checksums(raw_conn, name) for name, stage in STAGES.items() if 'incremental' in stage}
+
+def read_checksums(writer):
+    writer.execute("""
+        CREATE TABLE IF NOT EXISTS _pipeline_partitions (
+            table_name TEXT,
+            partition TEXT,
+            checksum TEXT,
+            PRIMARY KEY (table_name, partition)
+        )
+    """)
+    checksums = {}
+    for name, part, checksum in writer.execute("SELECT table_name, partition, checksum FROM _pipeline_partitions"):
+        checksums.setdefault(name, {})[part] = checksum
+    return checksums
+
+def incremental_since(mark, old_checksums, new_checksums):
+    # Window start of an incremental run: the old high-water mark, or the first month
+    # whose raw rows changed / disappeared below it. None (full rebuild) without
+    # checksums of the last run or when undated rows changed.
+    if mark is None or not old_checksums:
+        return None
+    changed = {part for part in old_checksums.keys() | new_checksums.keys()
+               if old_checksums.get(part) != new_checksums.get(part)}
+    if None in changed:
+        return None
+    first = min(changed, default=None)
+    return min(mark, f"{first}-01") if first else mark
+
+def write_clean_table(writer, name, df, since=None, watermark=None, checksums=None):
+    state = []
+    if watermark is not None:
+        state.append(("INSERT OR REPLACE INTO _pipeline_state VALUES (?, ?, datetime('now'))", (name, watermark)))
+    if checksums is not None:
+        state.append(("DELETE FROM _pipeline_partitions WHERE table_name = ?", (name,)))
+        state += [("INSERT INTO _pipeline_partitions VALUES (?, ?, ?)", (name, part, checksum))
+                  for part, checksum in checksums.items()]
+
+    if since is None:
+        writer.replace_table(name, df, extra_statements=state)
+    else:
+        incremental = STAGES[name]['incremental']
+        writer.upsert_table(name, df, window_col=incremental['window_col'], since=since,
+                            key=incremental['key'], extra_statements=state)
+
+def run_clean(clean_db, workers=None, tables=None, incremental=False, profile_memory=False):
+    raw_db = os.path.join(db_path, 'Football.db')
+    with sqlite3.connect(f"file:{raw_db}?mode=ro", uri=True) as raw_conn:
+        watermarks = current_watermarks(raw_conn)
+        checksums = current_checksums(raw_conn)
+
+    writer = BulkWriter(clean_db)
+    marks = read_watermarks(writer)
+    old_checksums = read_checksums(writer)
+    since = {}
+    if incremental:
+        for name in watermarks:
+            mark = incremental_since(marks.get(name), old_checksums.get(name), checksums[name])
+            if mark is not None:
+                since[name] = mark
+            elif name in marks:
+                print(f"⚠️ {name}: undated rows changed or no checksums yet, full rebuild")
+    if since:
+        print(f"Incremental run from {since}")
+
+    try:
+        run_dag(
+            STAGES,
+            read_db=raw_db,
+            write=lambda name, df: write_clean_table(
+                writer, name, df, since=since.get(name), watermark=watermarks.get(name),
+                checksums=checksums.get(name),
+            ),
+            workers=workers,
+            selected=tables,
+            stage_kwargs={name: {'since': mark} for name, mark in since.items()},
+            local_args=(writer,),
+            profile_memory=profile_memory,
+        )
+    finally:
+        writer.close()
+
+def compare_databases(db_a, db_b, tables):
+    # Row sets of both databases must match in both directions
+    conn = sqlite3.connect(db_a)
+    conn.execute("ATTACH DATABASE ? AS other", (db_b,))
+    ok = True
+    for table in tables:
+        only_a = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT * FROM main.{table} EXCEPT SELECT * FROM other.{table})"
+        ).fetchone()[0]
+        only_b = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT * FROM other.{table} EXCEPT SELECT * FROM main.{table})"
+        ).fetchone()[0]
+        count_a = conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+        count_b = conn.execute(f"SELECT COUNT(*) FROM other.{table}").fetchone()[0]
+        if only_a or only_b or count_a != count_b:
+            ok = False
+            print(f"❌ {table}: {count_a:,} vs {count_b:,} rows, {only_a:,} / {only_b:,} rows differ")
+        else:
+            print(f"✅ {table}: identical ({count_a:,} rows)")
+    conn.close()
+    return ok
 
 
 if __name__ == "__main__":
-    conn = clean_data()
-    clean_appearances(conn)
-    print("✅ Cleaning appearances...")
-    time.sleep(1)
-    clean_club_games(conn)
-    print("✅ Cleaning club_games...")
-    time.sleep(1)
-    clean_clubs(conn)
-    print("✅ Cleaning clubs...")
-    time.sleep(1)
-    clean_competitions(conn)
-    print("✅ Cleaning competitions...")
-    time.sleep(1)
-    clean_game_events(conn)
-    print("✅ Cleaning game_events...")
-    time.sleep(1)
-    clean_game_lineups(conn)
-    print("✅ Cleaning game_lineups...")
-    time.sleep(1)
-    clean_games(conn)
-    print("✅ Cleaning games...")
-    time.sleep(1)
-    clean_player_valuations(conn)
-    print("✅ Cleaning player_valuations...")
-    time.sleep(1)
-    clean_players(conn)
-    print("✅ Cleaning players...")
-    time.sleep(1)
-    clean_transfers(conn)
-    print("✅ Cleaning transfers...")
-    time.sleep(1)
+    parser = argparse.ArgumentParser(description="Clean Football.db into clean_football.db")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--tables', nargs='+', choices=list(STAGES), help="only run these tables")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only clean rows since the last run's high-water marks")
+    parser.add_argument('--verify', action='store_true',
+                        help="rebuild from scratch into a side database and compare with clean_football.db")
+    parser.add_argument('--export', choices=['duckdb', 'parquet'],
+                        help="also write a columnar copy of the clean tables")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="report the peak memory of each cleaning stage")
+    args = parser.parse_args()
 
+    print(db_path)
+    clean_db = os.path.join(db_path, 'clean_football.db')
+    run_clean(clean_db, workers=args.workers, tables=args.tables, incremental=args.incremental,
+              profile_memory=args.profile_memory)
+    if args.export:
+        export_columnar(clean_db, args.export)
+
+    if args.verify:
+        verify_db = os.path.join(db_path, 'clean_football.verify.db')
+        if os.path.exists(verify_db):
+            os.remove(verify_db)
+        run_clean(verify_db, workers=args.workers, tables=args.tables)
+        tables = [name for name in args.tables or STAGES if not STAGES[name].get('local')]
+        ok = compare_databases(clean_db, verify_db, tables)
+        os.remove(verify_db)
+        if not ok:
+            raise SystemExit(1)
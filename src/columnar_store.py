@@ -0,0 +1,185 @@
+import os
+import time
+import shutil
+import sqlite3
+import argparse
+import duckdb
+import pandas as pd
+from settings import *
+
+DUCKDB_PATH = os.path.join(db_path, 'clean_football.duckdb')
+PARQUET_PATH = os.path.join(db_path, 'parquet')
+CHUNK_SIZE = 200_000
+
+# SQLite declared type -> DuckDB type, first match wins (SQLite's own affinity rules,
+# with dates kept as dates)
+DUCKDB_TYPES = (
+    ('TIMESTAMP', 'TIMESTAMP'),
+    ('DATETIME', 'TIMESTAMP'),
+    ('DATE', 'DATE'),
+    ('INT', 'BIGINT'),
+    ('CHAR', 'VARCHAR'),
+    ('CLOB', 'VARCHAR'),
+    ('TEXT', 'VARCHAR'),
+    ('REAL', 'DOUBLE'),
+    ('FLOA', 'DOUBLE'),
+    ('DOUB', 'DOUBLE'),
+    ('NUM', 'DOUBLE'),
+)
+
+# Parquet partitioning: table -> (derived columns, partition columns).
+# season = first year of the football season (starts in July), as games.season
+SEASON_SQL = "CAST(year(date) - (month(date) < 7)::INTEGER AS INTEGER) AS season"
+PARTITIONS = {
+    'appearances': ([SEASON_SQL], ['season', 'competition_id']),
+    'game_events': ([SEASON_SQL], ['season']),
+    'game_lineups': ([SEASON_SQL], ['season']),
+    'games': ([], ['season', 'competition_id']),
+    'player_season_stats': ([], ['season_start']),
+}
+
+# --------------------------------------------------
+# Export
+# --------------------------------------------------
+
+def _duckdb_type(col_type):
+    col_type = (col_type or '').upper()
+    return next((duck for sqlite_type, duck in DUCKDB_TYPES if sqlite_type in col_type), 'VARCHAR')
+
+def _columns(sqlite_conn, table):
+    return [
+        (name, _duckdb_type(col_type))
+        for _, name, col_type, *_ in sqlite_conn.execute(f'PRAGMA table_info("{table}")')
+    ]
+
+def copy_table(sqlite_conn, con, table, chunksize=CHUNK_SIZE):
+    columns = _columns(sqlite_conn, table)
+    col_defs = ', '.join(f'"{c}" {t}' for c, t in columns)
+    con.execute(f'CREATE TABLE "{table}" ({col_defs})')
+    # TRY_CAST: placeholders such as '-' in a date column become NULL instead of failing the copy
+    casts = ', '.join(f'TRY_CAST("{c}" AS {t})' for c, t in columns)
+    for chunk in pd.read_sql(f'SELECT * FROM "{table}"', sqlite_conn, chunksize=chunksize):
+        con.register('chunk', chunk)
+        con.execute(f'INSERT INTO "{table}" SELECT {casts} FROM chunk')
+        con.unregister('chunk')
+
+def export_duckdb(sqlite_path, duckdb_path=DUCKDB_PATH):
+    tmp_path = f'{duckdb_path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    sqlite_conn = sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True)
+    tables = [row[0] for row in sqlite_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\' "
+        "AND name NOT LIKE 'sqlite_%'"
+    )]
+    con = duckdb.connect(tmp_path)
+    for table in tables:
+        start = time.perf_counter()
+        copy_table(sqlite_conn, con, table)
+        print(f"🦆 {table}: {time.perf_counter() - start:.1f}s")
+    con.close()
+    sqlite_conn.close()
+
+    os.replace(tmp_path, duckdb_path)
+    print(f"✅ DuckDB export: {duckdb_path} ({os.path.getsize(duckdb_path) / 1024 ** 2:,.1f} MB)")
+    return duckdb_path
+
+def export_parquet(duckdb_path=DUCKDB_PATH, out_dir=PARQUET_PATH):
+    tmp_dir = f'{out_dir}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    con = duckdb.connect(duckdb_path, read_only=True)
+    tables = [row[0] for row in con.execute("SELECT table_name FROM duckdb_tables()").fetchall()]
+    for table in tables:
+        derived, partition_by = PARTITIONS.get(table, ([], []))
+        select = ', '.join(['*'] + derived)
+        if partition_by:
+            target = os.path.join(tmp_dir, table)
+            options = f"FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY ({', '.join(partition_by)})"
+        else:
+            target = os.path.join(tmp_dir, f'{table}.parquet')
+            options = "FORMAT PARQUET, COMPRESSION ZSTD"
+        con.execute(f"COPY (SELECT {select} FROM \"{table}\") TO '{target}' ({options})")
+    con.close()
+
+    # swap the whole directory so readers never see a half-written export
+    old_dir = f'{out_dir}.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(out_dir) for f in files)
+    print(f"✅ Parquet export: {out_dir} ({size / 1024 ** 2:,.1f} MB)")
+    return out_dir
+
+def export_columnar(sqlite_path, fmt='duckdb'):
+    # fmt: 'duckdb' or 'parquet' (parquet is written from the DuckDB copy)
+    duckdb_path = export_duckdb(sqlite_path)
+    if fmt == 'parquet':
+        return export_parquet(duckdb_path)
+    return duckdb_path
+
+# --------------------------------------------------
+# Read API
+# --------------------------------------------------
+
+_con = None
+
+def connect_columnar(fmt=None):
+    """Read-only DuckDB connection over the columnar copy, shared by the process."""
+    global _con
+    if _con is None:
+        fmt = fmt or DATA_BACKEND
+        if fmt == 'parquet':
+            con = duckdb.connect()
+            for entry in sorted(os.listdir(PARQUET_PATH)):
+                path = os.path.join(PARQUET_PATH, entry)
+                if os.path.isdir(path):
+                    source = f"read_parquet('{path}/**/*.parquet', hive_partitioning = true)"
+                else:
+                    source = f"read_parquet('{path}')"
+                con.execute(f'CREATE VIEW "{os.path.splitext(entry)[0]}" AS SELECT * FROM {source}')
+        else:
+            con = duckdb.connect(DUCKDB_PATH, read_only=True)
+        _con = con
+    return _con
+
+
+def benchmark(sqlite_path, fmt='duckdb'):
+    # Projection + predicate scan over a large table, served by no index on either store
+    sql = """
+        SELECT club_id, type, COUNT(*) AS events
+        FROM game_events
+        WHERE date >= '2021-07-01' AND date < '2022-07-01'
+        GROUP BY club_id, type
+    """
+    with sqlite3.connect(sqlite_path) as conn:
+        pd.read_sql(sql, conn)  # warm up
+        start = time.perf_counter()
+        pd.read_sql(sql, conn)
+        sqlite_time = time.perf_counter() - start
+
+    con = connect_columnar(fmt)
+    con.execute(sql).df()  # warm up
+    start = time.perf_counter()
+    con.execute(sql).df()
+    columnar_time = time.perf_counter() - start
+
+    print(f"SQLite  : {sqlite_time * 1000:,.1f} ms ({os.path.getsize(sqlite_path) / 1024 ** 2:,.1f} MB)")
+    print(f"{fmt:8}: {columnar_time * 1000:,.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export clean_football.db to DuckDB / Parquet")
+    parser.add_argument('--format', choices=['duckdb', 'parquet'], default='duckdb')
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    sqlite_path = os.path.join(db_path, 'clean_football.db')
+    export_columnar(sqlite_path, args.format)
+    if args.benchmark:
+        benchmark(sqlite_path, args.format)
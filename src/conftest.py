@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import pytest
+
+# read by src/llm_chat_engine.py at import: tests run the local stub model (src/fake_llm.py)
+os.environ['CHAT_LLM'] = 'fake'
+
+PLAYERS = [(28003, 'Lionel Messi', 583, 'Paris Saint-Germain', 'Attack', 35_000_000),
+           (418560, 'Erling Haaland', 281, 'Manchester City', 'Attack', 180_000_000),
+           (8198, 'Cristiano Ronaldo', 985, 'Manchester United', 'Attack', 15_000_000)]
+CLUBS = [(583, 'Paris Saint-Germain'), (281, 'Manchester City'), (985, 'Manchester United'), (31, 'Liverpool FC'),
+         (131, 'FC Barcelona')]
+# game_id, player_id, player_name, player_club_id, date, goals, assists
+APPEARANCES = [(1, 28003, 'Lionel Messi', 583, '2021-09-01 00:00:00', 1, 0),
+               (2, 28003, 'Lionel Messi', 583, '2022-03-01 00:00:00', 2, 3),
+               (5, 28003, 'Lionel Messi', 131, '2020-10-01 00:00:00', 5, 1),
+               (3, 418560, 'Erling Haaland', 281, '2023-02-01 00:00:00', 2, 1),
+               (4, 8198, 'Cristiano Ronaldo', 985, '2021-12-01 00:00:00', 1, 0)]
+# player_id, player_name, season_start, season, player_club_id, club_name, matches, goals, assists, minutes_played
+SEASON_STATS = [(28003, 'Lionel Messi', 2020, '2020/21', 131, 'FC Barcelona', 30, 25, 9, 2600),
+                (28003, 'Lionel Messi', 2021, '2021/22', 583, 'Paris Saint-Germain', 26, 6, 14, 2100),
+                (28003, 'Lionel Messi', 2022, '2022/23', 583, 'Paris Saint-Germain', 32, 16, 16, 2700)]
+# player_id, player_name, season_start, season, club_id, position, matches
+SEASON_POSITIONS = [(28003, 'Lionel Messi', 2020, '2020/21', 131, 'Right Winger', 30),
+                    (28003, 'Lionel Messi', 2021, '2021/22', 583, 'Right Winger', 20),
+                    (28003, 'Lionel Messi', 2022, '2022/23', 583, 'Centre-Forward', 32)]
+
+
+def make_clean_db(path):
+    """A tiny clean_football.db with the tables / registry columns the chat pipeline and pages read."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE players (player_id INTEGER, name TEXT, current_club_id INTEGER, "
+                 "current_club_name TEXT, position TEXT, market_value_in_eur REAL)")
+    conn.execute("CREATE TABLE clubs (club_id INTEGER, name TEXT)")
+    conn.execute("CREATE TABLE appearances (appearance_id TEXT, game_id INTEGER, player_id INTEGER, "
+                 "player_club_id INTEGER, player_current_club_id INTEGER, date TEXT, player_name TEXT, "
+                 "competition_id TEXT, yellow_cards INTEGER, red_cards INTEGER, goals INTEGER, assists INTEGER, "
+                 "minutes_played INTEGER)")
+    conn.execute("CREATE TABLE player_season_stats (player_id INTEGER, player_name TEXT, season_start INTEGER, "
+                 "season TEXT, player_club_id INTEGER, club_name TEXT, matches INTEGER, goals INTEGER, "
+                 "assists INTEGER, minutes_played INTEGER, yellow_cards INTEGER, red_cards INTEGER, "
+                 "first_date TEXT, last_date TEXT)")
+    conn.execute("CREATE TABLE player_season_positions (player_id INTEGER, player_name TEXT, season_start INTEGER, "
+                 "season TEXT, club_id INTEGER, position TEXT, matches INTEGER)")
+    conn.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?, ?)", PLAYERS)
+    conn.executemany("INSERT INTO clubs VALUES (?, ?)", CLUBS)
+    conn.executemany(
+        "INSERT INTO appearances VALUES (?, ?, ?, ?, ?, ?, ?, 'GB1', 0, 0, ?, ?, 90)",
+        [(f"{game_id}_{player_id}", game_id, player_id, club_id, club_id, date, name, goals, assists)
+         for game_id, player_id, name, club_id, date, goals, assists in APPEARANCES],
+    )
+    conn.executemany("INSERT INTO player_season_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 2, 0, NULL, NULL)",
+                     SEASON_STATS)
+    conn.executemany("INSERT INTO player_season_positions VALUES (?, ?, ?, ?, ?, ?, ?)", SEASON_POSITIONS)
+    conn.execute("CREATE INDEX idx_appearances_player_id ON appearances (player_id, date)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope='session')
+def clean_db(tmp_path_factory):
+    """The tiny database, served by get_repository() for the whole test session."""
+    from src.repository import use_database
+    path = make_clean_db(str(tmp_path_factory.mktemp('db') / 'clean_football.db'))
+    use_database(path, backend='sqlite')
+    return path
+
+@pytest.fixture(scope='session')
+def chat_llm(clean_db):
+    """The stub model of the chat chain, over the tiny database, with short delays."""
+    from src.llm_chat_engine import get_llm_chain
+    llm = get_llm_chain().llm_chain.llm
+    llm.first_token_delay, llm.token_delay = 0.05, 0.005
+    return llm
@@ -0,0 +1,135 @@
+import time
+import sqlite3
+from contextlib import contextmanager
+import pandas as pd
+
+BATCH_SIZE = 50_000
+TMP_SUFFIX = '__new'
+
+WRITER_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -256000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def _batches(df, batch_size):
+    # sqlite3 cannot bind numpy scalars / NaN, convert one batch at a time to keep memory flat
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size].copy()
+        for col in batch.columns:
+            if pd.api.types.is_datetime64_any_dtype(batch[col]):
+                # same text as pandas.to_sql writes for timestamps
+                batch[col] = batch[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        batch = batch.astype(object).where(batch.notna(), None)
+        yield list(batch.itertuples(index=False, name=None))
+
+
+class BulkWriter:
+    """Single writer of a SQLite database.
+
+    Every table is written with executemany batches on one connection. A replaced table
+    is built under a temporary name and swapped in with its state in one short
+    transaction, so a crash leaves the previous version of the table in place.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        # autocommit mode, transactions are opened explicitly
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        for pragma in WRITER_PRAGMAS:
+            self.conn.execute(pragma)
+        self._drop_leftovers()
+
+    def _drop_leftovers(self):
+        # tables of a build that crashed before its swap
+        leftovers = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?", (f'%{TMP_SUFFIX}',)
+        ).fetchall()
+        for (name,) in leftovers:
+            self.conn.execute(f'DROP TABLE "{name}"')
+
+    @contextmanager
+    def _transaction(self, mode=''):
+        self.conn.execute(f"BEGIN {mode}")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _insert(self, name, df):
+        placeholders = ', '.join('?' * len(df.columns))
+        sql = f'INSERT INTO "{name}" VALUES ({placeholders})'
+        for rows in _batches(df, self.batch_size):
+            self.conn.executemany(sql, rows)
+
+    def _log(self, name, rows, start):
+        elapsed = time.perf_counter() - start
+        print(f"💾 {name}: wrote {rows:,} rows in {elapsed:.1f}s "
+              f"({rows / elapsed if elapsed else 0:,.0f} rows/sec)")
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def replace_table(self, name, df, extra_statements=()):
+        """Rebuild table `name` from df. extra_statements: [(sql, params)] committed with the swap."""
+        start = time.perf_counter()
+        tmp_name = f'{name}{TMP_SUFFIX}'
+
+        with self._transaction():
+            self.conn.execute(f'DROP TABLE IF EXISTS "{tmp_name}"')
+            self.conn.execute(pd.io.sql.get_schema(df, tmp_name, con=self.conn))
+            self._insert(tmp_name, df)
+
+        with self._transaction('IMMEDIATE'):
+            self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            self.conn.execute(f'ALTER TABLE "{tmp_name}" RENAME TO "{name}"')
+            for sql, params in extra_statements:
+                self.conn.execute(sql, params)
+        self._log(name, len(df), start)
+
+    def replace_table_from_query(self, name, sql, params=()):
+        """Rebuild table `name` from a SELECT over tables already in the database."""
+        start = time.perf_counter()
+        tmp_name = f'{name}{TMP_SUFFIX}'
+
+        with self._transaction():
+            self.conn.execute(f'DROP TABLE IF EXISTS "{tmp_name}"')
+            self.conn.execute(f'CREATE TABLE "{tmp_name}" AS {sql}', params)
+
+        with self._transaction('IMMEDIATE'):
+            self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            self.conn.execute(f'ALTER TABLE "{tmp_name}" RENAME TO "{name}"')
+        rows = self.conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+        self._log(name, rows, start)
+
+    def upsert_table(self, name, df, window_col=None, since=None, key=None, extra_statements=()):
+        """Replace the rows of `name` dated >= since and/or sharing a key with df, in one transaction."""
+        start = time.perf_counter()
+        with self._transaction('IMMEDIATE'):
+            if window_col:
+                self.conn.execute(f'DELETE FROM "{name}" WHERE {window_col} >= ?', (since,))
+            if key:
+                key_cols = ', '.join(key)
+                self.conn.execute("DROP TABLE IF EXISTS temp._incoming_keys")
+                self.conn.execute(pd.io.sql.get_schema(df[key], '_incoming_keys', con=self.conn)
+                                  .replace('CREATE TABLE', 'CREATE TEMP TABLE', 1))
+                self._insert('_incoming_keys', df[key])
+                self.conn.execute(
+                    f'DELETE FROM "{name}" WHERE ({key_cols}) IN (SELECT {key_cols} FROM temp._incoming_keys)'
+                )
+                self.conn.execute("DROP TABLE temp._incoming_keys")
+            self._insert(name, df)
+            for sql, params in extra_statements:
+                self.conn.execute(sql, params)
+        self._log(name, len(df), start)
+
+    def close(self):
+        # Fold the WAL back so the database ships as a single file
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("PRAGMA journal_mode = DELETE")
+        self.conn.close()
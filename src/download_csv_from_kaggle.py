@@ -1,11 +1,31 @@
 import os
+import sys
 import glob
+import time
 import shutil
-import kagglehub
 import sqlite3
+import argparse
+import multiprocessing
+import kagglehub
 import pandas as pd
 from settings import *
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CHUNK_SIZE = 200_000
+
+# Raw database is rebuilt from the CSVs on every run, so durability can be traded for speed
+FAST_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -200000",
+    "PRAGMA locking_mode = EXCLUSIVE",
+)
+
 def download_raw_data_csv():
     # Download latest version
     path = kagglehub.dataset_download("davidcariboo/player-scores")
@@ -26,6 +46,130 @@ def create_table_in_sqlite(path):
         df = pd.read_csv(csv_file)
         df.to_sql(table_name, conn, if_exists='replace', index=False)
 
+# --------------------------------------------------
+# Streaming ingest
+# --------------------------------------------------
+
+SQL_TYPE_RANK = {'INTEGER': 0, 'REAL': 1, 'TEXT': 2}
+
+def _chunk_type(values):
+    # sqlite type of the non-null values of one chunk, None when they are all null
+    values = values.dropna()
+    if values.empty:
+        return None
+    if values.dtype.kind in 'iub':
+        return 'INTEGER'
+    if values.dtype.kind == 'f':
+        # an integer column with nulls is read as float
+        return 'INTEGER' if (values == values.round()).all() else 'REAL'
+    return 'TEXT'
+
+def infer_schema(csv_file, chunksize=CHUNK_SIZE):
+    # {column: sqlite type} over the whole file, one chunk at a time: the widest type seen
+    # in any chunk wins, a column that is null everywhere is TEXT
+    types = {}
+    for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+        for col in chunk.columns:
+            seen = _chunk_type(chunk[col])
+            current = types.get(col)
+            if current is None or seen and SQL_TYPE_RANK[seen] > SQL_TYPE_RANK[current]:
+                types[col] = seen
+    return {col: sql_type or 'TEXT' for col, sql_type in types.items()}
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+def _chunk_rows(chunk):
+    # numpy scalars cannot be bound by sqlite3, NaN must become NULL
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    return chunk.itertuples(index=False, name=None)
+
+def load_csv_streaming(csv_file, target_db, schema=None, chunksize=CHUNK_SIZE):
+    table_name = os.path.splitext(os.path.basename(csv_file))[0]
+    schema = schema or infer_schema(csv_file, chunksize)
+    start = time.perf_counter()
+
+    conn = sqlite3.connect(target_db)
+    for pragma in FAST_LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+    cols = ', '.join(f'"{col}" {sql_type}' for col, sql_type in schema.items())
+    placeholders = ', '.join('?' * len(schema))
+    insert_sql = f'INSERT INTO "{table_name}" VALUES ({placeholders})'
+
+    # Text columns are read as object so every chunk agrees on the schema,
+    # numeric columns are coerced by the declared sqlite affinity
+    text_cols = {col: object for col, sql_type in schema.items() if sql_type == 'TEXT'}
+
+    rows = 0
+    with conn:
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        conn.execute(f'CREATE TABLE "{table_name}" ({cols})')
+        for chunk in pd.read_csv(csv_file, usecols=list(schema), dtype=text_cols, chunksize=chunksize):
+            conn.executemany(insert_sql, _chunk_rows(chunk[list(schema)]))
+            rows += len(chunk)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'table': table_name,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def _load_to_staging(args):
+    csv_file, schema, chunksize = args
+    table_name = os.path.splitext(os.path.basename(csv_file))[0]
+    staging_db = os.path.join(db_path, f'Football.{table_name}.staging.db')
+    if os.path.exists(staging_db):
+        os.remove(staging_db)
+    stats = load_csv_streaming(csv_file, staging_db, schema=schema, chunksize=chunksize)
+    stats['staging_db'] = staging_db
+    return stats
+
+def merge_staging(conn, stats):
+    # Copy a table loaded by a worker into Football.db and drop its staging file
+    table_name = stats['table']
+    conn.execute("ATTACH DATABASE ? AS staging", (stats['staging_db'],))
+    create_sql = conn.execute(
+        "SELECT sql FROM staging.sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+    ).fetchone()[0]
+    with conn:
+        conn.execute(f'DROP TABLE IF EXISTS main."{table_name}"')
+        conn.execute(create_sql)
+        conn.execute(f'INSERT INTO main."{table_name}" SELECT * FROM staging."{table_name}"')
+    conn.execute("DETACH DATABASE staging")
+    os.remove(stats['staging_db'])
+
+def create_table_in_sqlite_streaming(path, schemas=None, chunksize=CHUNK_SIZE, workers=None):
+    # schemas: optional {table_name: {column: sqlite type}}, inferred from the file when missing
+    schemas = schemas or {}
+    csv_files = sorted(glob.glob(f"{path}/*.csv"), key=os.path.getsize, reverse=True)
+    jobs = [
+        (csv_file, schemas.get(os.path.splitext(os.path.basename(csv_file))[0]), chunksize)
+        for csv_file in csv_files
+    ]
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+
+    conn = sqlite3.connect(os.path.join(db_path, 'Football.db'))
+    conn.execute("PRAGMA synchronous = OFF")
+
+    # Every file is loaded by its own process into its own staging database (no write lock
+    # contention), one task per process so ru_maxrss is the peak of that table alone
+    with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+        for stats in pool.imap_unordered(_load_to_staging, jobs):
+            merge_staging(conn, stats)
+            rss = f"{stats['peak_rss_mb']:.0f} MB" if stats['peak_rss_mb'] is not None else "-"
+            print(f"✅ {stats['table']}: {stats['rows']:,} rows in {stats['seconds']:.1f}s "
+                  f"({stats['rows_per_sec']:,.0f} rows/sec, peak RSS {rss})")
+    conn.close()
+
 def delete_raw_local_file(path):
     if os.path.isfile(path):
         os.remove(path)
@@ -37,7 +181,19 @@ def delete_raw_local_file(path):
 
 
 if __name__ == "__main__":
-    path = download_raw_data_csv()
+    parser = argparse.ArgumentParser(description="Download the Kaggle CSVs and load them into Football.db")
+    parser.add_argument('--path', help="use already downloaded CSVs instead of downloading")
+    parser.add_argument('--stream', action='store_true', help="chunked, parallel ingest")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--keep-raw', action='store_true', help="do not delete the downloaded CSVs")
+    args = parser.parse_args()
+
+    path = args.path or download_raw_data_csv()
     # path = r'C:\Users\ASUS\.cache\kagglehub\datasets\davidcariboo\player-scores\versions\602'
-    create_table_in_sqlite(path)
-    delete_raw_local_file(path)
+    if args.stream:
+        create_table_in_sqlite_streaming(path, chunksize=args.chunksize, workers=args.workers)
+    else:
+        create_table_in_sqlite(path)
+    if not args.keep_raw and not args.path:
+        delete_raw_local_file(path)
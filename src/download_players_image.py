@@ -1,67 +1,204 @@
-import sqlite3
-import pandas as pd
-import wikipedia
+# Player photos from Wikipedia for the Bio page. Players (one per player_id) are looked up
+# on a thread pool through the MediaWiki API: one search query returns the lead image of
+# the player's page, downloaded to images/player/<player_id>.<ext>. Requests are rate
+# limited per host and retried with backoff, and every finished player is appended to the
+# manifest at once, so an interrupted run resumes where it stopped.
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-import os
+from settings import *
+from src.repository import Repository
+
+DB_PATH = os.path.join(db_path, 'clean_football.db')
+API_URL = os.getenv("WIKI_API_URL", "https://en.wikipedia.org/w/api.php")
+MANIFEST_NAME = 'manifest.jsonl'
+USER_AGENT = "DeepPlayr/1.0 (football player image downloader)"   # required by the Wikimedia API policy
+WORKERS = 8
+RATE_PER_HOST = 5.0           # requests a second to each host (API, upload.wikimedia.org)
+RETRIES = 4
+BACKOFF = 1.0                 # seconds before the first retry, doubled after each
+TIMEOUT = 10
+THUMB_SIZE = 500              # px, the page image thumbnail instead of the full-size original
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IMAGE_TYPES = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp', 'image/gif': '.gif'}
 
-DB_PATH = r"D:\Data Project\exercise\Football\database\clean_football.db"
 
 def get_player_name():
-    conn = sqlite3.connect(DB_PATH)
-    sql = "SELECT player_id, name FROM players"
-    df = pd.read_sql(sql, conn)
-    conn.close()
-    return df
-
-def download_from_wikipedia(name, save_dir="images"):
-    wikipedia.set_lang("en")
-    try:
-        search_results = wikipedia.search(name)
-        if not search_results:
-            print(f"❌ Not found: {name}")
-            return None
+    # most valuable players first, so a --limit run covers the players looked up most
+    df = Repository(DB_PATH, backend='sqlite').players(['player_id', 'name', 'market_value_in_eur'])
+    df = df.dropna(subset=['name']).drop_duplicates('player_id')
+    return df.sort_values('market_value_in_eur', ascending=False, na_position='last')
+
+
+class HostRateLimiter:
+    """At most `rate` requests a second to each host, shared by every thread."""
+
+    def __init__(self, rate=RATE_PER_HOST):
+        self.interval = 1.0 / rate
+        self._next = {}          # host -> earliest start of its next request
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Manifest:
+    """player_id -> last outcome (status 'ok' / 'not_found' / 'error'), one JSON line per finished player."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue    # last line cut off by a crash
+                    self.entries[entry['player_id']] = entry
+
+    def done(self, player_id, retry_missing=False):
+        entry = self.entries.get(player_id)
+        if entry is None:
+            return False
+        if entry['status'] == 'ok':
+            return os.path.exists(entry['path'])
+        return entry['status'] == 'not_found' and not retry_missing
+
+    def add(self, entry):
+        with self._lock:
+            self.entries[entry['player_id']] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
 
+
+class ImageDownloader:
+    def __init__(self, api_url=API_URL, out_dir=player_images_path, rate=RATE_PER_HOST, retries=RETRIES,
+                 backoff=BACKOFF, timeout=TIMEOUT):
+        self.api_url = api_url
+        self.out_dir = str(out_dir)
+        self.limiter = HostRateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        # requests.Session is not thread-safe: one per worker thread, keeping its connections
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+            self._local.session.headers['User-Agent'] = USER_AGENT
+        return self._local.session
+
+    def get(self, url, params=None):
+        """GET with the host's rate limit; connection errors, 429 and 5xx are retried with backoff."""
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            retry_after = 0.0
+            try:
+                response = self._session().get(url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} for {response.url}", response=response)
+                try:
+                    retry_after = float(response.headers.get('Retry-After', 0))
+                except ValueError:
+                    pass    # HTTP-date form: use the backoff
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            time.sleep(max(retry_after, self.backoff * 2 ** attempt * random.uniform(1, 1.5)))
+
+    def find_image(self, name):
+        """(page title, image url) of the best search hit for a player, (None, None) without one."""
+        data = self.get(self.api_url, params={
+            'action': 'query', 'format': 'json', 'formatversion': 2,
+            'generator': 'search', 'gsrsearch': f'{name} footballer', 'gsrlimit': 1,
+            'prop': 'pageimages', 'piprop': 'thumbnail', 'pithumbsize': THUMB_SIZE,
+        }).json()
+        pages = data.get('query', {}).get('pages', [])
+        if not pages:
+            return None, None
+        return pages[0].get('title'), pages[0].get('thumbnail', {}).get('source')
+
+    def download(self, player_id, name):
+        """Manifest entry of one player, after saving its image when one is found."""
+        entry = {'player_id': int(player_id), 'name': name, 'status': 'not_found', 'page': None,
+                 'image_url': None, 'path': None, 'error': None, 'time': datetime.now().isoformat(timespec='seconds')}
         try:
-            page = wikipedia.page(search_results[0], auto_suggest=False)
-        except wikipedia.DisambiguationError as e:
-            print(f"⚠️ Ambiguous for {name}, using: {e.options[0]}")
-            page = wikipedia.page(e.options[0])
-
-        # เลือกรูป usable
-        images = [img for img in page.images if img.lower().endswith((".jpg", ".jpeg", ".png"))]
-        if not images:
-            print(f"❌ No usable image for {name}")
-            return None
-
-        image_url = images[0]
-        response = requests.get(image_url, timeout=10)
-
-        if response.status_code == 200:
-            os.makedirs(save_dir, exist_ok=True)
-            file_path = os.path.join(save_dir, f"{name.replace(' ', '_')}.jpg")
-            with open(file_path, "wb") as f:
+            entry['page'], entry['image_url'] = self.find_image(name)
+            if entry['image_url'] is None:
+                return entry
+            response = self.get(entry['image_url'])
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+            if content_type not in IMAGE_TYPES:
+                raise ValueError(f"not an image: {content_type or 'no content type'}")
+            path = os.path.join(self.out_dir, f"{int(player_id)}{IMAGE_TYPES[content_type]}")
+            # written aside and renamed, so a crash never leaves a partial image behind
+            with open(f"{path}.part", 'wb') as f:
                 f.write(response.content)
-            print(f"✅ {name} → {file_path}")
-            return file_path
-        else:
-            print(f"❌ Failed to download image for {name}")
-            return None
+            os.replace(f"{path}.part", path)
+            entry.update(status='ok', path=path)
+        except Exception as e:
+            entry.update(status='error', error=f"{type(e).__name__}: {e}")
+        return entry
 
-    except Exception as e:
-        print(f"❌ Error for {name}: {e}")
-        return None
 
-def main():
-    df = get_player_name()
-    downloaded = []
+def download_all(df_players, downloader, manifest, workers=WORKERS, retry_missing=False):
+    """Download the players not yet in the manifest; returns the count of each status."""
+    todo = [(row.player_id, row.name) for row in df_players.itertuples(index=False)
+            if not manifest.done(int(row.player_id), retry_missing)]
+    print(f"🖼️ {len(todo):,} players to look up ({len(df_players) - len(todo):,} already in the manifest)")
+    counts = {'ok': 0, 'not_found': 0, 'error': 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(downloader.download, player_id, name) for player_id, name in todo]
+        for future in as_completed(futures):
+            entry = future.result()
+            manifest.add(entry)
+            counts[entry['status']] += 1
+            if entry['status'] == 'ok':
+                print(f"✅ {entry['name']} → {entry['path']}")
+            elif entry['status'] == 'not_found':
+                print(f"❌ Not found: {entry['name']}")
+            else:
+                print(f"⚠️ {entry['name']}: {entry['error']}")
+    return counts
 
-    for name in df['name'].dropna().unique():
-        path = download_from_wikipedia(name)
-        if path:
-            downloaded.append((name, path))
-            print(f"✅ {name} → {path}")
 
-    pd.DataFrame(downloaded, columns=['name', 'image_path']).to_csv("image_paths.csv", index=False)
+def main():
+    parser = argparse.ArgumentParser(description="Download player images from Wikipedia")
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--rate', type=float, default=RATE_PER_HOST, help="requests a second to each host")
+    parser.add_argument('--limit', type=int, help="only the N most valuable players")
+    parser.add_argument('--retry-missing', action='store_true', help="look up players not found last time again")
+    parser.add_argument('--api-url', default=API_URL, help="MediaWiki API endpoint (a local stub in tests)")
+    parser.add_argument('--out-dir', default=str(player_images_path))
+    args = parser.parse_args()
+
+    df = get_player_name()
+    if args.limit:
+        df = df.head(args.limit)
+    os.makedirs(args.out_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(args.out_dir, MANIFEST_NAME))
+    downloader = ImageDownloader(args.api_url, args.out_dir, rate=args.rate)
+    start = time.perf_counter()
+    counts = download_all(df, downloader, manifest, args.workers, args.retry_missing)
+    print(f"🏁 {counts} in {time.perf_counter() - start:.1f}s, manifest: {manifest.path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,237 @@
+# Offline evaluation of the chat pipeline. Runs the question set of src/eval_questions.json
+# through the same steps as the chat page (schema selection + prompt, SQL from the model,
+# guarded SQL run, streamed answer) in parallel against a fixed copy of clean_football.db,
+# and writes one JSON report per run: the generated SQL of every question, whether its
+# result matches the reference query's, and the seconds spent in each step.
+#
+#   CI, no key:   python src/eval_harness.py --llm fake --db /path/to/fixture/clean_football.db
+#   real model:   python src/eval_harness.py --llm openrouter --compare database/eval/<previous>.json
+#
+# The fake model (src/fake_llm.py) "generates" each question's reference_sql, or its
+# fake_sql when one is given (a known wrong query, so the correctness check is exercised).
+import re
+import json
+import time
+import hashlib
+import itertools
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from settings import *
+
+QUESTIONS_PATH = os.path.join(project_root, 'src', 'eval_questions.json')
+REPORTS_PATH = os.path.join(db_path, 'eval')
+STAGES = ('prompt', 'model_sql', 'sql', 'answer', 'total')
+ORDER_BY_RE = re.compile(r'\border\s+by\b', re.IGNORECASE)
+
+
+def load_questions(path=QUESTIONS_PATH):
+    with open(path, encoding='utf-8') as f:
+        questions = json.load(f)
+    ids = [item['id'] for item in questions]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate question ids in {path}")
+    return questions
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def _value(value):
+    # 61 == 61.0 == '61', 180.0000001 == 180.0; names compared as written
+    if value is None:
+        return None
+    try:
+        return round(float(value), 4)
+    except (TypeError, ValueError):
+        return str(value).strip()
+
+def result_rows(df):
+    return [tuple(_value(v) for v in row) for row in df.itertuples(index=False, name=None)]
+
+def same_result(expected, actual, ordered=False):
+    """Rows equal value for value, in order only when the reference sorts.
+
+    Column names are ignored and the generated query may return extra columns
+    (the router's assists next to the goals asked for), as long as some of its columns match.
+    """
+    if len(expected) != len(actual):
+        return False
+    if not expected:
+        return True
+    for columns in itertools.permutations(range(len(actual[0])), len(expected[0])):
+        projected = [tuple(row[i] for i in columns) for row in actual]
+        if projected == expected if ordered else sorted(projected, key=repr) == sorted(expected, key=repr):
+            return True
+    return False
+
+
+def evaluate(item, expected, use_router=False):
+    """Report row of one question: generated SQL, status (correct / wrong / error) and step timings."""
+    from src.repository import get_repository
+    from src.llm_chat_engine import prepare, sql_input, answer_input, clean_sql, message_text, SQL_STOP
+    question = item['question']
+    row = {'id': item['id'], 'question': question, 'source': 'llm', 'sql': None, 'status': 'error',
+           'error': None, 'answer': None, 'timings': {}}
+    timings = row['timings']
+    start = stage = time.perf_counter()
+
+    def lap(name, since):
+        now = time.perf_counter()
+        timings[name] = round(now - since, 4)
+        return now
+
+    try:
+        routed = None
+        if use_router:
+            from src.intent_router import route
+            routed = route(question)
+        if routed:
+            row.update(source='router', sql=routed['sql'], answer=routed['result'])
+        else:
+            llm, prompt, db, table_info = prepare(question)
+            stage = lap('prompt', stage)
+            row['sql'] = clean_sql(llm.invoke(prompt.format(input=sql_input(question), table_info=table_info),
+                                              stop=SQL_STOP))
+            stage = lap('model_sql', stage)
+            result = db.run(row['sql'])
+            stage = lap('sql', stage)
+            row['answer'] = ''.join(message_text(chunk) for chunk in llm.stream(
+                prompt.format(input=answer_input(question, row['sql'], result), table_info=table_info)))
+            lap('answer', stage)
+        lap('total', start)
+
+        # untimed second run of the generated SQL, for its rows
+        df, truncated = get_repository().guarded_query(row['sql'], name='eval_check')
+        ordered = bool(ORDER_BY_RE.search(item['reference_sql']))
+        row['status'] = 'correct' if not truncated and same_result(expected, result_rows(df), ordered) else 'wrong'
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+        timings.setdefault('total', round(time.perf_counter() - start, 4))
+    return row
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 4) if values else None
+
+def summarize(rows, wall):
+    statuses = [row['status'] for row in rows]
+    summary = {
+        'questions': len(rows),
+        'correct': statuses.count('correct'),
+        'wrong': statuses.count('wrong'),
+        'errors': statuses.count('error'),
+        'accuracy': round(statuses.count('correct') / len(rows), 4) if rows else 0.0,
+        'routed': sum(row['source'] == 'router' for row in rows),
+        'wall_seconds': round(wall, 3),
+        'latency': {},
+    }
+    for stage in STAGES:
+        values = [row['timings'][stage] for row in rows if stage in row['timings']]
+        if values:
+            summary['latency'][stage] = {'p50': _pct(values, 0.5), 'p95': _pct(values, 0.95),
+                                         'mean': round(sum(values) / len(values), 4)}
+    return summary
+
+def compare(report, previous):
+    """Print accuracy, latency and per-question changes against an earlier report."""
+    for key in ('questions_checksum', 'database_checksum'):
+        if report['run'][key] != previous['run'][key]:
+            print(f"⚠️ {key} differs from the previous run, results are not directly comparable")
+    old, new = previous['summary'], report['summary']
+    print(f"accuracy {old['accuracy']:.1%} -> {new['accuracy']:.1%}  "
+          f"(model {previous['run']['model']} -> {report['run']['model']}, "
+          f"prompt {previous['run']['prompt_version']} -> {report['run']['prompt_version']})")
+    for stage in STAGES:
+        if stage in old['latency'] and stage in new['latency']:
+            a, b = old['latency'][stage], new['latency'][stage]
+            print(f"  {stage:<10} p50 {a['p50']:.3f}s -> {b['p50']:.3f}s   p95 {a['p95']:.3f}s -> {b['p95']:.3f}s")
+    before = {row['id']: row['status'] for row in previous['questions']}
+    for row in report['questions']:
+        if row['id'] in before and before[row['id']] != row['status']:
+            print(f"  {row['id']}: {before[row['id']]} -> {row['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the chat pipeline on a fixed question set and database")
+    parser.add_argument('--llm', choices=['fake', 'openrouter'], default='fake',
+                        help="fake: deterministic local model (CI); openrouter: the real endpoint (.env keys)")
+    parser.add_argument('--db', default=os.path.join(db_path, 'clean_football.db'),
+                        help="database fixture the questions run against")
+    parser.add_argument('--questions', default=QUESTIONS_PATH)
+    parser.add_argument('--workers', type=int, default=4, help="questions evaluated at once")
+    parser.add_argument('--router', action='store_true', help="answer through src/intent_router.py first, as the chat page")
+    parser.add_argument('--fake-latency', action='store_true',
+                        help="keep the fake model's simulated latency (default: none, only the pipeline is timed)")
+    parser.add_argument('--out', help="report path (default: database/eval/eval-<time>-<model>.json)")
+    parser.add_argument('--compare', help="earlier report to compare this run with")
+    parser.add_argument('--min-accuracy', type=float, help="exit with status 1 below this accuracy (0-1)")
+    args = parser.parse_args()
+
+    # read by src/llm_chat_engine.py at import
+    os.environ['CHAT_LLM'] = args.llm
+    from src.repository import use_database
+    from src.llm_chat_engine import get_llm_chain, MODEL, PROMPT_VERSION
+
+    questions = load_questions(args.questions)
+    repo = use_database(args.db, backend='sqlite')
+    expected = {item['id']: result_rows(repo.query('eval_reference', item['reference_sql'])) for item in questions}
+    try:
+        chain = get_llm_chain()
+    except ValueError as e:
+        parser.error(str(e))
+    if args.llm == 'fake':
+        llm = chain.llm_chain.llm
+        llm.sql_by_question = {item['question']: item.get('fake_sql', item['reference_sql']) for item in questions}
+        if not args.fake_latency:
+            llm.first_token_delay = llm.token_delay = 0.0
+
+    print(f"🧪 {len(questions)} questions, model {MODEL}, prompt {PROMPT_VERSION}, {args.workers} workers")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        rows = list(executor.map(lambda item: evaluate(item, expected[item['id']], args.router), questions))
+    wall = time.perf_counter() - start
+
+    report = {
+        'run': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'llm': args.llm,
+            'model': MODEL,
+            'prompt_version': PROMPT_VERSION,
+            'router': args.router,
+            'workers': args.workers,
+            'database': str(args.db),
+            'database_checksum': file_checksum(args.db),
+            'questions_checksum': file_checksum(args.questions),
+        },
+        'summary': summarize(rows, wall),
+        'questions': rows,
+    }
+    for row in rows:
+        icon = {'correct': '✅', 'wrong': '❌', 'error': '⚠️'}[row['status']]
+        print(f"{icon} {row['timings'].get('total', 0):6.2f}s  {row['id']:<26} {row['error'] or row['sql']}")
+    summary = report['summary']
+    print(f"accuracy {summary['accuracy']:.1%} ({summary['correct']}/{summary['questions']}), "
+          f"wall {summary['wall_seconds']:.2f}s, " +
+          ", ".join(f"{stage} p50 {v['p50']:.3f}s" for stage, v in summary['latency'].items()))
+
+    out = args.out or os.path.join(
+        REPORTS_PATH, f"eval-{datetime.now():%Y%m%d-%H%M%S}-{MODEL.replace('/', '_')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📝 report written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+    if args.min_accuracy is not None and summary['accuracy'] < args.min_accuracy:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Local stand-in for the OpenRouter chat model: no API key, no network, with the latency
+# shape of a real one (a wait before the first token, then a steady token rate). Used by the
+# chat engine when CHAT_LLM=fake, and by the time-to-first-visible-output benchmark below.
+import os
+import re
+import time
+import asyncio
+from collections import Counter
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+SQL_RESULT_RE = re.compile(r'SQLResult:\s*(.*?)\s*Answer:\s*$', re.DOTALL)
+QUESTION_RE = re.compile(r'Question:\s*(.*?)\s*SQLQuery:', re.DOTALL)
+CALLS = Counter()    # 'sql' / 'answer' -> model calls, for load tests
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Answers the text-to-SQL prompt with a fixed query, then a templated answer, token by token."""
+
+    sql: str = "SELECT COUNT(*) AS players FROM players"
+    sql_by_question: dict = {}          # question -> query to "generate" (src/eval_harness.py), else sql
+    answer: str = "จากข้อมูลในฐานข้อมูล ผลลัพธ์คือ {result} ครับ"
+    first_token_delay: float = 0.8      # seconds before the first token of a reply
+    token_delay: float = 0.03           # seconds between tokens
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming"
+
+    def _reply(self, messages):
+        prompt = messages[-1].content
+        match = SQL_RESULT_RE.search(prompt)
+        CALLS['answer' if match else 'sql'] += 1
+        if match:
+            return self.answer.format(result=match.group(1))
+        question = QUESTION_RE.search(prompt)
+        return self.sql_by_question.get(question.group(1) if question else None, self.sql)
+
+    def _tokens(self, text):
+        return re.findall(r'\S+\s*', text)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(self._tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_delay)
+        for token in self._tokens(self._reply(messages)):
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    # async versions sleep on the event loop instead of holding an executor thread
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(self._tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_delay)
+        for token in self._tokens(self._reply(messages)):
+            await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+if __name__ == "__main__":
+    # Time to first visible output: blocking chain call vs the streamed pipeline of the chat page
+    os.environ["CHAT_LLM"] = "fake"
+    from src.llm_chat_engine import ask, ask_stream, get_llm_chain
+    get_llm_chain()
+    question = "How many players are in the database?"
+
+    start = time.perf_counter()
+    answer = ask(question)["result"]
+    blocking = time.perf_counter() - start
+    print(f"blocking:  first output {blocking:.2f}s (SQL + answer at once), total {blocking:.2f}s")
+
+    start = time.perf_counter()
+    first_sql = first_token = None
+    for kind, text in ask_stream(question):
+        if kind == 'sql' and first_sql is None:
+            first_sql = time.perf_counter() - start
+        if kind == 'token' and first_token is None:
+            first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    print(f"streaming: first output {first_sql:.2f}s (SQL), first answer token {first_token:.2f}s, total {total:.2f}s")
+    print("answer:", answer)
@@ -0,0 +1,232 @@
+# Answers the common chat questions without the LLM. The shapes of the prompt rules in
+# src/llm_chat_engine.py (a player's goals / assists in a season, a club's goals in a
+# season, transfers out of a club in a year) are matched with a few regexes and a
+# player / club name index, and answered by the prepared queries of
+# src/serving_queries.py. route() returns None for anything else, and the chat page
+# falls back to the LLM chain.
+import re
+import time
+import threading
+from settings import *
+from src.player_search import fold
+from src.repository import get_repository
+from src.serving_queries import SERVING_QUERIES
+
+THAI_RE = re.compile(r'[฀-๿]')
+SEASON_RE = re.compile(r'(?<!\d)((?:19|20)\d{2})\s*[/-]\s*(\d{4}|\d{2})(?!\d)')
+YEAR_RE = re.compile(r'(?<!\d)((?:19|20)\d{2})(?!\d)')
+TRANSFER_OUT_RE = re.compile(r'transfer\w*\s+(?:out|from)|\bleft\b|\bleave|\bsold\b|\bdepart|ย้ายออก|ขายออก|ออกจาก')
+GOALS_RE = re.compile(r'goal|\bscor|ประตู|ยิง')
+ASSISTS_RE = re.compile(r'assist|แอสซิสต์|แอสซิส|จ่ายบอล')
+# qualifiers the prepared queries do not cover: these go to the LLM
+QUALIFIER_RE = re.compile(
+    r'\b(?:against|vs|versus|most|top|least|average|per|home|away|league|cup|penalt\w*|minute\w*)\b'
+    r'|เจอ|พบกับ|มากที่สุด|น้อยที่สุด|เฉลี่ย|เหย้า|เยือน|ลีก|ถ้วย|จุดโทษ'
+)
+
+# words of the questions themselves, never read as a player surname
+QUESTION_WORDS = {
+    'how', 'many', 'much', 'what', 'who', 'which', 'did', 'does', 'do', 'the', 'and', 'for', 'with', 'in',
+    'of', 'from', 'out', 'goal', 'goals', 'score', 'scored', 'assist', 'assists', 'season', 'year',
+    'club', 'team', 'player', 'players', 'total', 'transfer', 'transfers', 'transferred', 'left', 'leave',
+    'sold', 'make', 'made', 'get', 'got', 'has', 'have', 'had', 'was', 'were', 'all', 'their', 'his',
+}
+CLUB_SUFFIXES = {'fc', 'afc', 'cf', 'sc', 'ac', 'football', 'club', 'calcio', 'sv', 'fk'}
+MAX_NAME_TOKENS = 5
+
+ROUTED_SQL = {name: ' '.join(SERVING_QUERIES[name]['sql'].split())
+              for name in ('router_player_season', 'router_club_season', 'router_club_transfers_out')}
+
+ANSWERS = {
+    'en': {
+        'player_season': "{name} scored {goals} goals and made {assists} assists in {period}.",
+        'player_goals': "{name} scored {goals} goals in {period}.",
+        'player_assists': "{name} made {assists} assists in {period}.",
+        'club_season': "{name} scored {goals} goals in {period}.",
+        'transfers_out': "{count} players left {name} in {period}:",
+        'no_transfers': "No players left {name} in {period}.",
+        'season': "the {label} season",
+        'year': "{label}",
+        'fee': "€{fee:,}",
+        'free': "free",
+    },
+    'th': {
+        'player_season': "{name} ยิงได้ {goals} ประตู และ {assists} แอสซิสต์ใน{period}",
+        'player_goals': "{name} ยิงได้ {goals} ประตูใน{period}",
+        'player_assists': "{name} ทำได้ {assists} แอสซิสต์ใน{period}",
+        'club_season': "{name} ยิงได้ {goals} ประตูใน{period}",
+        'transfers_out': "มีผู้เล่นย้ายออกจาก {name} {count} คนใน{period}:",
+        'no_transfers': "ไม่มีผู้เล่นย้ายออกจาก {name} ใน{period}",
+        'season': "ฤดูกาล {label}",
+        'year': "ปี {label}",
+        'fee': "€{fee:,}",
+        'free': "ย้ายฟรี",
+    },
+}
+
+
+def parse_period(question):
+    """(start, end, kind, label): a season runs July to June, a plain year is the calendar year."""
+    match = SEASON_RE.search(question)
+    if match:
+        first, second = int(match.group(1)), match.group(2)
+        if int(second) not in (first + 1, (first + 1) % 100):
+            return None
+        return f'{first}-07-01', f'{first + 1}-07-01', 'season', f'{first}/{str(first + 1)[2:]}'
+    match = YEAR_RE.search(question)
+    if match:
+        year = int(match.group(1))
+        return f'{year}-01-01', f'{year + 1}-01-01', 'year', str(year)
+    return None
+
+def _club_aliases(name):
+    tokens = fold(name).split()
+    aliases = {' '.join(tokens)}
+    while tokens and tokens[-1] in CLUB_SUFFIXES:
+        tokens = tokens[:-1]
+    while tokens and tokens[0] in CLUB_SUFFIXES:
+        tokens = tokens[1:]
+    if tokens:
+        aliases.add(' '.join(tokens))
+    # 'Club 22 Fc' -> '22' would read season numbers as clubs
+    return {alias for alias in aliases if re.search('[a-z]', alias)}
+
+
+class NameIndex:
+    """Folded player and club names -> (id, display name).
+
+    Players are found by full name or surname; when a surname is shared, the most
+    valuable player wins, as in the Bio page search.
+    """
+
+    def __init__(self, df_players, club_names):
+        self.players, self.clubs = {}, {}
+        df = df_players.assign(value=df_players['market_value_in_eur'].fillna(-1)).sort_values('value')
+        # ascending market value: the most valuable player is written last
+        for player_id, name in zip(df['player_id'], df['name']):
+            folded = fold(name)
+            if not folded:
+                continue
+            self.players[folded] = (int(player_id), name)
+            surname = folded.split()[-1]
+            if len(surname) >= 3 and surname not in QUESTION_WORDS:
+                self.players[surname] = (int(player_id), name)
+        for club_id, name in club_names.items():
+            for alias in _club_aliases(name):
+                self.clubs.setdefault(alias, (int(club_id), name))
+
+    def find(self, question):
+        """Distinct ('club' | 'player', id, name) named in the question, longest names first."""
+        # Latin tokens only: Thai is written without spaces ('Messiยิงกี่ประตู')
+        tokens = re.findall(r'[a-z0-9]+', fold(question))
+        used, found = set(), []
+        for size in range(min(MAX_NAME_TOKENS, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                span = set(range(start, start + size))
+                if span & used:
+                    continue
+                phrase = ' '.join(tokens[start:start + size])
+                # a club wins over a player of the same name
+                entity = (('club',) + self.clubs[phrase] if phrase in self.clubs
+                          else ('player',) + self.players[phrase] if phrase in self.players else None)
+                if entity:
+                    used |= span
+                    if entity not in found:
+                        found.append(entity)
+        return found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_name_index(repo=None):
+    global _index
+    with _index_lock:
+        if _index is None:
+            repo = repo or get_repository()
+            _index = NameIndex(repo.players(['player_id', 'name', 'market_value_in_eur']), repo.club_names())
+    return _index
+
+
+def _display_sql(name, params):
+    # the prepared statement with its parameters inlined, for the page's SQL panel
+    sql = ROUTED_SQL[name]
+    for param in params:
+        sql = sql.replace('?', repr(param), 1)
+    return sql
+
+def route(question, repo=None, index=None):
+    """{'intent', 'sql', 'result'} of a question the router can answer, else None."""
+    period = parse_period(question)
+    if period is None:
+        return None
+    text = question.lower()
+    if QUALIFIER_RE.search(text):
+        return None
+    wants_transfers = bool(TRANSFER_OUT_RE.search(text))
+    wants_goals, wants_assists = bool(GOALS_RE.search(text)), bool(ASSISTS_RE.search(text))
+    if not (wants_transfers or wants_goals or wants_assists):
+        return None
+    repo = repo or get_repository()
+    entities = (index or get_name_index(repo)).find(YEAR_RE.sub(' ', SEASON_RE.sub(' ', question)))
+    if len(entities) != 1:
+        return None
+
+    kind, entity_id, name = entities[0]
+    start, end, period_kind, label = period
+    words = ANSWERS['th' if THAI_RE.search(question) else 'en']
+    period_text = words[period_kind].format(label=label)
+
+    if kind == 'club' and wants_transfers:
+        intent, params = 'router_club_transfers_out', (entity_id, start, end)
+        df = repo.query(intent, ROUTED_SQL[intent], params)
+        if df.empty:
+            answer = words['no_transfers'].format(name=name, period=period_text)
+        else:
+            lines = [words['transfers_out'].format(count=len(df), name=name, period=period_text)]
+            for row in df.itertuples(index=False):
+                # transfer_fee: -1 unknown, 0 free transfer
+                fee = ('-' if row.transfer_fee < 0 else words['free'] if row.transfer_fee == 0
+                       else words['fee'].format(fee=int(row.transfer_fee)))
+                lines.append(f"- {row.player_name} → {row.to_club or '-'} ({str(row.transfer_date)[:10]}, {fee})")
+            answer = '\n'.join(lines)
+    elif kind == 'club' and wants_goals:
+        intent, params = 'router_club_season', (entity_id, start, end)
+        goals = repo.query(intent, ROUTED_SQL[intent], params).iat[0, 0]
+        answer = words['club_season'].format(name=name, goals=int(goals), period=period_text)
+    elif kind == 'player' and (wants_goals or wants_assists):
+        intent, params = 'router_player_season', (entity_id, start, end)
+        goals, assists = repo.query(intent, ROUTED_SQL[intent], params).iloc[0]
+        template = ('player_season' if wants_goals == wants_assists
+                    else 'player_goals' if wants_goals else 'player_assists')
+        answer = words[template].format(name=name, goals=int(goals), assists=int(assists),
+                                        period=period_text)
+    else:
+        return None
+    return {'intent': intent, 'sql': _display_sql(intent, params), 'result': answer}
+
+
+if __name__ == "__main__":
+    from src.repository import Repository
+    repo = Repository(os.path.join(db_path, 'clean_football.db'), backend='sqlite')
+    start = time.perf_counter()
+    index = get_name_index(repo)
+    print(f"🔎 name index of {len(index.players):,} player and {len(index.clubs):,} club keys "
+          f"built in {(time.perf_counter() - start) * 1000:,.0f} ms")
+
+    questions = [
+        "How many goals did Messi score in 2021/2022?",
+        "How many goals and assists did Lionel Messi have in season 2021/22?",
+        "Messi มีกี่แอสซิสต์ในฤดูกาล 2021/22",
+        "How many goals did Liverpool score in 2021/2022?",
+        "ลิเวอร์พูล Liverpool ยิงได้กี่ประตูในฤดูกาล 2021/2022",
+        "Which players transferred out of Manchester United in 2021?",
+        "ผู้เล่นที่ย้ายออกจาก Manchester United ในปี 2021",
+        "How many goals did Messi score against Liverpool in 2021/22?",
+        "Who is the tallest player?",
+    ]
+    for question in questions:
+        start = time.perf_counter()
+        routed = route(question, repo, index)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{elapsed:8.2f} ms  {question}\n           -> {routed['result'] if routed else 'LLM fallback'}")
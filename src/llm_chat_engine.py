@@ -1,101 +1,26 @@
+# Everything expensive (langchain imports, database download, schema context, LLM client)
+# is built on the first get_llm_chain() call, or ahead of it by warm_up() at app start.
+import time
+_import_start = time.perf_counter()
+
 import os
-import platform
-import gdown
+import hashlib
+import threading
+from collections import deque
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain_experimental.sql import SQLDatabaseChain
-from langchain_openai import ChatOpenAI
-from langchain_community.utilities import SQLDatabase
-
-# Load ENV only run in local
-if os.environ.get("STREAMLIT_SERVER_ENABLED") is None:
-    load_dotenv()
-
-# Load Api key from env
-api_key = os.getenv("OPENAI_API_KEY")
-api_base = os.getenv("OPENAI_API_BASE")
-
-if not api_key or not api_base:
-    raise ValueError("OPENAI_API_KEY or OPENAI_API_BASE not define in environment variables")
-
-# Load database path
-def download_db_path():
-    if platform.system() == "Windows":
-        return "D:/Data Project/exercise/Football/database/clean_football.db"
-    else:
-        # for Streamlit Cloud or Linux
-        db_path = "/tmp/clean_football.db"
-        if not os.path.exists(db_path):
-            file_id = "1Kpv8ySZh-0SHgmSftHbtdgxji8KQEpRz"
-            url = f"https://drive.google.com/uc?id={file_id}"
-            gdown.download(url, db_path, quiet=False)
-        return db_path
-
-def get_db_path():
-    return download_db_path()
-
-# Connect database
-db_path = get_db_path()
-db = SQLDatabase.from_uri(f"sqlite:///{db_path}")
-
-# set LLM from OpenRouter (Claude 3 Haiku)
-llm = ChatOpenAI(
-    model="anthropic/claude-3-haiku",
-    temperature=0,
-    openai_api_key=api_key,
-    openai_api_base=api_base,
-)
+from src.schema_context import get_schema_context
+
+# set LLM from OpenRouter (Claude 3 Haiku); CHAT_LLM=fake: the local stand-in of src/fake_llm.py
+CHAT_LLM = os.getenv("CHAT_LLM", "openrouter")
+MODEL = "fake-streaming" if CHAT_LLM == "fake" else "anthropic/claude-3-haiku"
 
 # Prompt for SQL query only
-prompt = PromptTemplate(
-    input_variables=["input"],
-    template="""
+PROMPT_TEMPLATE = """
 You are an intelligent assistant that answers questions using data from a football SQLite database.
 
-Here is the schema of the database:
-
-Table: appearances
-- appearance_id: TEXT
-- game_id: INTEGER
-- player_id: INTEGER
-- player_club_id: INTEGER
-- date: TIMESTAMP
-- goals: INTEGER
-- assists: INTEGER
-- yellow_cards: INTEGER
-- red_cards: INTEGER
-- minutes_played: INTEGER
-
-Table: clubs
-- club_id: INTEGER
-- name: TEXT
-
-Table: players
-- player_id: INTEGER
-- name: TEXT
-- current_club_id: INTEGER
-
-Table: games
-- game_id: INTEGER
-- date: TIMESTAMP
-- home_club_id: INTEGER
-- away_club_id: INTEGER
-- home_club_goals: INTEGER
-- away_club_goals: INTEGER
-- home_club_name: TEXT
-- away_club_name: TEXT
-
-Table: transfers
-- player_id: INTEGER
-- transfer_date: DATE
-- from_club_id: INTEGER
-- to_club_id: INTEGER
-- transfer_fee: INTEGER
-- market_value_in_eur: INTEGER
-
-If you need to get the club name from a `club_id`, join with the `clubs` table on `club_id`.
-If you want to get player stats, use the `appearances` table.
-If you want to get total goals by a club, sum `goals` in `appearances` where `player_club_id = club_id`.
+Here is the schema of the tables this question needs (table(column TYPE -- note, ...)):
+
+{table_info}
 
 When converting questions to SQL, always ensure the column and table names exist.
 
@@ -103,7 +28,7 @@ Follow these strict rules:
 
 1. If the question asks about number of goals scored, always use SUM(goals).
 2. Never use LIMIT unless the user says "top N" or "most recent N".
-3. Always use player_name LIKE '%<name>%' to match players.
+3. Always match players by id: player_id IN (SELECT player_id FROM players WHERE name LIKE '%<name>%'), never player_name LIKE on appearances / transfers / game_lineups.
 4. When a season like "2021/2022" is mentioned, treat it as date BETWEEN '2021-07-01' AND '2022-06-30'.
 5. All goal data is stored in the table named appearances.
 6. If the user asks about a team like "Liverpool", first find the club_id from table clubs WHERE name LIKE '%Liverpool%', then use that club_id in appearances.player_club_id.
@@ -113,16 +38,184 @@ Write only the final answer in Thai, ignore SQL output.
 
 Question: {input}
 """
-)
-
-# Create Chain
-db_chain = SQLDatabaseChain.from_llm(
-    llm=llm,
-    db=db,
-    prompt=prompt,
-    return_intermediate_steps=False,
-    verbose=True
-)
+# changes with every prompt edit, so cached answers of an older prompt are not reused
+PROMPT_VERSION = hashlib.sha256(PROMPT_TEMPLATE.encode()).hexdigest()[:12]
+
+_chain = None
+_lock = threading.Lock()
+_warm_up_thread = None
+INIT_TIMINGS = {}    # phase -> seconds of the last build
+RESPONSE_TIMINGS = deque(maxlen=500)    # recent answers: (source, first visible output s, first answer token s, total s)
+
+
+def _phase(name, func):
+    start = time.perf_counter()
+    result = func()
+    INIT_TIMINGS[name] = time.perf_counter() - start
+    return result
+
+def _load_keys():
+    # Load ENV only run in local
+    if os.environ.get("STREAMLIT_SERVER_ENABLED") is None:
+        load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    api_base = os.getenv("OPENAI_API_BASE")
+    if not api_key or not api_base:
+        raise ValueError("OPENAI_API_KEY or OPENAI_API_BASE not define in environment variables")
+    return api_key, api_base
+
+def _import_langchain():
+    from langchain.prompts import PromptTemplate
+    from langchain_experimental.sql import SQLDatabaseChain
+    from langchain_openai import ChatOpenAI
+    from langchain_community.utilities import SQLDatabase
+    return PromptTemplate, SQLDatabaseChain, ChatOpenAI, SQLDatabase
+
+def _connect_database(SQLDatabase, schema):
+    # read-only connections of the shared repository; generated SQL runs on DATA_BACKEND
+    # (duckdb / parquet: the columnar copy written by src/columnar_store.py), timed as 'llm_sql'
+    from src.repository import get_repository
+
+    class SchemaContextDatabase(SQLDatabase):
+        # {table_info} of the prompt: the compact schema of the tables / columns picked by ask(),
+        # instead of reflected CREATE TABLEs + sample rows of every table on each request
+        def get_table_info(self, table_names=None):
+            return schema.describe(table_names)
+
+        # generated SQL is plan-checked and run with a deadline and row cap (src/query_guard.py);
+        # QueryRejected / QueryTimeout end the chain and are shown on the chat page
+        def run(self, command, fetch="all", include_columns=False, **kwargs):
+            df, truncated = get_repository().guarded_query(command)
+            rows = df.to_dict("records") if include_columns else list(df.itertuples(index=False, name=None))
+            if fetch == "one":
+                rows = rows[:1]
+            if not rows:
+                return ""
+            return str(rows) + (f"\n(first {len(df):,} rows only)" if truncated else "")
+
+    return SchemaContextDatabase(get_repository().sqlalchemy_engine(), lazy_table_reflection=True)
+
+def _build_chain():
+    PromptTemplate, SQLDatabaseChain, ChatOpenAI, SQLDatabase = _phase("imports", _import_langchain)
+    schema = _phase("schema", get_schema_context)
+    db = _phase("database", lambda: _connect_database(SQLDatabase, schema))
+
+    if CHAT_LLM == "fake":
+        from src.fake_llm import FakeStreamingChatModel
+        llm = _phase("llm", FakeStreamingChatModel)
+    else:
+        api_key, api_base = _phase("env", _load_keys)
+        llm = _phase("llm", lambda: ChatOpenAI(
+            model=MODEL,
+            temperature=0,
+            openai_api_key=api_key,
+            openai_api_base=api_base,
+        ))
+
+    # Create Chain
+    return _phase("chain", lambda: SQLDatabaseChain.from_llm(
+        llm=llm,
+        db=db,
+        prompt=PromptTemplate(input_variables=["input", "table_info"], template=PROMPT_TEMPLATE),
+        return_intermediate_steps=False,
+        verbose=True
+    ))
 
 def get_llm_chain():
-    return db_chain
+    """The chat chain, built once per process (thread-safe; waits for a running warm-up)."""
+    global _chain
+    if _chain is None:
+        with _lock:
+            if _chain is None:
+                start = time.perf_counter()
+                _chain = _build_chain()
+                INIT_TIMINGS["total"] = time.perf_counter() - start
+                print("🤖 Chat engine ready: " + ", ".join(f"{k} {v:.2f}s" for k, v in INIT_TIMINGS.items()))
+    return _chain
+
+def ask(question):
+    """Run the chain on a question, with the schema of only the tables and columns it needs."""
+    from src.intent_router import get_name_index
+    chain = get_llm_chain()
+    selection = get_schema_context().select(question, get_name_index())
+    return chain.invoke({"query": question, "table_names_to_use": selection})
+
+def message_text(message):
+    # chat models return messages / chunks, plain LLMs strings
+    return getattr(message, "content", message)
+
+def prepare(question):
+    """(llm, prompt, db, table_info) to answer a question with, the schema narrowed to the question."""
+    from src.intent_router import get_name_index
+    chain = get_llm_chain()
+    llm, prompt, db = chain.llm_chain.llm, chain.llm_chain.prompt, chain.database
+    return llm, prompt, db, db.get_table_info(get_schema_context().select(question, get_name_index()))
+
+# same prompts and stop sequence as SQLDatabaseChain
+SQL_STOP = ["\nSQLResult:"]
+
+def sql_input(question):
+    return f"{question}\nSQLQuery:"
+
+def answer_input(question, sql, result):
+    return f"{sql_input(question)}{sql}\nSQLResult: {result}\nAnswer:"
+
+def clean_sql(text):
+    return message_text(text).strip().split("SQLQuery:")[-1].split("SQLResult:")[0].strip()
+
+def ask_stream(question):
+    """The steps of ask() as they happen: ('sql', query) once generated, then ('token', text) of the answer.
+
+    The query runs (through src/query_guard.py) between the two, when the first token is asked for.
+    """
+    llm, prompt, db, table_info = prepare(question)
+    sql = clean_sql(llm.invoke(prompt.format(input=sql_input(question), table_info=table_info), stop=SQL_STOP))
+    yield "sql", sql
+
+    result = db.run(sql)
+    for chunk in llm.stream(prompt.format(input=answer_input(question, sql, result), table_info=table_info)):
+        if message_text(chunk):
+            yield "token", message_text(chunk)
+
+def record_response(source, first_output, first_token, total):
+    """Seconds from question to first visible output / first answer token / full answer, per source."""
+    RESPONSE_TIMINGS.append((source, first_output, first_token, total))
+
+def response_stats():
+    """p50 / p95 seconds of the recent answers of each source (router, cache, llm)."""
+    def pct(values, q):
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+    stats = {}
+    for source in dict.fromkeys(row[0] for row in RESPONSE_TIMINGS):
+        rows = [row for row in RESPONSE_TIMINGS if row[0] == source]
+        stats[source] = {"answers": len(rows)}
+        for i, metric in enumerate(("first_output", "first_token", "total"), start=1):
+            stats[source][f"{metric}_p50"] = pct([row[i] for row in rows], 0.5)
+            stats[source][f"{metric}_p95"] = pct([row[i] for row in rows], 0.95)
+    return stats
+
+def warm_up():
+    """Build the chain on a background thread, once per process. Errors surface on the first chat request."""
+    global _warm_up_thread
+    with _lock:
+        if _chain is not None or _warm_up_thread is not None:
+            return _warm_up_thread
+
+        def run():
+            try:
+                get_llm_chain()
+            except Exception as e:
+                print(f"⚠️ Chat engine warm-up failed: {e}")
+
+        _warm_up_thread = threading.Thread(target=run, name="llm-warm-up", daemon=True)
+        _warm_up_thread.start()
+        return _warm_up_thread
+
+def init_timings():
+    """Seconds spent importing this module and in each init phase, for display / logs."""
+    return {"module_import": IMPORT_SECONDS, **INIT_TIMINGS}
+
+
+IMPORT_SECONDS = time.perf_counter() - _import_start
@@ -0,0 +1,136 @@
+import os
+import re
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+from settings import *
+
+
+def title_names(col):
+    """col.str.strip().str.title(), computed once per distinct value.
+
+    Name columns repeat the same few thousand values over millions of rows, so the
+    strings are factorized, cleaned as uniques and mapped back through the codes.
+    """
+    codes, uniques = pd.factorize(col)
+    cleaned = pd.Index(uniques, dtype=object).str.strip().str.title()
+    values = pd.api.extensions.take(np.asarray(cleaned, dtype=object), codes, allow_fill=True, fill_value=np.nan)
+    return pd.Series(values, index=col.index, name=col.name, dtype=object)
+
+def fill_missing(col, value):
+    # fillna that also works on categoricals: the fill value becomes a category
+    if not col.isna().any():
+        return col
+    if isinstance(col.dtype, pd.CategoricalDtype) and value not in col.cat.categories:
+        col = col.cat.add_categories([value])
+    return col.fillna(value)
+
+def yes_no(mask):
+    # "Yes"/"No" flag column from a boolean array
+    return np.where(mask, "Yes", "No")
+
+# '€12.30m', '+€500k', '€-1.2bn', '1500000.0', and the '-' / '+-0' placeholders (no number)
+MONEY_RE = re.compile(
+    r'^\s*(?P<sign>[+-]*)\s*€?\s*(?P<sign2>[+-]*)\s*(?P<number>\d*\.?\d+(?:e[+-]?\d+)?)?\s*(?P<suffix>bn|k|m)?\s*$',
+    re.IGNORECASE,
+)
+MONEY_SUFFIXES = {'k': 1e3, 'm': 1e6, 'bn': 1e9}
+
+def parse_money(col, unit=1):
+    """Money values -> float64 amounts counted in `unit` euros (1e6: millions), in one regex pass.
+
+    Placeholders parse to 0, missing and unparseable values to NaN. As in title_names,
+    the regex runs once per distinct value.
+    """
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype('float64') / unit
+    codes, uniques = pd.factorize(col)
+    parts = pd.Series(uniques, dtype=object).astype(str).str.extract(MONEY_RE)
+    matched = parts['sign'].notna()
+    number = pd.to_numeric(parts['number']).fillna(0.0).where(matched)
+    scale = parts['suffix'].str.lower().map(MONEY_SUFFIXES).fillna(1.0)
+    # scale by the exact power of ten: '€500k' in millions is 500 / 1000, not 500 * 0.001
+    amount = np.where(scale >= unit, number * (scale / unit), number / (unit / scale))
+    negative = (parts['sign'] + parts['sign2']).str.contains('-', regex=False, na=False)
+    # + 0.0 turns the -0.0 of '+-0' into 0.0
+    values = np.where(negative, -amount, amount) + 0.0
+    values = pd.api.extensions.take(values, codes, allow_fill=True, fill_value=np.nan)
+    return pd.Series(values, index=col.index, name=col.name, dtype='float64')
+
+
+# --------------------------------------------------
+# Micro-benchmark: per-row vs vectorized, on the raw tables
+# --------------------------------------------------
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def _old_title(col):
+    return col.str.strip().str.title()
+
+def _old_league_flag(df):
+    return df.apply(
+        lambda row: "Yes" if row['own_position'] != -1 and row['opponent_position'] != -1 else "No",
+        axis=1
+    )
+
+def _new_league_flag(df):
+    return pd.Series(yes_no((df['own_position'] != -1) & (df['opponent_position'] != -1)), index=df.index)
+
+def _old_net_transfer_record(col):
+    col = col.fillna('0').astype(str)
+    col = col.str.replace('€', '', regex=False)
+    col = col.str.replace('+', '', regex=False)
+    k_mask = col.str.contains('k', case=False, na=False)
+    col[k_mask] = col[k_mask].str.replace('k', '', regex=False).astype(float) / 1000
+    m_mask = col.str.contains('m', case=False, na=False)
+    col[m_mask] = col[m_mask].str.replace('m', '', regex=False).astype(float)
+    col = col.replace(['', '-', '+-0'], '0')
+    return col.astype(float)
+
+def _new_net_transfer_record(col):
+    return parse_money(col, unit=1e6).fillna(0)
+
+def benchmark_money(conn, rows=1_000_000):
+    clubs = pd.read_sql("SELECT net_transfer_record FROM clubs", conn)['net_transfer_record']
+    col = pd.concat([clubs] * (rows // max(len(clubs), 1) + 1), ignore_index=True).iloc[:rows]
+    old_result, old_time = _timed(_old_net_transfer_record, col)
+    new_result, new_time = _timed(_new_net_transfer_record, col)
+    same = np.allclose(old_result, new_result, rtol=0, atol=0)
+    print(f"{'✅' if same else '❌'} clubs.net_transfer_record: {len(col):,} rows, {old_time * 1000:,.1f} ms -> "
+          f"{new_time * 1000:,.1f} ms ({len(col) / new_time:,.0f} rows/sec)")
+
+    # worst case for the per-distinct-value parse: every value differs
+    distinct = pd.Series([f"€{v:.4f}m" for v in np.random.default_rng(0).uniform(-500, 500, rows)])
+    _, distinct_time = _timed(parse_money, distinct)
+    print(f"✅ parse_money, all distinct: {rows:,} rows, {distinct_time * 1000:,.1f} ms "
+          f"({rows / distinct_time:,.0f} rows/sec)")
+
+def benchmark(conn):
+    club_games = pd.read_sql("SELECT own_manager_name, opponent_manager_name, own_position, opponent_position "
+                             "FROM club_games", conn)
+    club_games[['own_position', 'opponent_position']] = club_games[['own_position', 'opponent_position']].fillna(-1)
+    lineups = pd.read_sql("SELECT player_name FROM game_lineups", conn)
+
+    cases = [
+        ('club_games.own_manager_name', _old_title, title_names, club_games['own_manager_name']),
+        ('club_games.opponent_manager_name', _old_title, title_names, club_games['opponent_manager_name']),
+        ('club_games.is_league_game', _old_league_flag, _new_league_flag, club_games),
+        ('game_lineups.player_name', _old_title, title_names, lineups['player_name']),
+    ]
+    for name, old, new, arg in cases:
+        old_result, old_time = _timed(old, arg)
+        new_result, new_time = _timed(new, arg)
+        same = old_result.equals(new_result)
+        print(f"{'✅' if same else '❌'} {name}: {len(arg):,} rows, {old_time * 1000:,.1f} ms -> "
+              f"{new_time * 1000:,.1f} ms ({old_time / new_time:,.1f}x)")
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(f"file:{os.path.join(db_path, 'Football.db')}?mode=ro", uri=True)
+    benchmark(conn)
+    benchmark_money(conn)
+    conn.close()
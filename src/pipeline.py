@@ -0,0 +1,93 @@
+import time
+import sqlite3
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Read connection of the current worker process, opened once by _init_worker
+_read_conn = None
+
+def _init_worker(read_db):
+    global _read_conn
+    _read_conn = sqlite3.connect(f"file:{read_db}?mode=ro", uri=True)
+
+def _run_stage(name, func, kwargs, profile_memory=False):
+    # peak: highest traced allocation during the stage in MB (numpy / pandas buffers included)
+    if profile_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    df = func(_read_conn, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if profile_memory:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    return name, df, elapsed, peak
+
+def plan_stages(stages, selected=None):
+    # {stage: deps still to run}. Deps outside the selection are treated as
+    # already built by an earlier run, stages built from a selected stage (aggregates)
+    # are rerun so they never go stale, 'always' stages run on every selection.
+    names = list(selected) if selected else list(stages)
+    unknown = [name for name in names if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+    added = True
+    while added:
+        downstream = [name for name, stage in stages.items()
+                      if name not in names and any(dep in names for dep in stage['deps'])]
+        names += downstream
+        added = bool(downstream)
+    names += [name for name, stage in stages.items() if stage.get('always') and name not in names]
+    return {name: {dep for dep in stages[name]['deps'] if dep in names} for name in names}
+
+def run_dag(stages, read_db, write, workers=None, selected=None, stage_kwargs=None, local_args=(),
+            profile_memory=False):
+    """Run the stages on a process pool as soon as their deps are written.
+
+    stages: {name: {'func': func(read_conn) -> DataFrame, 'deps': [names]}}
+        stages with 'local': True run in this process as func(*local_args) instead,
+        for work done directly on the written database (indexes, aggregates)
+    write: write(name, df), called in this process only, so there is a single writer
+    stage_kwargs: optional {name: extra keyword arguments for that stage's func}
+    profile_memory: trace allocations in the workers and report each stage's peak (slower)
+    """
+    stage_kwargs = stage_kwargs or {}
+    pending = plan_stages(stages, selected)
+    running = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(read_db,)) as pool:
+        while pending or running:
+            ready = [name for name, deps in pending.items() if not deps]
+            for name in ready:
+                del pending[name]
+                if stages[name].get('local'):
+                    local_start = time.perf_counter()
+                    stages[name]['func'](*local_args)
+                    print(f"✅ {name}... ({time.perf_counter() - local_start:.1f}s)")
+                    for deps in pending.values():
+                        deps.discard(name)
+                    continue
+                future = pool.submit(_run_stage, name, stages[name]['func'], stage_kwargs.get(name, {}), profile_memory)
+                running[future] = name
+
+            if not running:
+                if not pending or any(not deps for deps in pending.values()):
+                    continue
+                raise ValueError(f"Dependency cycle between stages: {', '.join(pending)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del running[future]
+                name, df, elapsed, peak = future.result()
+
+                write_start = time.perf_counter()
+                write(name, df)
+                memory = f", peak {peak:,.1f} MB" if peak is not None else ""
+                print(f"✅ Cleaning {name}... {len(df):,} rows "
+                      f"(clean {elapsed:.1f}s, write {time.perf_counter() - write_start:.1f}s{memory})")
+
+                for deps in pending.values():
+                    deps.discard(name)
+
+    print(f"✅ Pipeline finished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,98 @@
+# Per-player payloads of the Stat / Transfer pages, keyed on player_id.
+# The Bio page starts prefetch_player() as soon as it shows a player, so the page
+# switch reads finished results instead of querying.
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from settings import *
+from src.repository import Repository, get_repository
+
+PREFETCH_WORKERS = 4
+PREFETCH_PLAYERS = 32    # players whose prefetched payloads are kept until a page reads them
+PREFETCH_PAYLOADS = ('season_stats', 'season_positions', 'transfers')
+
+# payload -> Repository method
+QUERIES = {
+    'season_stats': Repository.season_stats,
+    'season_positions': Repository.season_positions,
+    'appearances': Repository.appearances,
+    'transfers': Repository.transfers,
+}
+
+# --------------------------------------------------
+# Prefetch
+# --------------------------------------------------
+
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_prefetched = OrderedDict()    # player_id -> {payload: Future}, oldest player first
+_lock = threading.Lock()
+
+def prefetch_player(player_id, repo=None, payloads=PREFETCH_PAYLOADS):
+    """Start loading the payloads of player_id in the background (once per player)."""
+    repo = repo or get_repository()
+    with _lock:
+        if player_id in _prefetched:
+            _prefetched.move_to_end(player_id)
+            return
+        _prefetched[player_id] = {name: _pool.submit(QUERIES[name], repo, player_id) for name in payloads}
+        while len(_prefetched) > PREFETCH_PLAYERS:
+            _prefetched.popitem(last=False)
+
+def fetch(name, player_id, repo=None):
+    # the prefetched result when there is one (waiting for it if still running), else query now
+    with _lock:
+        future = _prefetched.get(player_id, {}).pop(name, None)
+    if future is not None:
+        return future.result()
+    return QUERIES[name](repo or get_repository(), player_id)
+
+# --------------------------------------------------
+# Page loaders
+# --------------------------------------------------
+
+@st.cache_data(show_spinner=False)
+def load_season_stats(player_id):
+    return fetch('season_stats', player_id)
+
+@st.cache_data(show_spinner=False)
+def load_season_positions(player_id):
+    return fetch('season_positions', player_id)
+
+@st.cache_data(show_spinner=False)
+def load_appearances(player_id):
+    return fetch('appearances', player_id)
+
+@st.cache_data(show_spinner=False)
+def load_transfers(player_id):
+    return fetch('transfers', player_id)
+
+@st.cache_data(show_spinner=False)
+def load_club_map():
+    return get_repository().club_names()
+
+
+if __name__ == "__main__":
+    # Page-switch latency: querying after the click vs reading a finished prefetch
+    repo = Repository(os.path.join(db_path, 'clean_football.db'), backend='sqlite')
+    player_ids = repo.query(
+        'sample', "SELECT player_id FROM player_season_stats GROUP BY player_id ORDER BY COUNT(*) DESC LIMIT 20"
+    )['player_id'].tolist()
+
+    start = time.perf_counter()
+    for player_id in player_ids:
+        for name in PREFETCH_PAYLOADS:
+            fetch(name, player_id, repo)
+    cold = (time.perf_counter() - start) / len(player_ids)
+
+    for player_id in player_ids:
+        prefetch_player(player_id, repo)
+    time.sleep(1)    # the user reading the Bio page
+    start = time.perf_counter()
+    for player_id in player_ids:
+        for name in PREFETCH_PAYLOADS:
+            fetch(name, player_id, repo)
+    warm = (time.perf_counter() - start) / len(player_ids)
+    print(f"Stat + Transfer payloads per player: {cold * 1000:,.2f} ms queried, {warm * 1000:,.3f} ms prefetched")
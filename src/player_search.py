@@ -0,0 +1,122 @@
+import os
+import time
+import sqlite3
+import argparse
+import unicodedata
+import numpy as np
+import pandas as pd
+from settings import *
+
+# Letters NFKD does not decompose into a base letter + accent
+FOLD_TABLE = str.maketrans({
+    'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'đ': 'd', 'ð': 'd', 'þ': 'th', 'ł': 'l', 'ı': 'i',
+})
+MAX_PREFIX = 20
+MIN_SHARED = 0.5    # typo match: share at least half of the query's trigrams
+
+
+def fold(text):
+    """Lowercase, accent-free form of a name: 'Martin Ødegaard' -> 'martin odegaard'."""
+    text = unicodedata.normalize('NFKD', str(text).lower().translate(FOLD_TABLE))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text).split())
+
+def trigrams(text):
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerSearchIndex:
+    """Prefix + trigram index over player names, built once per process.
+
+    Rows are stored by descending popularity, so every posting list is already in
+    ranking order and a lookup only reads the head of the lists it touches.
+    """
+
+    def __init__(self, names, popularity):
+        order = np.lexsort((np.asarray(names, dtype=object).astype(str), -np.asarray(popularity, dtype=float)))
+        self.rows = order                      # rank -> position in the source frame
+        prefixes, grams = {}, {}
+        for rank, position in enumerate(order):
+            folded = fold(names[position])
+            for token in folded.split():
+                for end in range(1, min(len(token), MAX_PREFIX) + 1):
+                    prefixes.setdefault(token[:end], []).append(rank)
+            for gram in trigrams(folded):
+                grams.setdefault(gram, []).append(rank)
+        # a token can repeat a prefix ('son son'), keep each rank once
+        self.prefixes = {key: np.unique(ranks) for key, ranks in prefixes.items()}
+        self.grams = {key: np.asarray(ranks, dtype=np.int32) for key, ranks in grams.items()}
+
+    def _prefix_hits(self, tokens):
+        # every query token must start some name token
+        postings = [self.prefixes.get(token[:MAX_PREFIX]) for token in tokens]
+        if any(p is None for p in postings):
+            return np.empty(0, dtype=np.int64)
+        hits = min(postings, key=len)
+        for posting in postings:
+            if posting is not hits:
+                hits = np.intersect1d(hits, posting, assume_unique=True)
+        return hits
+
+    def _typo_hits(self, folded, k):
+        postings = [self.grams[gram] for gram in trigrams(folded) if gram in self.grams]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.rows))
+        candidates = np.flatnonzero(shared >= max(1, MIN_SHARED * len(trigrams(folded))))
+        # most shared trigrams first, then popularity (= rank)
+        best = np.lexsort((candidates, -shared[candidates]))[:k]
+        return candidates[best]
+
+    def search(self, query, k=5):
+        """Positions (in the frame the index was built from) of the top-k matches of query."""
+        folded = fold(query)
+        if not folded:
+            return []
+        ranks = list(self._prefix_hits(folded.split())[:k])
+        if len(ranks) < k:
+            # infix or misspelled queries ('dowski', 'mbape')
+            seen = set(ranks)
+            ranks += [r for r in self._typo_hits(folded, k + len(ranks)) if r not in seen][:k - len(ranks)]
+        return self.rows[ranks].tolist()
+
+
+def build_player_index(df_players):
+    # popularity = current market value, missing values (-1) rank last
+    return PlayerSearchIndex(df_players['name'].tolist(), df_players['market_value_in_eur'].fillna(-1).to_numpy())
+
+
+# --------------------------------------------------
+# Benchmark: substring scan of pages/player_bio.py vs the index
+# --------------------------------------------------
+
+def benchmark(df_players, queries, k=5, repeat=200):
+    start = time.perf_counter()
+    index = build_player_index(df_players)
+    print(f"🔎 index of {len(df_players):,} players built in {(time.perf_counter() - start) * 1000:,.0f} ms")
+
+    for query in queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scan = df_players[df_players['name'].str.contains(query, case=False, na=False)]['name'].head(k).tolist()
+        scan_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            hits = df_players['name'].iloc[index.search(query, k)].tolist()
+        index_time = (time.perf_counter() - start) / repeat
+
+        print(f"{query!r:14} scan {scan_time * 1e6:9,.0f} µs {len(scan)} hits | "
+              f"index {index_time * 1e6:7,.0f} µs {hits[:3]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the player name search index")
+    parser.add_argument('--copies', type=int, default=1, help="repeat the players table to simulate a larger one")
+    args = parser.parse_args()
+
+    with sqlite3.connect(os.path.join(db_path, 'clean_football.db')) as conn:
+        df = pd.read_sql("SELECT name, market_value_in_eur FROM players", conn)
+    df = pd.concat([df] * args.copies, ignore_index=True)
+    benchmark(df, ['messi', 'Mbappe', 'odegaard', 'Ødegaard', 'erling h', 'mbape', 'dowski', 'son heung', 'a'])
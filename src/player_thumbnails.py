@@ -0,0 +1,146 @@
+# Thumbnails of the player images downloaded by src/download_players_image.py, for the Bio
+# page. Every image is resized to one fixed size in a process pool and stored under
+# static/players/ by the hash of its content, so its name changes whenever the picture does.
+# Streamlit's app/static route sends an ETag but no Cache-Control, so browsers only cache
+# them heuristically / revalidate; long-lived caching of these immutable names needs a
+# reverse proxy rule (see the README). images/player/thumbnails.json maps
+# player_id -> thumbnail; a rerun only processes images that are new or changed since.
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from settings import *
+
+INDEX_PATH = os.path.join(player_images_path, 'thumbnails.json')
+THUMB_SIZE = (360, 480)       # 2x the 180x240 box of the Bio page
+FORMAT = 'webp'               # or 'jpeg'
+QUALITY = 80
+SOURCE_RE = re.compile(r'^(\d+)\.(?:jpe?g|png|webp|gif)$', re.IGNORECASE)
+STATIC_URL = 'app/static/players'
+
+
+def params():
+    # thumbnails made with other settings are rebuilt
+    return f"{THUMB_SIZE[0]}x{THUMB_SIZE[1]}-{FORMAT}-{QUALITY}"
+
+def load_index(path=INDEX_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_index(index, path=INDEX_PATH):
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def make_thumbnail(source, out_dir, known_sha=None, known_file=None):
+    """(source sha256, thumbnail file name) of one image; runs in a worker process.
+
+    An image whose bytes did not change (only its mtime) keeps its thumbnail.
+    """
+    with open(source, 'rb') as f:
+        data = f.read()
+    sha = hashlib.sha256(data).hexdigest()
+    if sha == known_sha and known_file and os.path.exists(os.path.join(out_dir, known_file)):
+        return sha, known_file
+
+    with Image.open(source) as img:
+        img.draft('RGB', THUMB_SIZE)    # JPEG: decode at a reduced scale, much faster for big photos
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if FORMAT == 'webp' and img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        # faces sit in the upper part of portraits: crop from there
+        thumb = ImageOps.fit(img, THUMB_SIZE, Image.LANCZOS, centering=(0.5, 0.3))
+    tmp = os.path.join(out_dir, f".{os.getpid()}-{os.path.basename(source)}.tmp")
+    thumb.save(tmp, FORMAT, quality=QUALITY, **({'method': 4} if FORMAT == 'webp' else {'optimize': True}))
+    with open(tmp, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    name = f"{digest}.{'jpg' if FORMAT == 'jpeg' else FORMAT}"
+    os.replace(tmp, os.path.join(out_dir, name))
+    return sha, name
+
+
+def build_thumbnails(source_dir=player_images_path, out_dir=player_thumbnails_path, index_path=INDEX_PATH,
+                     workers=None, prune=False):
+    """Bring the thumbnails and index up to date with the source images; returns counts."""
+    source_dir, out_dir = str(source_dir), str(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    index = load_index(index_path)
+    sources = {}
+    for name in os.listdir(source_dir):
+        match = SOURCE_RE.match(name)
+        if match:
+            sources[match.group(1)] = os.path.join(source_dir, name)
+
+    jobs, counts = [], {'unchanged': 0, 'processed': 0, 'failed': 0, 'removed': 0, 'pruned': 0}
+    for player_id, path in sources.items():
+        stat = os.stat(path)
+        entry = index.get(player_id)
+        if (entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+                and entry['source'] == os.path.basename(path) and entry['params'] == params()
+                and os.path.exists(os.path.join(out_dir, entry['file']))):
+            counts['unchanged'] += 1
+            continue
+        same_params = entry and entry['params'] == params()
+        jobs.append((player_id, path, stat, entry['sha256'] if same_params else None,
+                     entry['file'] if same_params else None))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(job, executor.submit(make_thumbnail, job[1], out_dir, job[3], job[4])) for job in jobs]
+            for (player_id, path, stat, _, _), future in futures:
+                try:
+                    sha, file = future.result()
+                except Exception as e:
+                    counts['failed'] += 1
+                    print(f"⚠️ {path}: {type(e).__name__}: {e}")
+                    continue
+                index[player_id] = {'file': file, 'sha256': sha, 'source': os.path.basename(path),
+                                    'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'params': params()}
+                counts['processed'] += 1
+
+    for player_id in [player_id for player_id in index if player_id not in sources]:
+        del index[player_id]
+        counts['removed'] += 1
+    save_index(index, index_path)
+
+    if prune:
+        # thumbnails no player points at any more (the page may still show them until its next index reload)
+        used = {entry['file'] for entry in index.values()}
+        for name in os.listdir(out_dir):
+            if name not in used and not name.startswith('.'):
+                os.remove(os.path.join(out_dir, name))
+                counts['pruned'] += 1
+    return counts
+
+
+_thumbnails = {'mtime_ns': None, 'files': {}}
+_thumbnails_lock = threading.Lock()
+
+def thumbnail_file(player_id, index_path=INDEX_PATH):
+    """File name under static/players/ of a player's thumbnail, or None. Reloads the index when it is rebuilt."""
+    with _thumbnails_lock:
+        try:
+            mtime_ns = os.stat(index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime_ns != _thumbnails['mtime_ns']:
+            _thumbnails['files'] = {int(pid): entry['file'] for pid, entry in load_index(index_path).items()}
+            _thumbnails['mtime_ns'] = mtime_ns
+        return _thumbnails['files'].get(int(player_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the player thumbnails of the Bio page")
+    parser.add_argument('--workers', type=int, help="processes (default: one per CPU)")
+    parser.add_argument('--prune', action='store_true', help="delete thumbnails no player uses any more")
+    parser.add_argument('--source-dir', default=str(player_images_path), help="downloaded images (<player_id>.<ext>)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = build_thumbnails(args.source_dir, workers=args.workers, prune=args.prune)
+    print(f"🖼️ {counts} in {time.perf_counter() - start:.2f}s, index: {INDEX_PATH}")
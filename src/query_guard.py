@@ -0,0 +1,237 @@
+# Limits for SQL the app did not write itself: the chat engine's LLM-generated queries and
+# the free-form SQL of the Stat page explorer. A query is planned first and rejected when it
+# would scan a large table without an index (SQLite) or build a huge join (DuckDB), then run
+# under a wall-clock deadline with capped result rows / memory.
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from settings import *
+from src.serving_indexes import table_scans
+
+TIMEOUT_SECONDS = 10
+MAX_ROWS = 1000                      # rows returned, the rest is cut off
+MAX_RESULT_BYTES = 64 * 1024 ** 2
+LARGE_TABLE_ROWS = 200_000           # SQLite: full scans of bigger tables are rejected
+MAX_ESTIMATED_ROWS = 50_000_000      # DuckDB: largest row estimate of any operator
+MAX_JOIN_PAIRS = 10_000_000          # DuckDB: cross products / nested-loop joins
+DUCKDB_MEMORY_LIMIT = '1GB'
+PROGRESS_STEPS = 10_000              # SQLite VM instructions between deadline checks
+FETCH_ROWS = 500
+
+DUCKDB_ESTIMATE_RE = re.compile(r'~([\d,]+) rows', re.IGNORECASE)
+DUCKDB_PAIR_JOINS = ('CROSS_PRODUCT', 'NESTED_LOOP_JOIN', 'BLOCKWISE_NL_JOIN', 'PIECEWISE_MERGE_JOIN')
+
+
+class QueryRejected(ValueError):
+    """The query plan is too expensive to run."""
+
+class QueryTimeout(TimeoutError):
+    """The query ran past its deadline and was interrupted."""
+
+
+_counts = {'checked': 0, 'rejected': 0, 'timed_out': 0, 'truncated': 0}
+_counts_lock = threading.Lock()
+
+def _count(name):
+    with _counts_lock:
+        _counts[name] += 1
+
+def guard_stats():
+    """Guarded queries since the process started: checked, rejected by plan, timed out, truncated."""
+    with _counts_lock:
+        return dict(_counts)
+
+
+# --------------------------------------------------
+# Plan checks
+# --------------------------------------------------
+
+_table_rows = {}    # (database file, inode, mtime) -> {table: rows}
+_table_rows_lock = threading.Lock()
+
+def sqlite_table_rows(conn):
+    # row counts from the ANALYZE statistics of the clean pipeline (first number of sqlite_stat1.stat),
+    # read again when the file is replaced (snapshot install) or rewritten (clean_data.py)
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    try:
+        stat = os.stat(path)
+        key = (path, stat.st_ino, stat.st_mtime_ns)
+    except OSError:
+        key = (path, None, None)    # in-memory / temporary database
+    with _table_rows_lock:
+        if key in _table_rows:
+            return _table_rows[key]
+    rows = {}
+    try:
+        for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+            rows[table] = max(rows.get(table, 0), int(stat.split()[0]))
+    except sqlite3.OperationalError:
+        pass    # not analyzed: no table counts as large
+    with _table_rows_lock:
+        for old in [old for old in _table_rows if old[0] == path]:
+            del _table_rows[old]
+        _table_rows[key] = rows
+    return rows
+
+def check_sqlite_plan(conn, sql, params=(), large_rows=LARGE_TABLE_ROWS):
+    rows = sqlite_table_rows(conn)
+    large = [table for table in table_scans(conn, sql, params) if rows.get(table, 0) > large_rows]
+    if large:
+        _count('rejected')
+        raise QueryRejected(
+            f"Query rejected: full scan of {', '.join(sorted(set(large)))} "
+            f"({', '.join(f'{rows[t]:,}' for t in sorted(set(large)))} rows). Filter on an indexed column "
+            f"(player_id, player_club_id, game_id, date) instead; find players with "
+            f"player_id IN (SELECT player_id FROM players WHERE name LIKE ...)."
+        )
+
+def check_duckdb_plan(con, sql, params=(), max_rows=MAX_ESTIMATED_ROWS, max_pairs=MAX_JOIN_PAIRS):
+    plan = '\n'.join(str(row[1]) for row in con.execute(f"EXPLAIN {sql}", list(params)).fetchall())
+    estimates = sorted((int(n.replace(',', '')) for n in DUCKDB_ESTIMATE_RE.findall(plan)), reverse=True)
+    reason = None
+    if estimates and estimates[0] > max_rows:
+        reason = f"an operator of ~{estimates[0]:,} rows"
+    elif any(join in plan for join in DUCKDB_PAIR_JOINS) and len(estimates) >= 2 \
+            and estimates[0] * estimates[1] > max_pairs:
+        reason = f"a join without equality condition over ~{estimates[0]:,} x ~{estimates[1]:,} rows"
+    if reason:
+        _count('rejected')
+        raise QueryRejected(f"Query rejected: {reason}. Add a join condition or a filter.")
+
+
+# --------------------------------------------------
+# Deadlines
+# --------------------------------------------------
+
+@contextmanager
+def sqlite_deadline(conn, seconds=TIMEOUT_SECONDS):
+    # the progress handler aborts the statement ('interrupted') once the deadline has passed
+    deadline = time.monotonic() + seconds
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if 'interrupted' not in str(e):
+            raise
+        _count('timed_out')
+        raise QueryTimeout(f"Query stopped after {seconds}s") from e
+    finally:
+        conn.set_progress_handler(None, PROGRESS_STEPS)
+
+@contextmanager
+def duckdb_deadline(con, seconds=TIMEOUT_SECONDS):
+    timer = threading.Timer(seconds, con.interrupt)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    except Exception as e:
+        if timer.finished.is_set() and 'interrupt' in str(e).lower():
+            _count('timed_out')
+            raise QueryTimeout(f"Query stopped after {seconds}s") from e
+        raise
+    finally:
+        timer.cancel()
+
+
+# --------------------------------------------------
+# Guarded runs
+# --------------------------------------------------
+
+def _fetch(cursor, max_rows, max_bytes):
+    # (DataFrame of at most max_rows rows / ~max_bytes, whether rows were cut off)
+    columns = [d[0] for d in cursor.description or []]
+    chunks, rows, size, truncated = [], 0, 0, False
+    while True:
+        batch = cursor.fetchmany(min(FETCH_ROWS, max_rows + 1 - rows))
+        if not batch:
+            break
+        chunk = pd.DataFrame.from_records(batch, columns=columns)
+        chunks.append(chunk)
+        rows += len(chunk)
+        size += int(chunk.memory_usage(deep=True).sum())
+        if rows > max_rows or size > max_bytes:
+            truncated = True
+            break
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    if truncated:
+        _count('truncated')
+        df = df.head(max_rows)
+    return df, truncated
+
+def run_sqlite(conn, sql, params=(), timeout=TIMEOUT_SECONDS, max_rows=MAX_ROWS,
+               max_bytes=MAX_RESULT_BYTES, large_rows=LARGE_TABLE_ROWS):
+    """(DataFrame, truncated) of a query checked and run on a read-only SQLite connection."""
+    _count('checked')
+    with sqlite_deadline(conn, timeout):
+        check_sqlite_plan(conn, sql, params, large_rows)
+        cursor = conn.execute(sql, params)
+        try:
+            return _fetch(cursor, max_rows, max_bytes)
+        finally:
+            cursor.close()
+
+def limit_duckdb_memory(con, memory_limit=DUCKDB_MEMORY_LIMIT):
+    # memory_limit is a setting of the whole database, shared by all its cursors and running
+    # queries: set it once, by the owner of the connection, when it is opened
+    con.execute(f"SET memory_limit = '{memory_limit}'")
+    return con
+
+def run_duckdb(con, sql, params=(), timeout=TIMEOUT_SECONDS, max_rows=MAX_ROWS, max_bytes=MAX_RESULT_BYTES):
+    """(DataFrame, truncated) of a query checked and run on a DuckDB connection or cursor.
+
+    The memory cap comes from the connection (limit_duckdb_memory), this never changes its settings.
+    """
+    _count('checked')
+    with duckdb_deadline(con, timeout):
+        check_duckdb_plan(con, sql, params)
+        con.execute(sql, list(params))
+        return _fetch(con, max_rows, max_bytes)
+
+
+if __name__ == "__main__":
+    import duckdb
+    # SQLite: an indexed lookup runs, an unfiltered scan of a "large" table is rejected,
+    # a runaway cross join is stopped by the deadline
+    conn = sqlite3.connect(f"file:{os.path.join(db_path, 'clean_football.db')}?mode=ro", uri=True)
+    df, truncated = run_sqlite(conn, "SELECT SUM(goals) FROM appearances WHERE player_id = ?", (0,), large_rows=1000)
+    print("✅ indexed lookup:", df.iat[0, 0])
+    # unfiltered reads, also those the plan serves from a (covering) index scan, a skip-scan
+    # or a one-sided range
+    for sql in ["SELECT * FROM game_events WHERE description LIKE '%header%'",
+                "SELECT SUM(goals) FROM appearances",
+                "SELECT SUM(goals) FROM appearances WHERE date > '1900-01-01'",
+                "SELECT SUM(goals) FROM appearances WHERE player_id > 0",
+                "SELECT * FROM appearances WHERE rowid > 0",
+                "SELECT COUNT(*) FROM appearances",
+                "SELECT player_name, SUM(goals) FROM appearances GROUP BY player_name",
+                "SELECT COUNT(*) FROM appearances a JOIN appearances b ON a.player_club_id = b.player_club_id"]:
+        try:
+            run_sqlite(conn, sql, large_rows=1000)
+            raise SystemExit(f"❌ not rejected: {sql}")
+        except QueryRejected as e:
+            print("✅", e)
+    start = time.perf_counter()
+    try:
+        run_sqlite(conn, "SELECT COUNT(*) FROM appearances a, appearances b, appearances c", timeout=1)
+    except QueryTimeout as e:
+        print(f"✅ {e} (returned in {time.perf_counter() - start:.2f}s)")
+    df, truncated = run_sqlite(conn, "SELECT * FROM appearances", max_rows=50)
+    print(f"✅ {len(df)} rows, truncated={truncated}")
+
+    # DuckDB: a cross product of two large frames is rejected from its plan
+    con = limit_duckdb_memory(duckdb.connect())
+    con.register("big", pd.DataFrame({'x': range(1_000_000)}))
+    try:
+        run_duckdb(con, "SELECT COUNT(*) FROM big a, big b")
+    except QueryRejected as e:
+        print("✅", e)
+    start = time.perf_counter()
+    try:
+        run_duckdb(con, "SELECT COUNT(*) FROM big a JOIN big b ON a.x % 7 = b.x % 11", timeout=1)
+    except (QueryTimeout, QueryRejected) as e:
+        print(f"✅ {e} (returned in {time.perf_counter() - start:.2f}s)")
+    print(guard_stats())
@@ -0,0 +1,250 @@
+# Read access to the clean database for the pages, the chat engine and the scripts.
+# One Repository per database file and process: pooled read-only connections,
+# the registry columns / dtypes of src/schemas.py, and per-query timings.
+# Query names follow src/serving_queries.py, whose plans the clean pipeline checks.
+import os
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from settings import *
+from src.columnar_store import connect_columnar
+from src.snapshot import is_installed_snapshot
+from src.schemas import select_list, apply_schema
+from src.query_guard import run_sqlite, run_duckdb, limit_duckdb_memory
+
+POOL_SIZE = 4
+CACHED_STATEMENTS = 256        # prepared statements kept per connection
+READER_PRAGMAS = (
+    "PRAGMA mmap_size = 1073741824",     # read pages straight from the OS page cache
+    "PRAGMA cache_size = -65536",        # 64 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA query_only = ON",
+)
+
+
+class ReadPool:
+    """Read-only connections to one SQLite file, shared by the threads of the process.
+
+    immutable: open without locking or change detection. Only safe for a file nothing
+    writes in place, i.e. a snapshot renamed into place by src/snapshot.py; a database the
+    clean pipeline (BulkWriter, WAL) may be rewriting gets normal mode=ro connections.
+    Either way the pool checks the file identity on checkout and opens fresh connections
+    when the database was replaced, e.g. by a new clean run or snapshot download.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, immutable=False):
+        self.path = str(path)
+        self.size = size
+        self.immutable = immutable
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._generation = 0
+        self._file_id = self._stat()
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def connect(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro{'&immutable=1' if self.immutable else ''}", uri=True,
+                               check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+        for pragma in READER_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _reopen_if_replaced(self):
+        file_id = self._stat()
+        if file_id == self._file_id:
+            return
+        with self._lock:
+            if file_id == self._file_id:
+                return
+            self._file_id = file_id
+            self._generation += 1
+            self._opened = 0
+            while not self._idle.empty():
+                self._idle.get_nowait()[1].close()
+
+    @contextmanager
+    def connection(self):
+        self._reopen_if_replaced()
+        try:
+            generation, conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._opened < self.size
+                if grow:
+                    self._opened += 1
+                generation = self._generation
+            generation, conn = (generation, self.connect()) if grow else self._idle.get()
+        try:
+            yield conn
+        finally:
+            # connections of a replaced file are closed instead of going back to the pool
+            if generation == self._generation:
+                self._idle.put((generation, conn))
+            else:
+                conn.close()
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait()[1].close()
+
+
+class Repository:
+    """Queries of the app, on SQLite or on the columnar copy chosen by DATA_BACKEND."""
+
+    def __init__(self, path, backend=DATA_BACKEND, pool_size=POOL_SIZE):
+        self.path = str(path)
+        self.backend = backend
+        self.pool_size = pool_size
+        self._pool = None
+        self._columnar_con = None
+        self._stats = {}           # query name -> [calls, total seconds, max seconds]
+        self._stats_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ReadPool(self.path, self.pool_size, immutable=is_installed_snapshot(self.path))
+        return self._pool
+
+    def _columnar(self):
+        # the process-wide DuckDB connection; the guard's memory cap applies to all its cursors
+        if self._columnar_con is None:
+            self._columnar_con = limit_duckdb_memory(connect_columnar(self.backend))
+        return self._columnar_con
+
+    def _record(self, name, elapsed):
+        with self._stats_lock:
+            calls, total, slowest = self._stats.get(name, (0, 0.0, 0.0))
+            self._stats[name] = [calls + 1, total + elapsed, max(slowest, elapsed)]
+
+    def query(self, name, sql, params=()):
+        """Run a read query, timed under `name`."""
+        start = time.perf_counter()
+        if self.backend == 'sqlite':
+            with self.pool.connection() as conn:
+                df = pd.read_sql(sql, conn, params=params)
+        else:
+            # one cursor per call, the shared DuckDB connection is not safe across threads
+            cursor = self._columnar().cursor()
+            try:
+                df = cursor.execute(sql, list(params)).df()
+            finally:
+                cursor.close()
+        self._record(name, time.perf_counter() - start)
+        return df
+
+    def guarded_query(self, sql, name='llm_sql'):
+        """(DataFrame, truncated) of SQL the app did not write, under the limits of src/query_guard.py."""
+        start = time.perf_counter()
+        try:
+            if self.backend == 'sqlite':
+                with self.pool.connection() as conn:
+                    return run_sqlite(conn, sql)
+            cursor = self._columnar().cursor()
+            try:
+                return run_duckdb(cursor, sql)
+            finally:
+                cursor.close()
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    def stats(self):
+        """Per-query timings since the process started, slowest total first."""
+        with self._stats_lock:
+            rows = [(name, calls, total * 1000, total / calls * 1000, slowest * 1000)
+                    for name, (calls, total, slowest) in self._stats.items()]
+        df = pd.DataFrame(rows, columns=['query', 'calls', 'total_ms', 'mean_ms', 'max_ms'])
+        return df.sort_values('total_ms', ascending=False, ignore_index=True)
+
+    def _table(self, name, table, where='', params=(), columns=None):
+        df = self.query(name, f"SELECT {select_list(table, columns=columns)} FROM {table} {where}", params)
+        return apply_schema(df, table)
+
+    # ---------- players ----------
+    def players(self, columns=None):
+        return self._table('bio_players', 'players', columns=columns)
+
+    # ---------- appearances ----------
+    def appearances(self, player_id):
+        return self._table('stat_appearances', 'appearances', "WHERE player_id = ?", (player_id,))
+
+    def season_stats(self, player_id):
+        return self._table('stat_season_stats', 'player_season_stats',
+                           "WHERE player_id = ? ORDER BY season_start", (player_id,))
+
+    def season_positions(self, player_id):
+        return self._table('stat_season_positions', 'player_season_positions', "WHERE player_id = ?", (player_id,))
+
+    # ---------- transfers ----------
+    def transfers(self, player_id):
+        df = self._table('transfer_history', 'transfers', "WHERE player_id = ?", (player_id,))
+        df["transfer_date"] = pd.to_datetime(df["transfer_date"], errors="coerce")
+        return df.sort_values("transfer_date")
+
+    # ---------- clubs ----------
+    def club_names(self):
+        df = self.query('club_map', "SELECT club_id, name FROM clubs")
+        return dict(zip(df["club_id"], df["name"]))
+
+    # ---------- lineups ----------
+    def lineups(self, player_id):
+        return self._table('lineups_player', 'game_lineups', "WHERE player_id = ? ORDER BY date", (player_id,))
+
+    # ---------- SQLAlchemy, for the chat engine ----------
+    def sqlalchemy_engine(self):
+        """Engine over the SQLite file, for SQLDatabase's table metadata (same tables on every backend).
+
+        The generated SQL itself runs through guarded_query(), on DATA_BACKEND.
+        """
+        # SQLAlchemy owns these connections, opened with the pool's settings
+        return create_engine("sqlite://", creator=self.pool.connect, poolclass=QueuePool, pool_size=2)
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+def get_repository():
+    """The process-wide repository of the app database (downloaded on first use)."""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = Repository(download_db_path())
+    return _repository
+
+def use_database(path, backend=DATA_BACKEND):
+    """Make get_repository() serve another database file (evaluation fixtures, scripts); call before first use."""
+    global _repository
+    with _repository_lock:
+        _repository = Repository(path, backend)
+    return _repository
+
+
+if __name__ == "__main__":
+    # Page loaders: a new connection per call (before) vs the pooled repository
+    clean_db = os.path.join(db_path, 'clean_football.db')
+    repo = Repository(clean_db, backend='sqlite')
+    player_ids = repo.query('sample', "SELECT player_id FROM players LIMIT 200")['player_id'].tolist()
+    sql = f"SELECT {select_list('player_season_stats')} FROM player_season_stats WHERE player_id = ?"
+
+    start = time.perf_counter()
+    for player_id in player_ids:
+        with sqlite3.connect(clean_db) as conn:
+            pd.read_sql(sql, conn, params=(player_id,))
+    per_call = (time.perf_counter() - start) / len(player_ids)
+
+    start = time.perf_counter()
+    for player_id in player_ids:
+        repo.query('stat_season_stats', sql, (player_id,))
+    pooled = (time.perf_counter() - start) / len(player_ids)
+
+    print(f"connect per call: {per_call * 1000:,.3f} ms/query, pooled: {pooled * 1000:,.3f} ms/query")
+    print(repo.stats().to_string(index=False))
@@ -0,0 +1,209 @@
+# Schema section of the text-to-SQL prompt, generated from the clean database when the
+# chat engine is built. Each question gets only the tables and columns it needs, in
+# one compact line per table, instead of a fixed hand-written schema or the reflected
+# CREATE TABLE statements + sample rows of every table.
+import re
+import time
+import threading
+from settings import *
+
+HIDDEN_TABLE_RE = re.compile(r'^(?:_|sqlite_)')
+DEFAULT_TABLES = ('appearances', 'players', 'clubs')    # questions no keyword matches
+
+# keyword -> tables; English keywords match the start of a word, Thai ones anywhere
+TABLE_KEYWORDS = {
+    'appearances': ['goal', 'scor', 'assist', 'card', 'yellow', 'red', 'minute', 'appear', 'played',
+                    'ประตู', 'ยิง', 'แอสซิส', 'ใบเหลือง', 'ใบแดง', 'นาที', 'ลงสนาม'],
+    'players': ['player', 'height', 'tall', 'foot', 'footed', 'position', 'born', 'age', 'old', 'young',
+                'national', 'citizen', 'country', 'value', 'worth', 'agent', 'ผู้เล่น', 'นักเตะ', 'ส่วนสูง',
+                'ตำแหน่ง', 'อายุ', 'สัญชาติ', 'มูลค่า', 'เท้า', 'เกิด'],
+    'clubs': ['club', 'team', 'stadium', 'squad', 'foreign', 'สโมสร', 'ทีม', 'สนาม'],
+    'games': ['game', 'match', 'win', 'won', 'lose', 'lost', 'draw', 'result', 'home', 'away', 'attendance',
+              'referee', 'round', 'formation', 'manager', 'coach', 'นัด', 'แมตช์', 'ชนะ', 'แพ้', 'เสมอ',
+              'เหย้า', 'เยือน', 'ผู้ชม', 'ผู้ตัดสิน', 'โค้ช', 'ผู้จัดการทีม'],
+    'transfers': ['transfer', 'fee', 'sign', 'sold', 'bought', 'join', 'left', 'leave', 'moved',
+                  'ย้าย', 'ค่าตัว', 'ซื้อ', 'ขาย'],
+    'game_lineups': ['lineup', 'starting', 'captain', 'bench', 'substitute', 'shirt', 'ตัวจริง', 'ตัวสำรอง',
+                     'กัปตัน', 'เบอร์เสื้อ'],
+    'game_events': ['event', 'substitution', 'own goal', 'เปลี่ยนตัว'],
+    'competitions': ['competition', 'league', 'cup', 'tournament', 'ลีก', 'ถ้วย', 'รายการ'],
+    'player_valuations': ['valuation', 'history', 'highest', 'peak', 'ประวัติมูลค่า'],
+    'player_season_stats': ['per season', 'each season', 'every season', 'career', 'ทุกฤดูกาล', 'แต่ละฤดูกาล'],
+}
+# question word -> column name part, for words that are not part of a column name
+COLUMN_SYNONYMS = {
+    'scor': 'goals', 'ประตู': 'goals', 'ยิง': 'goals', 'แอสซิส': 'assists', 'card': 'cards',
+    'ใบเหลือง': 'yellow', 'ใบแดง': 'red', 'นาที': 'minutes', 'tall': 'height', 'ส่วนสูง': 'height',
+    'footed': 'foot', 'เท้า': 'foot', 'age': 'birth', 'old': 'birth', 'young': 'birth', 'born': 'birth',
+    'อายุ': 'birth', 'เกิด': 'birth', 'national': 'citizenship', 'สัญชาติ': 'citizenship', 'worth': 'market',
+    'value': 'market', 'มูลค่า': 'market', 'ค่าตัว': 'fee', 'ตำแหน่ง': 'position', 'capacity': 'seats',
+    'coach': 'manager', 'โค้ช': 'manager', 'ผู้จัดการทีม': 'manager', 'ผู้ชม': 'attendance',
+    'ผู้ตัดสิน': 'referee', 'won': 'win', 'ชนะ': 'win', 'กัปตัน': 'captain', 'shirt': 'number',
+    'เบอร์เสื้อ': 'number', 'foreign': 'foreigners', 'peak': 'highest',
+}
+# always described when their table is picked: keys, names, dates and the headline numbers
+CORE_COLUMNS = {
+    'appearances': ['game_id', 'player_id', 'player_name', 'player_club_id', 'date', 'goals', 'assists'],
+    'players': ['player_id', 'name', 'current_club_id', 'current_club_name', 'position'],
+    'clubs': ['club_id', 'name'],
+    'games': ['game_id', 'competition_id', 'season', 'date', 'home_club_id', 'away_club_id', 'home_club_name',
+              'away_club_name', 'home_club_goals', 'away_club_goals'],
+    'transfers': ['player_id', 'player_name', 'transfer_date', 'from_club_id', 'to_club_id', 'from_club_name',
+                  'to_club_name', 'transfer_fee'],
+    'game_lineups': ['game_id', 'player_id', 'player_name', 'club_id', 'date', 'type', 'position'],
+    'game_events': ['game_id', 'date', 'minute', 'type', 'club_id', 'player_id', 'description'],
+    'competitions': ['competition_id', 'name', 'type', 'country_name'],
+    'player_valuations': ['player_id', 'date', 'market_value_in_eur'],
+    'player_season_stats': ['player_id', 'player_name', 'season_start', 'season', 'club_name', 'matches',
+                            'goals', 'assists'],
+}
+NOTES = {
+    'appearances': "one row per player per game; club goals in a season = SUM(goals) WHERE player_club_id = club_id",
+    'clubs': "join on club_id to name any *_club_id",
+    'appearances.date': "'YYYY-MM-DD HH:MM:SS'",
+    'games.season': "start year, 2021 = 2021/22",
+    'game_lineups.type': "'starting_lineup' | 'substitutes'",
+    'player_season_stats.season_start': "2021 = 2021/22",
+    'transfers.transfer_fee': "EUR, 0 free, -1 unknown",
+    'transfers.market_value_in_eur': "-1 unknown",
+    'players.market_value_in_eur': "EUR, -1 unknown",
+    'players.height_in_cm': "-1 unknown",
+    'club_games.hosting': "'Home' | 'Away'",
+}
+
+
+def _matches(keyword, text, words):
+    if re.search('[a-z]', keyword):
+        return any(word.startswith(keyword) for word in words) if ' ' not in keyword else keyword in text
+    return keyword in text
+
+
+class SchemaContext:
+    """Column lists of the clean database, described per question."""
+
+    def __init__(self, columns):
+        self.columns = columns      # table -> [(column, type)]
+
+    @classmethod
+    def from_connection(cls, conn):
+        tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+                  if not HIDDEN_TABLE_RE.match(name)]
+        return cls({table: [(row[1], row[2] or 'TEXT') for row in conn.execute(f"PRAGMA table_info({table})")]
+                    for table in tables})
+
+    def select(self, question, names=None):
+        """{table: [columns]} a question needs. names: src/intent_router.NameIndex, to spot club / player names."""
+        text = question.lower()
+        words = re.findall(r'[a-z]+', text)
+        tables = [table for table, keywords in TABLE_KEYWORDS.items()
+                  if table in self.columns and any(_matches(k, text, words) for k in keywords)]
+        if names is not None:
+            kinds = {kind for kind, *_ in names.find(question)}
+            # named clubs / players are looked up by id in their own table (prompt rules 3 and 6)
+            for kind, table in (('club', 'clubs'), ('player', 'players')):
+                if kind in kinds and table not in tables:
+                    tables.append(table)
+        if not tables:
+            tables = [table for table in DEFAULT_TABLES if table in self.columns]
+
+        parts = set(words) | {COLUMN_SYNONYMS[k] for k in COLUMN_SYNONYMS if _matches(k, text, words)}
+        selection = {}
+        for table in tables:
+            core = CORE_COLUMNS.get(table)
+            selection[table] = [
+                column for column, _ in self.columns[table]
+                if core is None or column in core
+                or any(part in parts or part.rstrip('s') in parts for part in column.split('_') if len(part) > 2)
+            ]
+        return selection
+
+    def describe(self, selection=None):
+        """Prompt text for {table: [columns]}, a list of tables, or every table (None)."""
+        if selection is None:
+            selection = list(self.columns)
+        if not isinstance(selection, dict):
+            selection = {table: None for table in selection}
+        lines = []
+        for table, wanted in selection.items():
+            columns = []
+            for column, dtype in self.columns[table]:
+                if wanted is None or column in wanted:
+                    note = NOTES.get(f'{table}.{column}')
+                    columns.append(f"{column} {dtype}" + (f" -- {note}" if note else ''))
+            lines.append(f"{table}({', '.join(columns)})")
+            if table in NOTES:
+                lines.append(f"  -- {NOTES[table]}")
+        return '\n'.join(lines)
+
+
+_context = None
+_context_lock = threading.Lock()
+
+def get_schema_context(repo=None):
+    """Built once per process from the app database (the SQLite file of every backend)."""
+    global _context
+    with _context_lock:
+        if _context is None:
+            from src.repository import get_repository
+            with (repo or get_repository()).pool.connection() as conn:
+                _context = SchemaContext.from_connection(conn)
+    return _context
+
+
+_encoding = None
+
+def count_tokens(text):
+    # cl100k tokens when tiktoken (a langchain-openai dependency) can load its encoding
+    # (downloaded on first use), else ~4 characters a token
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = False
+    return len(_encoding.encode(text)) if _encoding else len(text) // 4
+
+
+if __name__ == "__main__":
+    # Prompt tokens of the schema section: reflected table_info of SQLDatabase (all tables,
+    # 3 sample rows), every table in the compact format, and the per-question selection
+    from src.repository import Repository
+    from src.intent_router import NameIndex
+    from src.llm_chat_engine import PROMPT_TEMPLATE
+    repo = Repository(os.path.join(db_path, 'clean_football.db'), backend='sqlite')
+    start = time.perf_counter()
+    context = get_schema_context(repo)
+    print(f"📐 schema of {len(context.columns)} tables read in {(time.perf_counter() - start) * 1000:,.1f} ms")
+    names = NameIndex(repo.players(['player_id', 'name', 'market_value_in_eur']), repo.club_names())
+    rules_tokens = count_tokens(PROMPT_TEMPLATE.replace('{table_info}', ''))
+
+    try:
+        from langchain_community.utilities import SQLDatabase
+        db = SQLDatabase(repo.sqlalchemy_engine())
+        start = time.perf_counter()
+        reflected = db.get_table_info()
+        print(f"reflected table_info: {count_tokens(reflected):,} tokens, "
+              f"{(time.perf_counter() - start) * 1000:,.0f} ms per request")
+    except ImportError:
+        print("langchain-community not installed, skipping the reflected table_info")
+    print(f"compact, all tables:  {count_tokens(context.describe()):,} tokens")
+    print(f"rules + question template: {rules_tokens:,} tokens\n")
+
+    questions = [
+        "How many goals did Haaland score in 2023?",
+        "Who transferred out of Manchester United in 2021?",
+        "How many goals did Liverpool score in the 2021/2022 season?",
+        "Which player has the highest market value?",
+        "Messi ได้ใบเหลืองกี่ใบในฤดูกาล 2021/22",
+        "How many home games did Liverpool win in 2022?",
+        "Who was the captain in the most starting lineups?",
+        "Tell me about Messi",
+    ]
+    for question in questions:
+        start = time.perf_counter()
+        selection = context.select(question, names)
+        schema = context.describe(selection)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{count_tokens(schema):5,} tokens {elapsed:6.2f} ms  {question}\n"
+              f"      {', '.join(f'{t}[{len(c)}]' for t, c in selection.items())}")
@@ -0,0 +1,216 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CHUNK_SIZE = 200_000
+DATETIME = 'datetime64[ns]'
+
+# table -> {column: dtype}, in table order. Only these columns are read, by the
+# cleaning stages (raw tables) and by the page loaders (clean tables).
+# None keeps the column as loaded: it is cleaned into another type later on, or
+# holds mixed values ('-' placeholders, float ids written as text) that must stay as they are.
+SCHEMAS = {
+    'appearances': {
+        'appearance_id': object,
+        'game_id': 'Int32',
+        'player_id': 'Int32',
+        'player_club_id': 'Int32',
+        'player_current_club_id': 'Int32',
+        'date': DATETIME,
+        'player_name': object,
+        'competition_id': 'category',
+        'yellow_cards': 'Int8',
+        'red_cards': 'Int8',
+        'goals': 'Int8',
+        'assists': 'Int8',
+        'minutes_played': 'Int16',
+    },
+    'club_games': {
+        'game_id': 'Int32',
+        'club_id': 'Int32',
+        'own_goals': None,
+        'own_position': None,
+        'own_manager_name': object,
+        'opponent_id': 'Int32',
+        'opponent_goals': None,
+        'opponent_position': None,
+        'opponent_manager_name': object,
+        'hosting': 'category',
+        'is_win': 'Int8',
+    },
+    'clubs': {
+        'club_id': 'Int32',
+        'club_code': object,
+        'name': object,
+        'squad_size': 'Int16',
+        'average_age': None,
+        'foreigners_number': 'Int16',
+        'foreigners_percentage': None,
+        'national_team_players': 'Int16',
+        'stadium_name': object,
+        'stadium_seats': 'Int32',
+        'net_transfer_record': None,
+        'last_season': 'Int16',
+    },
+    'competitions': {
+        'competition_id': object,
+        'competition_code': object,
+        'name': object,
+        'sub_type': object,
+        'type': object,
+        'country_id': 'Int32',
+        'country_name': object,
+        'domestic_league_code': object,
+        'confederation': object,
+        'is_major_national_league': None,
+    },
+    'game_events': {
+        'game_event_id': object,
+        'date': DATETIME,
+        'game_id': 'Int32',
+        'minute': 'Int16',
+        'type': 'category',
+        'club_id': 'Int32',
+        'player_id': 'Int32',
+        'description': object,
+        'player_in_id': None,
+        'player_assist_id': None,
+    },
+    'game_lineups': {
+        'game_lineups_id': object,
+        'date': DATETIME,
+        'game_id': 'Int32',
+        'player_id': 'Int32',
+        'club_id': 'Int32',
+        'player_name': object,
+        'type': 'category',
+        'position': 'category',
+        'number': None,
+        'team_captain': None,
+    },
+    'games': {
+        'game_id': 'Int32',
+        'competition_id': 'category',
+        'season': None,
+        'round': 'category',
+        'date': DATETIME,
+        'home_club_id': None,
+        'away_club_id': None,
+        'home_club_goals': None,
+        'away_club_goals': None,
+        'home_club_position': None,
+        'away_club_position': None,
+        'home_club_manager_name': object,
+        'away_club_manager_name': object,
+        'stadium': object,
+        'attendance': None,
+        'referee': object,
+        'home_club_formation': 'category',
+        'away_club_formation': 'category',
+        'home_club_name': object,
+        'away_club_name': object,
+        'aggregate': object,
+        'competition_type': 'category',
+    },
+    'player_valuations': {
+        'player_id': 'Int32',
+        'date': DATETIME,
+        'market_value_in_eur': None,
+        'current_club_id': 'Int32',
+        'player_club_domestic_competition_id': 'category',
+    },
+    'players': {
+        'player_id': 'Int32',
+        'first_name': object,
+        'last_name': object,
+        'name': object,
+        'last_season': 'Int16',
+        'current_club_id': 'Int32',
+        'player_code': object,
+        'country_of_birth': 'category',
+        'city_of_birth': object,
+        'country_of_citizenship': 'category',
+        'date_of_birth': None,
+        'sub_position': 'category',
+        'position': 'category',
+        'foot': 'category',
+        'height_in_cm': None,
+        'agent_name': object,
+        'current_club_domestic_competition_id': 'category',
+        'current_club_name': object,
+        'market_value_in_eur': None,
+        'highest_market_value_in_eur': None,
+    },
+    'transfers': {
+        'player_id': 'Int32',
+        'transfer_date': None,
+        'transfer_season': 'category',
+        'from_club_id': 'Int32',
+        'to_club_id': 'Int32',
+        'from_club_name': object,
+        'to_club_name': object,
+        'transfer_fee': None,
+        'market_value_in_eur': None,
+        'player_name': object,
+    },
+    # materialized by clean_data.py for pages/player_stat.py. Labels stay object:
+    # the page groups / pivots on them and categoricals would add unused groups.
+    'player_season_stats': {
+        'player_id': 'Int32',
+        'player_name': object,
+        'season_start': 'Int16',
+        'season': object,
+        'player_club_id': 'Int32',
+        'club_name': object,
+        'matches': 'Int16',
+        'goals': 'Int16',
+        'assists': 'Int16',
+        'minutes_played': 'Int32',
+        'yellow_cards': 'Int16',
+        'red_cards': 'Int16',
+        'first_date': object,
+        'last_date': object,
+    },
+    'player_season_positions': {
+        'player_id': 'Int32',
+        'player_name': object,
+        'season_start': 'Int16',
+        'season': object,
+        'club_id': 'Int32',
+        'position': object,
+        'matches': 'Int16',
+    },
+}
+
+
+def select_list(table, alias=None, columns=None):
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(f'{prefix}{col}' for col in columns or SCHEMAS[table])
+
+def apply_schema(df, table):
+    # Cast the columns of df that the registry types, in place
+    for col, dtype in SCHEMAS[table].items():
+        if dtype is None or dtype is object or col not in df:
+            continue
+        if dtype == DATETIME:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def concat_chunks(chunks):
+    # pd.concat turns categoricals with different categories back into object
+    categorical = [col for col, dtype in chunks[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    for col in categorical:
+        categories = union_categoricals([chunk[col] for chunk in chunks]).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+def read_table(conn, table, where='', params=(), source=None, alias=None, chunksize=CHUNK_SIZE):
+    """Read the registry columns of `table`, compacting each chunk before the next one is loaded.
+
+    source / alias: FROM clause and table alias when the rows are selected through a join
+    """
+    sql = f"SELECT {select_list(table, alias)} FROM {source or table} {where}"
+    chunks = [apply_schema(chunk, table) for chunk in pd.read_sql(sql, conn, params=params, chunksize=chunksize)]
+    return concat_chunks(chunks)
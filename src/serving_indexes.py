@@ -0,0 +1,98 @@
+import os
+import re
+import sqlite3
+from settings import *
+from src.serving_queries import SERVING_QUERIES, SERVING_INDEXES
+
+
+def build_serving_indexes(conn):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    # indexes taken out of SERVING_INDEXES, still maintained by incremental runs otherwise
+    for (index_name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall():
+        if index_name.startswith('idx_') and index_name not in SERVING_INDEXES:
+            print(f"🗑️ Drop {index_name}: no longer a serving index")
+            conn.execute(f"DROP INDEX {index_name}")
+    for index_name, (table, columns) in SERVING_INDEXES.items():
+        if table not in tables:
+            print(f"⚠️ Skip {index_name}: no table {table}")
+            continue
+        cols = ', '.join(columns)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({cols})")
+    conn.execute("ANALYZE")
+
+ALIAS_RE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+SQL_KEYWORDS = {'where', 'on', 'join', 'left', 'inner', 'cross', 'group', 'order', 'limit', 'using', 'natural'}
+
+def _aliases(sql):
+    aliases = {}
+    for table, alias in ALIAS_RE.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+SEARCH_TERMS_RE = re.compile(r'\((.*)\)\s*$')
+EQUALITY_RE = re.compile(r'^\w+=\?$')
+
+def _unbounded_search(detail):
+    # 'SEARCH t USING ... (terms)' that still reads the whole table / index: a skip-scan
+    # ('ANY(col) AND ...', one range per distinct leading value), a one-sided range
+    # ('date>?', 'rowid>?') or an automatic index, built by scanning the table first
+    if ' AUTOMATIC ' in detail:
+        return True
+    match = SEARCH_TERMS_RE.search(detail)
+    if not match:
+        return False
+    terms = match.group(1).split(' AND ')
+    if terms[0].startswith('ANY('):
+        return True
+    if any(EQUALITY_RE.match(term) for term in terms):
+        return False
+    return not (any('>' in term for term in terms) and any('<' in term for term in terms))
+
+def table_scans(conn, sql, params=()):
+    # Tables read in full in the query plan: every SCAN of a table, also 'SCAN t USING
+    # [COVERING] INDEX ...' (the whole index, in index order), and the SEARCH lines that
+    # are not bounded by an equality or a two-sided range (see _unbounded_search)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    aliases = _aliases(sql)
+    scans = []
+    for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+        words = detail.split()
+        if len(words) > 1 and (words[0] == 'SCAN' or words[0] == 'SEARCH' and _unbounded_search(detail)):
+            # 'SCAN TABLE t' before SQLite 3.36
+            name = words[2] if words[1] == 'TABLE' and len(words) > 2 else words[1]
+            table = aliases.get(name, name)
+            if table in tables:
+                scans.append(table)
+    return scans
+
+def check_query_plans(conn, queries=SERVING_QUERIES):
+    # {query name: tables scanned without an index}, empty when every query is served
+    failures = {}
+    for name, query in queries.items():
+        scans = [t for t in table_scans(conn, query['sql'], query['params'])
+                 if t not in query.get('allow_scan', [])]
+        if scans:
+            failures[name] = scans
+    return failures
+
+def build_and_check(writer):
+    # Final stage of clean_data.py
+    build_serving_indexes(writer.conn)
+    failures = check_query_plans(writer.conn)
+    for name, scans in failures.items():
+        print(f"❌ {name} scans {', '.join(scans)}")
+    if failures:
+        raise ValueError(f"Serving queries without an index: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    # Check the registered queries against an existing clean database
+    conn = sqlite3.connect(os.path.join(db_path, 'clean_football.db'))
+    failures = check_query_plans(conn)
+    for name in SERVING_QUERIES:
+        print(f"❌ {name} scans {', '.join(failures[name])}" if name in failures else f"✅ {name}")
+    conn.close()
+    if failures:
+        raise SystemExit(1)
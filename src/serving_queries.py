@@ -0,0 +1,128 @@
+# Registry of the queries the pages and the chat engine send to clean_football.db,
+# and of the indexes that serve them. Add new page queries here: the clean pipeline
+# checks every query with EXPLAIN QUERY PLAN and fails if one falls back to a table scan.
+#
+# SERVING_QUERIES: name -> sql, sample params, tables that may be scanned on purpose
+# (queries that load a whole small table, or LIKE '%...%' lookups on small tables)
+# SERVING_INDEXES: index name -> (table, columns)
+
+SERVING_QUERIES = {
+    # src/repository.py: the query names are the ones it times queries under
+    # pages/player_bio.py
+    'bio_players': {
+        'sql': """
+            SELECT player_id, name, first_name, last_name, country_of_birth, country_of_citizenship,
+                   date_of_birth, position, sub_position, foot, height_in_cm, current_club_name,
+                   market_value_in_eur
+            FROM players
+        """,
+        'params': (),
+        'allow_scan': ['players'],
+    },
+    # Stat / Transfer pages, keyed on player_id
+    'stat_appearances': {
+        'sql': "SELECT * FROM appearances WHERE player_id = ?",
+        'params': (28003,),
+    },
+    'stat_season_stats': {
+        'sql': "SELECT * FROM player_season_stats WHERE player_id = ? ORDER BY season_start",
+        'params': (28003,),
+    },
+    'stat_season_positions': {
+        'sql': "SELECT * FROM player_season_positions WHERE player_id = ?",
+        'params': (28003,),
+    },
+    'lineups_player': {
+        'sql': "SELECT * FROM game_lineups WHERE player_id = ? ORDER BY date",
+        'params': (28003,),
+    },
+    'club_map': {
+        'sql': "SELECT club_id, name FROM clubs",
+        'params': (),
+        'allow_scan': ['clubs'],
+    },
+    'transfer_history': {
+        'sql': "SELECT * FROM transfers WHERE player_id = ?",
+        'params': (28003,),
+    },
+    # src/llm_chat_engine.py prompt rules: player stats in a season
+    'chat_player_season': {
+        'sql': """
+            SELECT SUM(goals), SUM(assists)
+            FROM appearances
+            WHERE player_id IN (SELECT player_id FROM players WHERE name LIKE ?)
+              AND date BETWEEN ? AND ?
+        """,
+        'params': ('%Messi%', '2021-07-01', '2022-06-30'),
+        'allow_scan': ['players'],
+    },
+    # club goals in a season (club_id found by name first)
+    'chat_club_season': {
+        'sql': """
+            SELECT SUM(goals)
+            FROM appearances
+            WHERE player_club_id = (SELECT club_id FROM clubs WHERE name LIKE ?)
+              AND date BETWEEN ? AND ?
+        """,
+        'params': ('%Liverpool%', '2021-07-01', '2022-06-30'),
+        'allow_scan': ['clubs'],
+    },
+    # transfers out of a club in a year
+    'chat_club_transfers_out': {
+        'sql': """
+            SELECT t.player_name, t.transfer_date, c.name AS to_club, t.transfer_fee
+            FROM transfers t
+            LEFT JOIN clubs c ON c.club_id = t.to_club_id
+            WHERE t.from_club_id = (SELECT club_id FROM clubs WHERE name LIKE ?)
+              AND t.transfer_date BETWEEN ? AND ?
+        """,
+        'params': ('%Manchester United%', '2021-01-01', '2021-12-31'),
+        'allow_scan': ['clubs'],
+    },
+    # src/intent_router.py: the same questions, answered without the LLM by id
+    # (COALESCE: SUM over no rows is NULL, a float NaN in the DuckDB frames)
+    'router_player_season': {
+        'sql': """
+            SELECT COALESCE(SUM(goals), 0) AS goals, COALESCE(SUM(assists), 0) AS assists
+            FROM appearances
+            WHERE player_id = ? AND date >= ? AND date < ?
+        """,
+        'params': (28003, '2021-07-01', '2022-07-01'),
+    },
+    'router_club_season': {
+        'sql': """
+            SELECT COALESCE(SUM(goals), 0) AS goals
+            FROM appearances
+            WHERE player_club_id = ? AND date >= ? AND date < ?
+        """,
+        'params': (31, '2021-07-01', '2022-07-01'),
+    },
+    'router_club_transfers_out': {
+        'sql': """
+            SELECT t.player_name, t.transfer_date, c.name AS to_club, t.transfer_fee
+            FROM transfers t
+            LEFT JOIN clubs c ON c.club_id = t.to_club_id
+            WHERE t.from_club_id = ? AND t.transfer_date >= ? AND t.transfer_date < ?
+            ORDER BY t.transfer_date
+        """,
+        'params': (985, '2021-01-01', '2022-01-01'),
+    },
+    'chat_player_lookup': {
+        'sql': "SELECT player_id, name, current_club_id FROM players WHERE name LIKE ?",
+        'params': ('%Haaland%',),
+        'allow_scan': ['players'],
+    },
+}
+
+SERVING_INDEXES = {
+    'idx_appearances_club_date': ('appearances', ['player_club_id', 'date', 'goals', 'assists']),
+    'idx_appearances_player_id': ('appearances', ['player_id', 'date']),
+    'idx_game_lineups_game_player': ('game_lineups', ['game_id', 'player_id', 'position', 'date', 'club_id']),
+    'idx_game_lineups_player_id': ('game_lineups', ['player_id', 'date']),
+    'idx_player_season_stats_player_id': ('player_season_stats', ['player_id', 'season_start']),
+    'idx_player_season_positions_player_id': ('player_season_positions', ['player_id', 'season_start']),
+    'idx_transfers_player_id': ('transfers', ['player_id', 'transfer_date']),
+    'idx_transfers_from_club': ('transfers', ['from_club_id', 'transfer_date']),
+    'idx_clubs_club_id': ('clubs', ['club_id']),
+    'idx_players_player_id': ('players', ['player_id']),
+}
@@ -0,0 +1,323 @@
+# Cold-start fetch of clean_football.db for the web app.
+#
+# The snapshot is the database compressed with zstd, published next to a manifest:
+#   {"file": "clean_football.db.zst", "size": ..., "sha256": ..., "db_size": ..., "db_sha256": ...}
+# It is downloaded in HTTP ranges into a .part file (an interrupted download resumes where it
+# stopped), decompressed and hashed while the bytes arrive, checked against the manifest and
+# renamed into place. A file lock makes exactly one process download; the others wait for it.
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+from urllib.parse import urljoin
+import requests
+import zstandard
+
+try:
+    import fcntl
+except ImportError:    # Windows
+    fcntl = None
+
+MANIFEST_URL = os.getenv("SNAPSHOT_MANIFEST_URL")
+GDRIVE_FILE_ID = "1Kpv8ySZh-0SHgmSftHbtdgxji8KQEpRz"    # uncompressed database, used without a manifest
+
+RANGE_SIZE = 8 * 1024 ** 2
+CHUNK_SIZE = 1024 ** 2
+NETWORK_CHUNK_SIZE = 64 * 1024    # small reads: a dropped connection loses at most this much
+TIMEOUT = 30
+MAX_RETRIES = 5
+BACKOFF = 0.5
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock shared by every process (and thread) opening the same lock file."""
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(f"⏳ Waiting for another process to fetch the database ({path})")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class _StreamingDecoder:
+    """Decompresses snapshot bytes into the temporary database file as they arrive."""
+
+    def __init__(self, path):
+        self.out = open(path, 'wb')
+        self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+        self.compressed_sha = hashlib.sha256()
+        self.db_sha = hashlib.sha256()
+        self.compressed_size = 0
+        self.db_size = 0
+
+    def write(self, chunk):
+        self.compressed_sha.update(chunk)
+        self.compressed_size += len(chunk)
+        data = self.decompressor.decompress(chunk)
+        self.db_sha.update(data)
+        self.db_size += len(data)
+        self.out.write(data)
+
+    def close(self):
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        self.out.close()
+
+
+def _download(url, part_path, total, decoder, range_size=RANGE_SIZE):
+    # bytes of an earlier, interrupted attempt are replayed from disk instead of downloaded again
+    start = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if start > total:
+        os.remove(part_path)
+        start = 0
+    if start:
+        print(f"↪️ Resuming snapshot download at {start / 1024 ** 2:,.1f} MB")
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                decoder.write(chunk)
+
+    failures = 0
+    with open(part_path, 'ab') as part:
+        while start < total:
+            end = min(start + range_size, total) - 1
+            try:
+                with requests.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True, timeout=TIMEOUT) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        raise requests.HTTPError(f"{url} does not serve byte ranges (HTTP {r.status_code})")
+                    for chunk in r.iter_content(NETWORK_CHUNK_SIZE):
+                        part.write(chunk)
+                        decoder.write(chunk)
+                        start += len(chunk)
+                if start <= end:
+                    raise requests.ConnectionError(f"range ended early at byte {start:,}")
+                failures = 0
+            except requests.RequestException as e:
+                part.flush()
+                failures += 1
+                if failures > MAX_RETRIES:
+                    raise
+                print(f"⚠️ {e}, retrying from byte {start:,}")
+                time.sleep(BACKOFF * 2 ** (failures - 1))
+
+
+def fetch_snapshot(manifest_url, target, range_size=RANGE_SIZE):
+    """Install the snapshot described by manifest_url at target. Returns True if this call downloaded it."""
+    target = str(target)
+    checksum_path = f'{target}.sha256'
+    manifest = requests.get(manifest_url, timeout=TIMEOUT).json()
+
+    def installed():
+        if not os.path.exists(target) or not os.path.exists(checksum_path):
+            return False
+        with open(checksum_path) as f:
+            return f.read().strip() == manifest['db_sha256']
+
+    if installed():
+        return False
+    with file_lock(f'{target}.lock'):
+        # another process may have installed it while this one waited for the lock
+        if installed():
+            return False
+
+        start = time.perf_counter()
+        part_path, tmp_path = f'{target}.zst.part', f'{target}.tmp'
+        decoder = _StreamingDecoder(tmp_path)
+        try:
+            try:
+                _download(urljoin(manifest_url, manifest['file']), part_path, manifest['size'], decoder, range_size)
+            finally:
+                decoder.close()
+
+            if decoder.compressed_sha.hexdigest() != manifest['sha256']:
+                os.remove(part_path)    # corrupt, the next attempt starts over
+                raise ValueError("Snapshot checksum mismatch")
+            if decoder.db_sha.hexdigest() != manifest['db_sha256'] or decoder.db_size != manifest['db_size']:
+                raise ValueError("Decompressed database checksum mismatch")
+
+            os.replace(tmp_path, target)
+        finally:
+            # the decompressed copy is rebuilt from the .part file on the next attempt
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with open(checksum_path, 'w') as f:
+            f.write(manifest['db_sha256'])
+        os.remove(part_path)
+        elapsed = time.perf_counter() - start
+        print(f"✅ Snapshot installed: {manifest['size'] / 1024 ** 2:,.1f} MB downloaded, "
+              f"{manifest['db_size'] / 1024 ** 2:,.1f} MB database in {elapsed:.1f}s")
+        return True
+
+def is_installed_snapshot(target):
+    """Whether target was installed by fetch_snapshot(): written aside, renamed into place, never modified."""
+    return os.path.exists(f'{target}.sha256')
+
+def fetch_gdrive(target, file_id=GDRIVE_FILE_ID):
+    """Previous source: the uncompressed database on Google Drive, under the same lock / atomic rename."""
+    import gdown
+    target = str(target)
+    if os.path.exists(target):
+        return False
+    with file_lock(f'{target}.lock'):
+        if os.path.exists(target):
+            return False
+        tmp_path = f'{target}.tmp'
+        try:
+            # gdown returns None instead of raising for some failures (quota, permissions)
+            if gdown.download(f"https://drive.google.com/uc?id={file_id}", tmp_path, quiet=False) is None:
+                raise RuntimeError(f"Google Drive download of {file_id} failed")
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+def fetch_database(target, manifest_url=MANIFEST_URL):
+    """Make sure target holds the current database: from the snapshot manifest if one is configured."""
+    if not manifest_url:
+        return fetch_gdrive(target)
+    try:
+        return fetch_snapshot(manifest_url, target)
+    except (requests.RequestException, ValueError) as e:
+        # offline, or a bad publish: keep serving the database we already have
+        if os.path.exists(target):
+            print(f"⚠️ Snapshot fetch failed ({e}), using the existing {target}")
+            return False
+        raise
+
+# --------------------------------------------------
+# Publishing
+# --------------------------------------------------
+
+def make_snapshot(db_file, out_dir, level=10):
+    """Write <name>.zst and manifest.json for db_file into out_dir (upload both)."""
+    os.makedirs(out_dir, exist_ok=True)
+    name = f'{os.path.basename(db_file)}.zst'
+    out_file = os.path.join(out_dir, name)
+    start = time.perf_counter()
+    with open(db_file, 'rb') as src, open(out_file, 'wb') as dst:
+        zstandard.ZstdCompressor(level=level, threads=-1).copy_stream(src, dst)
+    manifest = {
+        'file': name,
+        'size': os.path.getsize(out_file),
+        'sha256': _sha256(out_file),
+        'db_size': os.path.getsize(db_file),
+        'db_sha256': _sha256(db_file),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📦 {out_file}: {manifest['db_size'] / 1024 ** 2:,.1f} MB -> {manifest['size'] / 1024 ** 2:,.1f} MB "
+          f"in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+# --------------------------------------------------
+# Local HTTP server with Range support, for tests
+# --------------------------------------------------
+
+def serve(directory, port=0, drop_after=None):
+    """Serve directory with byte ranges on localhost; returns the server (running in a thread).
+
+    drop_after: cut the first range response after that many bytes, to test resuming
+    """
+    from functools import partial
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    class RangeHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.server.requests += 1
+            path = self.translate_path(self.path)
+            header = self.headers.get('Range')
+            if not header or not os.path.isfile(path):
+                return super().do_GET()
+            size = os.path.getsize(path)
+            first, last = header.replace('bytes=', '').split('-')
+            first, last = int(first), min(int(last or size - 1), size - 1)
+            length = last - first + 1
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {first}-{last}/{size}')
+            self.send_header('Content-Length', str(length))
+            self.end_headers()
+            with open(path, 'rb') as f:
+                f.seek(first)
+                data = f.read(length)
+            if self.server.drop_after is not None:
+                data, self.server.drop_after = data[:self.server.drop_after], None
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(RangeHandler, directory=directory))
+    server.requests = 0
+    server.drop_after = drop_after
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def benchmark(db_file):
+    """Cold start from a local server: the zstd snapshot vs the whole uncompressed file."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        publish_dir = os.path.join(tmp, 'publish')
+        manifest = make_snapshot(db_file, publish_dir)
+        server = serve(publish_dir)
+        start = time.perf_counter()
+        fetch_snapshot(f"http://127.0.0.1:{server.server_port}/manifest.json", os.path.join(tmp, 'clean_football.db'))
+        snapshot_time = time.perf_counter() - start
+
+        # previous cold start: the whole uncompressed file
+        shutil.copy(db_file, os.path.join(publish_dir, 'raw.db'))
+        start = time.perf_counter()
+        with requests.get(f"http://127.0.0.1:{server.server_port}/raw.db", stream=True) as r, \
+                open(os.path.join(tmp, 'raw.db'), 'wb') as f:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+        print(f"Uncompressed download: {manifest['db_size'] / 1024 ** 2:,.1f} MB in {time.perf_counter() - start:.2f}s, "
+              f"snapshot: {manifest['size'] / 1024 ** 2:,.1f} MB in {snapshot_time:.2f}s "
+              f"({manifest['db_size'] / manifest['size']:,.1f}x less to transfer)")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    # settings imports this module, so it is only imported when run as a script
+    from settings import db_path
+
+    parser = argparse.ArgumentParser(description="Publish / fetch compressed clean_football.db snapshots")
+    parser.add_argument('--make', metavar='OUT_DIR', help="write the snapshot + manifest of the clean database")
+    parser.add_argument('--fetch', metavar='MANIFEST_URL', help="install the snapshot at --target")
+    parser.add_argument('--target', default='/tmp/clean_football.db')
+    parser.add_argument('--serve', metavar='DIR', help="serve DIR with byte ranges on --port")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--benchmark', action='store_true', help="snapshot vs uncompressed download from a local server")
+    args = parser.parse_args()
+
+    clean_db = os.path.join(db_path, 'clean_football.db')
+    if args.make:
+        make_snapshot(clean_db, args.make)
+    if args.fetch:
+        fetch_snapshot(args.fetch, args.target)
+    if args.benchmark:
+        benchmark(clean_db)
+    if args.serve:
+        server = serve(args.serve, args.port)
+        print(f"Serving {args.serve} on http://127.0.0.1:{server.server_port}/manifest.json")
+        threading.Event().wait()
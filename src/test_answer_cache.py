@@ -0,0 +1,74 @@
+import time
+import pytest
+from src import answer_cache
+from src.answer_cache import AnswerCache, normalize_question, database_version
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'cache.db'), ttl=60, max_entries=3)
+    yield cache
+    cache.conn.close()
+
+def key(question, db_version='db1'):
+    return AnswerCache.key(question, 'm', 'p1', db_version)
+
+
+def test_normalize_question():
+    assert normalize_question("  How many goals did  HAALAND score?? ") == "how many goals did haaland score"
+    assert normalize_question("Ｍessi ยิงกี่ประตู") == "messi ยิงกี่ประตู"
+
+def test_key_depends_on_versions():
+    assert key("How many goals did Haaland score?") == key("  how many goals did HAALAND score ")
+    assert key("How many goals did Haaland score?") != key("How many goals did Haaland score?", 'db2')
+    assert AnswerCache.key("q", 'm', 'p1', 'db1') != AnswerCache.key("q", 'm', 'p2', 'db1')
+
+def test_get_put(cache):
+    assert cache.get(key("q")) is None
+    cache.put(key("q"), "q", "SELECT 1", "42")
+    assert cache.get(key("q")) == ("SELECT 1", "42")
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries']) == (1, 1, 1, 1)
+
+def test_least_recently_used_is_evicted(cache):
+    cache.put(key("q"), "q", "SELECT 1", "42")
+    for i in range(3):
+        cache.put(key(f"q{i}"), f"q{i}", "", str(i))
+    assert cache.get(key("q")) is None
+    assert cache.get(key("q2")) == ("", "2")
+    assert cache.stats()['evicted'] == 1
+
+def test_read_keeps_entry_recent(cache, monkeypatch):
+    now = time.time()
+    for i in range(3):
+        monkeypatch.setattr(answer_cache.time, 'time', lambda i=i: now + i)
+        cache.put(key(f"q{i}"), f"q{i}", "", str(i))
+    monkeypatch.setattr(answer_cache.time, 'time', lambda: now + 3)
+    assert cache.get(key("q0")) is not None
+    monkeypatch.setattr(answer_cache.time, 'time', lambda: now + 4)
+    cache.put(key("q3"), "q3", "", "3")
+    assert cache.get(key("q0")) is not None
+    assert cache.get(key("q1")) is None
+
+def test_entry_expires_after_ttl(cache, monkeypatch):
+    now = time.time()
+    cache.put(key("q"), "q", "SELECT 1", "42")
+    monkeypatch.setattr(answer_cache.time, 'time', lambda: now + 61)
+    assert cache.get(key("q")) is None
+    assert cache.stats()['expired'] == 1
+    assert cache.stats()['entries'] == 0
+
+def test_shared_between_connections(cache, tmp_path):
+    cache.put(key("q"), "q", "SELECT 1", "42")
+    other = AnswerCache(str(tmp_path / 'cache.db'))
+    try:
+        assert other.get(key("q")) == ("SELECT 1", "42")
+    finally:
+        other.conn.close()
+
+def test_database_version(tmp_path):
+    path = tmp_path / 'clean_football.db'
+    path.write_bytes(b'x' * 10)
+    assert database_version(str(path)).startswith('10-')
+    (tmp_path / 'clean_football.db.sha256').write_text('abc123\n')
+    assert database_version(str(path)) == 'abc123'
@@ -0,0 +1,86 @@
+import time
+import threading
+import pytest
+from src.fake_llm import CALLS
+from src.chat_server import ChatServer, Histogram, Overloaded
+
+
+def collect(server, question, results, key=None):
+    # (events, perf_counter at 'sql', at the end) of one session, or the exception it raised
+    events, sql_at = [], None
+    try:
+        for kind, text in server.ask_stream(question):
+            if kind == 'sql':
+                sql_at = time.perf_counter()
+            events.append((kind, text))
+        results[key or question] = (events, sql_at, time.perf_counter())
+    except Exception as e:
+        results[key or question] = e
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 1, float('inf')))
+    for seconds in (0.05, 0.05, 0.5, 5):
+        histogram.observe(seconds)
+    assert histogram.counts == [2, 3, 4]
+    assert histogram.quantile(0.5) == 0.1 and histogram.quantile(0.95) == float('inf')
+
+def test_identical_questions_share_one_flight(chat_llm):
+    server = ChatServer()
+    CALLS.clear()
+    results = {}
+    threads = [threading.Thread(target=collect, args=(server, "How many players?", results, i)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    answers = {''.join(text for kind, text in events if kind == 'token') for events, _, _ in results.values()}
+    assert answers == {"จากข้อมูลในฐานข้อมูล ผลลัพธ์คือ [(3,)] ครับ"}
+    assert CALLS == {'sql': 1, 'answer': 1}
+    stats = server.stats()
+    assert (stats['requests'], stats['coalesced'], stats['in_flight'], stats['waiting']) == (8, 7, 0, 0)
+    assert stats['total']['count'] == 1
+
+def test_flight_keeps_its_model_slot(chat_llm, monkeypatch):
+    # one model slot: the second question only starts once the first one has streamed its answer
+    monkeypatch.setattr(chat_llm, 'first_token_delay', 0.2)
+    server = ChatServer(llm_concurrency=1)
+    results = {}
+    first = threading.Thread(target=collect, args=(server, "How many players? (1)", results))
+    first.start()
+    while server.stats()['in_flight'] == 0 or server.stats()['waiting']:
+        time.sleep(0.01)
+    collect(server, "How many players? (2)", results)
+    first.join()
+    events, _, first_end = results["How many players? (1)"]
+    assert events[-1][0] == 'token'
+    # the second SQL waited for the whole first flight, SQL and answer
+    _, second_sql, _ = results["How many players? (2)"]
+    assert second_sql > first_end
+    assert server.stats()['shed'] == 0
+
+def test_sheds_when_too_many_wait(chat_llm, monkeypatch):
+    monkeypatch.setattr(chat_llm, 'first_token_delay', 0.2)
+    server = ChatServer(llm_concurrency=1, max_waiting=1)
+    results = {}
+    first = threading.Thread(target=collect, args=(server, "q1", results))
+    first.start()
+    while server.stats()['in_flight'] == 0 or server.stats()['waiting']:
+        time.sleep(0.01)
+    second = threading.Thread(target=collect, args=(server, "q2", results))
+    second.start()
+    while server.stats()['waiting'] == 0:
+        time.sleep(0.01)
+    with pytest.raises(Overloaded):
+        list(server.ask_stream("q3"))
+    first.join()
+    second.join()
+    assert not isinstance(results["q1"], Exception) and not isinstance(results["q2"], Exception)
+    assert server.stats()['shed'] == 1
+
+def test_metrics_text(chat_llm):
+    server = ChatServer()
+    list(server.ask_stream("How many players?"))
+    text = server.metrics_text()
+    assert '# TYPE chat_total_seconds histogram' in text
+    assert 'chat_total_seconds_count 1' in text and 'chat_requests_total 1' in text
@@ -0,0 +1,40 @@
+import sqlite3
+from src.clean_data import STAGES, incremental_since, partition_checksums
+from src.pipeline import plan_stages
+
+
+def raw_appearances():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE appearances (appearance_id TEXT, date TEXT, goals INTEGER)")
+    conn.executemany("INSERT INTO appearances VALUES (?, ?, ?)", [
+        ('a', '2015-07-02', 1), ('b', '2015-08-10', 0), ('c', '2024-03-20', 2), ('d', None, 0),
+    ])
+    return conn
+
+def test_partition_checksums_only_change_with_their_rows():
+    conn = raw_appearances()
+    before = partition_checksums(conn, 'appearances')
+    assert set(before) == {'2015-07', '2015-08', '2024-03', None}
+    conn.execute("UPDATE appearances SET goals = 3 WHERE appearance_id = 'a'")
+    after = partition_checksums(conn, 'appearances')
+    assert [part for part in before if before[part] != after[part]] == ['2015-07']
+
+def test_incremental_since():
+    old = {'2015-07': 'x', '2015-08': 'y', '2024-03': 'z', None: 'n'}
+    assert incremental_since('2024-03-20', old, old) == '2024-03-20'
+    # a changed / deleted month below the mark pulls the window back to its first day
+    assert incremental_since('2024-03-20', old, {**old, '2015-08': 'changed'}) == '2015-08-01'
+    assert incremental_since('2024-03-20', old, {k: v for k, v in old.items() if k != '2015-07'}) == '2015-07-01'
+    # new rows above the mark stay in the window of the mark
+    assert incremental_since('2024-03-20', old, {**old, '2024-04': 'new'}) == '2024-03-20'
+    # undated rows changed, no mark or no checksums of the last run: full rebuild
+    assert incremental_since('2024-03-20', old, {**old, None: 'changed'}) is None
+    assert incremental_since(None, old, old) is None
+    assert incremental_since('2024-03-20', None, old) is None
+
+def test_selected_tables_rebuild_their_aggregates():
+    plan = plan_stages(STAGES, ['appearances'])
+    assert set(plan) == {'appearances', 'player_aggregates', 'serving_indexes'}
+    assert plan['player_aggregates'] == {'appearances'}
+    assert plan['serving_indexes'] == {'appearances', 'player_aggregates'}
+    assert 'player_aggregates' not in plan_stages(STAGES, ['transfers'])
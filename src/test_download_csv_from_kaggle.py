@@ -0,0 +1,38 @@
+import sqlite3
+from src.download_csv_from_kaggle import infer_schema, load_csv_streaming
+
+
+def write_csv(path, rows):
+    # null in the first chunk, typed values only further down
+    lines = ['player_id,market_value,height,agent,empty']
+    lines += [f'{i},,,,' for i in range(rows)]
+    lines += [f'{rows},1000.5,180,Agent,']
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+def test_infer_schema_reads_past_the_first_chunk(tmp_path):
+    csv_file = write_csv(tmp_path / 'players.csv', 50)
+    assert infer_schema(csv_file, chunksize=10) == {
+        'player_id': 'INTEGER',
+        'market_value': 'REAL',
+        'height': 'INTEGER',
+        'agent': 'TEXT',
+        'empty': 'TEXT',
+    }
+
+def test_infer_schema_widest_type_wins(tmp_path):
+    csv_file = tmp_path / 'games.csv'
+    csv_file.write_text('a,b\n1,1\n2,2\n3,x\n4.5,4\n')
+    assert infer_schema(csv_file, chunksize=2) == {'a': 'REAL', 'b': 'TEXT'}
+
+def test_load_csv_streaming_keeps_late_values(tmp_path):
+    csv_file = write_csv(tmp_path / 'players.csv', 50)
+    target = str(tmp_path / 'raw.db')
+    stats = load_csv_streaming(csv_file, target, chunksize=10)
+    assert stats['rows'] == 51
+    conn = sqlite3.connect(target)
+    row = conn.execute("SELECT market_value, height, agent FROM players WHERE player_id = 50").fetchone()
+    types = {name: sql_type for _, name, sql_type, *_ in conn.execute("PRAGMA table_info(players)")}
+    conn.close()
+    assert row == (1000.5, 180, 'Agent')
+    assert types['height'] == 'INTEGER' and types['market_value'] == 'REAL'
@@ -0,0 +1,110 @@
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import pytest
+import requests
+from src.download_players_image import HostRateLimiter, Manifest, ImageDownloader, download_all
+
+JPEG = b'\xff\xd8\xff\xe0' + b'0' * 64
+
+
+class StubWiki(BaseHTTPRequestHandler):
+    """MediaWiki API + image host: '<name> footballer' finds <name>.jpg unless name is 'Nobody'."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        server.requests.append(url.path)
+        if server.fail_next:
+            server.fail_next -= 1
+            return self._send(503)
+        if url.path == '/w/api.php':
+            name = parse_qs(url.query)['gsrsearch'][0].replace(' footballer', '')
+            pages = [] if name == 'Nobody' else [{'title': name, 'thumbnail': {
+                'source': f"http://127.0.0.1:{server.server_port}/img/{name.replace(' ', '_')}.jpg"}}]
+            return self._send(200, json.dumps({'query': {'pages': pages}} if pages else {}).encode())
+        if url.path == '/img/Not_An_Image.jpg':
+            return self._send(200, b'<html>', 'text/html')
+        return self._send(200, JPEG, 'image/jpeg')
+
+
+@pytest.fixture
+def wiki():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubWiki)
+    server.requests, server.fail_next = [], 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def downloader(wiki, tmp_path):
+    return ImageDownloader(f"http://127.0.0.1:{wiki.server_port}/w/api.php", tmp_path, rate=1000,
+                           retries=2, backoff=0.01, timeout=5)
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = HostRateLimiter(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.wait("http://a.example/x")
+    limiter.wait("http://b.example/x")    # another host does not wait for a.example
+    assert time.monotonic() - start == pytest.approx(4 / 20, abs=0.04)
+
+def test_manifest_resume(tmp_path):
+    path = str(tmp_path / 'manifest.jsonl')
+    image = tmp_path / '1.jpg'
+    image.write_bytes(JPEG)
+    manifest = Manifest(path)
+    manifest.add({'player_id': 1, 'status': 'ok', 'path': str(image)})
+    manifest.add({'player_id': 2, 'status': 'not_found', 'path': None})
+    manifest.add({'player_id': 3, 'status': 'error', 'path': None})
+    manifest.add({'player_id': 4, 'status': 'ok', 'path': str(tmp_path / 'deleted.jpg')})
+    with open(path, 'a') as f:
+        f.write('{"player_id": 5, "sta')    # cut off by a crash
+    manifest = Manifest(path)
+    assert [manifest.done(i) for i in range(1, 6)] == [True, True, False, False, False]
+    assert not manifest.done(2, retry_missing=True)
+
+def test_download_saves_image(downloader, tmp_path):
+    entry = downloader.download(7, 'Lionel Messi')
+    assert entry['status'] == 'ok' and entry['page'] == 'Lionel Messi'
+    assert entry['path'] == str(tmp_path / '7.jpg')
+    assert (tmp_path / '7.jpg').read_bytes() == JPEG
+    assert not list(tmp_path.glob('*.part'))
+
+def test_download_not_found_and_bad_content(downloader, tmp_path):
+    assert downloader.download(8, 'Nobody')['status'] == 'not_found'
+    entry = downloader.download(9, 'Not An Image')
+    assert entry['status'] == 'error' and 'not an image' in entry['error']
+    assert not list(tmp_path.glob('9.*'))
+
+def test_get_retries_server_errors(downloader, wiki):
+    wiki.fail_next = 2
+    assert downloader.download(10, 'Erling Haaland')['status'] == 'ok'
+    wiki.fail_next = 3
+    with pytest.raises(requests.HTTPError):
+        downloader.get(downloader.api_url)
+
+def test_download_all_resumes(downloader, wiki, tmp_path):
+    players = pd.DataFrame({'player_id': [1, 2, 3], 'name': ['Lionel Messi', 'Nobody', 'Erling Haaland']})
+    manifest = Manifest(str(tmp_path / 'manifest.jsonl'))
+    assert download_all(players, downloader, manifest, workers=3) == {'ok': 2, 'not_found': 1, 'error': 0}
+    wiki.requests.clear()
+    # a second run (another process) skips every finished player
+    assert download_all(players, downloader, Manifest(manifest.path), workers=3) == {'ok': 0, 'not_found': 0, 'error': 0}
+    assert wiki.requests == []
+    counts = download_all(players, downloader, Manifest(manifest.path), workers=3, retry_missing=True)
+    assert counts == {'ok': 0, 'not_found': 1, 'error': 0}
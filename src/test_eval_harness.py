@@ -0,0 +1,70 @@
+import json
+import pandas as pd
+import pytest
+from src.eval_harness import (load_questions, result_rows, same_result, summarize, compare, evaluate,
+                              QUESTIONS_PATH)
+
+
+def test_result_rows_normalize_values():
+    df = pd.DataFrame({'name': [' Messi '], 'goals': [61], 'height': [180.0000001], 'club': [None]})
+    assert result_rows(df) == [('Messi', 61.0, 180.0, None)]
+    assert result_rows(pd.DataFrame({'n': ['61']})) == [(61.0,)]
+
+@pytest.mark.parametrize('expected, actual, ordered, same', [
+    ([(1.0,), (2.0,)], [(2.0,), (1.0,)], False, True),
+    ([(1.0,), (2.0,)], [(2.0,), (1.0,)], True, False),
+    ([(1.0,)], [(1.0,), (1.0,)], False, False),
+    ([], [], False, True),
+    # extra columns of the generated query: the goals asked for next to the assists
+    ([('Messi', 3.0)], [('Messi', 3.0, 3.0)], False, True),
+    ([(3.0,)], [('Messi', 1.0, 3.0)], False, True),
+    ([('Messi', 3.0)], [(3.0, 'Messi')], False, True),
+    ([('Messi', 4.0)], [('Messi', 3.0, 3.0)], False, False),
+])
+def test_same_result(expected, actual, ordered, same):
+    assert same_result(expected, actual, ordered) is same
+
+def test_questions_file():
+    questions = load_questions()
+    assert len({item['id'] for item in questions}) == len(questions)
+    assert all(item['question'] and item['reference_sql'] for item in questions)
+
+def test_duplicate_question_ids(tmp_path):
+    path = tmp_path / 'questions.json'
+    path.write_text(json.dumps([{'id': 'a', 'question': 'q', 'reference_sql': 'SELECT 1'}] * 2))
+    with pytest.raises(ValueError):
+        load_questions(str(path))
+
+def test_summarize():
+    rows = [{'status': 'correct', 'source': 'llm', 'timings': {'total': 1.0, 'sql': 0.1}},
+            {'status': 'wrong', 'source': 'router', 'timings': {'total': 3.0}},
+            {'status': 'error', 'source': 'llm', 'timings': {'total': 2.0}}]
+    summary = summarize(rows, wall=3.5)
+    assert (summary['correct'], summary['wrong'], summary['errors'], summary['routed']) == (1, 1, 1, 1)
+    assert summary['accuracy'] == round(1 / 3, 4)
+    assert summary['latency']['total'] == {'p50': 2.0, 'p95': 3.0, 'mean': 2.0}
+    assert summary['latency']['sql']['p50'] == 0.1
+
+def test_compare_lists_changed_questions(capsys):
+    def report(status, accuracy):
+        return {'run': {'questions_checksum': 'q', 'database_checksum': 'd', 'model': 'm', 'prompt_version': 'p'},
+                'summary': {'accuracy': accuracy, 'latency': {}}, 'questions': [{'id': 'a', 'status': status}]}
+    compare(report('correct', 1.0), report('wrong', 0.0))
+    out = capsys.readouterr().out
+    assert 'accuracy 0.0% -> 100.0%' in out and 'a: wrong -> correct' in out
+
+
+def test_evaluate_on_stub_model(chat_llm, monkeypatch):
+    monkeypatch.setattr(chat_llm, 'sql_by_question', {
+        "How many players?": "SELECT COUNT(*) FROM players",
+        "Messi's goals?": "SELECT SUM(goals) FROM appearances WHERE player_id = 8198",
+        "Broken?": "SELECT nope FROM players",
+    })
+    row = evaluate({'id': 'players', 'question': "How many players?",
+                    'reference_sql': "SELECT COUNT(*) FROM players"}, [(3.0,)])
+    assert row['status'] == 'correct' and row['source'] == 'llm'
+    assert set(row['timings']) == {'prompt', 'model_sql', 'sql', 'answer', 'total'}
+    assert '[(3,)]' in row['answer']
+    assert evaluate({'id': 'goals', 'question': "Messi's goals?", 'reference_sql': ''}, [(3.0,)])['status'] == 'wrong'
+    row = evaluate({'id': 'broken', 'question': "Broken?", 'reference_sql': ''}, [(3.0,)])
+    assert row['status'] == 'error' and 'nope' in row['error']
@@ -0,0 +1,70 @@
+import time
+import asyncio
+import pytest
+from src.fake_llm import FakeStreamingChatModel, CALLS
+from src.llm_chat_engine import (ask_stream, sql_input, answer_input, clean_sql, message_text, SQL_STOP,
+                                 record_response, response_stats, RESPONSE_TIMINGS)
+
+
+@pytest.fixture
+def llm():
+    return FakeStreamingChatModel(first_token_delay=0.05, token_delay=0.001)
+
+def sql_prompt(question):
+    return f"Question: {sql_input(question)}"
+
+
+def test_sql_then_answer(llm):
+    CALLS.clear()
+    assert clean_sql(llm.invoke(sql_prompt("How many players?"), stop=SQL_STOP)) == llm.sql
+    answer = message_text(llm.invoke(f"Question: {answer_input('How many players?', llm.sql, '[(3,)]')}"))
+    assert answer == "จากข้อมูลในฐานข้อมูล ผลลัพธ์คือ [(3,)] ครับ"
+    assert CALLS == {'sql': 1, 'answer': 1}
+
+def test_sql_by_question(llm):
+    llm.sql_by_question = {"Who scored most?": "SELECT 1"}
+    assert clean_sql(llm.invoke(sql_prompt("Who scored most?"))) == "SELECT 1"
+    assert clean_sql(llm.invoke(sql_prompt("Anything else"))) == llm.sql
+
+def test_stream_matches_invoke(llm):
+    prompt = f"Question: {answer_input('q', 'SELECT 1', '[(1,)]')}"
+    chunks = [message_text(chunk) for chunk in llm.stream(prompt)]
+    assert len(chunks) > 1
+    assert ''.join(chunks) == message_text(llm.invoke(prompt))
+
+def test_async_stream_matches_invoke(llm):
+    prompt = f"Question: {answer_input('q', 'SELECT 1', '[(1,)]')}"
+
+    async def collect():
+        return [message_text(chunk) async for chunk in llm.astream(prompt)]
+    assert ''.join(asyncio.run(collect())) == message_text(asyncio.run(llm.ainvoke(prompt)))
+
+def test_first_token_delay(llm):
+    start = time.perf_counter()
+    next(iter(llm.stream("Question: q\nSQLQuery:")))
+    assert time.perf_counter() - start >= llm.first_token_delay
+
+
+def test_ask_stream_sql_before_answer(chat_llm):
+    events, times = [], []
+    start = time.perf_counter()
+    for kind, text in ask_stream("How many players are in the database?"):
+        events.append((kind, text))
+        times.append(time.perf_counter() - start)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == 'sql' and set(kinds[1:]) == {'token'}
+    assert events[0][1] == chat_llm.sql
+    # the generated query ran on the fixture database: 3 players
+    assert ''.join(text for _, text in events[1:]) == "จากข้อมูลในฐานข้อมูล ผลลัพธ์คือ [(3,)] ครับ"
+    # the SQL is visible a whole model call before the answer starts
+    assert times[1] - times[0] >= chat_llm.first_token_delay
+
+def test_response_stats():
+    RESPONSE_TIMINGS.clear()
+    for total in (1.0, 2.0, 3.0):
+        record_response('llm', 0.5, total / 2, total)
+    record_response('router', 0.001, 0.001, 0.001)
+    stats = response_stats()
+    assert stats['llm']['answers'] == 3 and stats['llm']['total_p50'] == 2.0 and stats['llm']['total_p95'] == 3.0
+    assert stats['router']['first_output_p50'] == 0.001
+    RESPONSE_TIMINGS.clear()
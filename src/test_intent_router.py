@@ -0,0 +1,48 @@
+import sqlite3
+import pandas as pd
+import pytest
+from src.repository import Repository
+from src.intent_router import NameIndex, route, parse_period
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / 'clean_football.db'
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE appearances (player_id INTEGER, player_club_id INTEGER, date TEXT, "
+                 "goals INTEGER, assists INTEGER)")
+    conn.executemany("INSERT INTO appearances VALUES (?, ?, ?, ?, ?)", [
+        (28003, 583, '2021-09-01 00:00:00', 1, 0),
+        (28003, 583, '2022-03-01 00:00:00', 2, 3),
+        (28003, 131, '2020-10-01 00:00:00', 5, 1),
+    ])
+    conn.commit()
+    conn.close()
+    return Repository(path, backend='sqlite')
+
+@pytest.fixture
+def index():
+    players = pd.DataFrame({'player_id': [28003], 'name': ['Lionel Messi'], 'market_value_in_eur': [1e7]})
+    return NameIndex(players, {583: 'Paris Saint-Germain', 31: 'Liverpool FC'})
+
+
+def test_parse_period():
+    assert parse_period("in the 2021/22 season") == ('2021-07-01', '2022-07-01', 'season', '2021/22')
+    assert parse_period("in 2023") == ('2023-01-01', '2024-01-01', 'year', '2023')
+    assert parse_period("in 2021/2024") is None
+
+def test_route_player_season(repo, index):
+    routed = route("How many goals and assists did Messi have in 2021/2022?", repo, index)
+    assert routed['intent'] == 'router_player_season'
+    assert routed['result'] == "Lionel Messi scored 3 goals and made 3 assists in the 2021/22 season."
+
+def test_route_no_matching_rows(repo, index):
+    # SUM over no rows: 0, not NULL / NaN (DuckDB backends return NaN without COALESCE)
+    routed = route("How many goals did Liverpool score in 2021/2022?", repo, index)
+    assert routed['result'] == "Liverpool FC scored 0 goals in the 2021/22 season."
+    routed = route("Messi มีกี่แอสซิสต์ในฤดูกาล 2015/16", repo, index)
+    assert routed['result'] == "Lionel Messi ทำได้ 0 แอสซิสต์ในฤดูกาล 2015/16"
+
+def test_route_falls_back(repo, index):
+    assert route("How many goals did Messi score against Liverpool in 2021/22?", repo, index) is None
+    assert route("Who is the tallest player?", repo, index) is None
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.normalize import parse_money, MONEY_RE, MONEY_SUFFIXES
+
+
+def money_strings(rows=100_000, seed=0):
+    # random amounts in cents, written with every suffix and sign / € placement
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(-10 ** 11, 10 ** 11, rows)
+    suffix = rng.choice(['', 'k', 'm', 'bn'], rows)
+    scale = pd.Series(suffix).map({'': 1, **MONEY_SUFFIXES}).to_numpy()
+    shown = cents / 100 / scale
+    sign = np.where(cents < 0, '-', rng.choice(['', '+'], rows))
+    text = pd.Series([f"{s}€{abs(float(v))!r}{x}" if i % 2 else f"€{s}{abs(float(v))!r}{x}"
+                      for i, (s, v, x) in enumerate(zip(sign, shown, suffix))])
+    return text, cents / 100
+
+
+def test_parse_money_round_trip():
+    text, amounts = money_strings()
+    assert np.allclose(parse_money(text), amounts, rtol=1e-9, atol=1e-3)
+
+def test_parse_money_unit():
+    text, amounts = money_strings(rows=10_000, seed=1)
+    assert np.allclose(parse_money(text, unit=1e6), amounts / 1e6, rtol=1e-9, atol=1e-9)
+    # exact powers of ten: '€500k' in millions is 0.5
+    assert parse_money(pd.Series(['€500k', '€12.30m', '€-1.2bn']), unit=1e6).tolist() == [0.5, 12.3, -1200.0]
+
+def test_parse_money_placeholders():
+    parsed = parse_money(pd.Series(['-', '+-0', '', ' € ', '€0', None, np.nan, 'n/a']))
+    assert parsed.iloc[:5].tolist() == [0.0] * 5
+    assert not np.signbit(parsed.iloc[:5]).any()
+    assert parsed.iloc[5:].isna().all()
+
+def test_parse_money_numeric_column():
+    col = pd.Series([1500000, 250000], name='market_value_in_eur')
+    parsed = parse_money(col, unit=1e6)
+    assert parsed.dtype == 'float64' and parsed.name == 'market_value_in_eur'
+    assert parsed.tolist() == [1.5, 0.25]
+
+def test_parse_money_keeps_index_and_repeats():
+    col = pd.Series(['€1m', '€2k', '€1m', None], index=[10, 11, 12, 13], name='fee')
+    parsed = parse_money(col)
+    assert parsed.index.tolist() == [10, 11, 12, 13] and parsed.name == 'fee'
+    assert parsed.iloc[:3].tolist() == [1e6, 2e3, 1e6] and np.isnan(parsed.iloc[3])
+
+@pytest.mark.parametrize('text, groups', [
+    ('€12.30m', ('', '', '12.30', 'm')),
+    ('+€500k', ('+', '', '500', 'k')),
+    ('€-1.2bn', ('', '-', '1.2', 'bn')),
+    ('1500000.0', ('', '', '1500000.0', None)),
+    ('+-0', ('+-', '', '0', None)),
+    ('-', ('-', '', None, None)),
+    ('€1.5E+6', ('', '', '1.5E+6', None)),
+])
+def test_money_re_matches(text, groups):
+    match = MONEY_RE.match(text)
+    assert match and match.group('sign', 'sign2', 'number', 'suffix') == groups
+
+@pytest.mark.parametrize('text', ['n/a', '€12.3x', '12 500', '€1m2'])
+def test_money_re_rejects(text):
+    assert MONEY_RE.match(text) is None
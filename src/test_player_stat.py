@@ -0,0 +1,52 @@
+import os
+import pytest
+from streamlit.testing.v1 import AppTest
+
+PAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages', 'player_stat.py')
+
+
+@pytest.fixture
+def page(clean_db):
+    at = AppTest.from_file(PAGE, default_timeout=30)
+    at.session_state['player_id'] = 28003
+    at.session_state['player_name'] = 'Lionel Messi'
+    return at.run()
+
+def overview(at):
+    return next(md.value for md in at.markdown if '**Goals:**' in md.value)
+
+
+def test_without_player():
+    at = AppTest.from_file(PAGE, default_timeout=30).run()
+    assert at.warning[0].value == "Please select a player from the Bio page first."
+
+def test_overview_of_all_seasons(page):
+    assert not page.exception
+    assert [sub.value for sub in page.subheader][:2] == ["Stat overview · Lionel Messi", "Goals & Assists per Season"]
+    assert "**Matches Played:** 88" in overview(page) and "**Goals:** 47" in overview(page)
+    assert page.session_state['stat_filters'] == (28003, (131, 583), 2020, 2022)
+
+def test_filters_narrow_every_section(page):
+    page.multiselect[0].set_value(['Paris Saint-Germain']).run()
+    assert page.session_state['stat_filters'] == (28003, (583,), 2020, 2022)
+    assert "**Goals:** 22" in overview(page)
+    page.select_slider[0].set_value(('2022/23', '2022/23')).run()
+    assert "**Goals:** 16" in overview(page)
+    page.text_area[0].set_value("SELECT SUM(goals) AS goals FROM df_filt").run()
+    assert page.dataframe[-1].value['goals'].tolist() == [16]
+
+def test_no_matching_rows(page):
+    page.multiselect[0].set_value([]).run()
+    assert page.info[0].value == "No appearances in selected filters."
+
+def test_chart_modes(page):
+    assert len(page.get('plotly_chart')) == 2    # one season line + the position pie
+    page.radio[0].set_value("Compare teams (multi‑line)").run()
+    assert len(page.get('plotly_chart')) == 3
+
+def test_explorer_guard(page):
+    page.text_area[0].set_value("SELECT * FROM read_csv('/etc/passwd')").run()
+    assert page.error and "SQL Error" in page.error[0].value
+    page.toggle[0].set_value(True).run()
+    page.text_area[0].set_value("SELECT COUNT(*) AS n FROM df_raw").run()
+    assert page.dataframe[-1].value['n'].tolist() == [3]
@@ -0,0 +1,84 @@
+import os
+import json
+import pytest
+from PIL import Image
+from src import player_thumbnails
+from src.player_thumbnails import make_thumbnail, build_thumbnails, thumbnail_file, THUMB_SIZE
+
+
+def save_image(path, color, size=(800, 1000)):
+    Image.new('RGB', size, color).save(path, 'JPEG')
+
+@pytest.fixture
+def dirs(tmp_path):
+    source, out = tmp_path / 'player', tmp_path / 'static'
+    source.mkdir()
+    save_image(source / '1.jpg', 'red')
+    save_image(source / '2.jpg', 'blue', size=(300, 200))
+    (source / 'manifest.jsonl').write_text('')    # not an image
+    return source, out, str(tmp_path / 'thumbnails.json')
+
+def build(dirs, **kwargs):
+    source, out, index_path = dirs
+    return build_thumbnails(source, out, index_path, workers=2, **kwargs)
+
+def load(index_path):
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def test_make_thumbnail(tmp_path):
+    save_image(tmp_path / 'a.jpg', 'red')
+    sha, name = make_thumbnail(str(tmp_path / 'a.jpg'), str(tmp_path))
+    with Image.open(tmp_path / name) as thumb:
+        assert thumb.size == THUMB_SIZE and thumb.format == 'WEBP'
+    # content-addressed: the same picture gets the same name, an unchanged source is not redone
+    assert make_thumbnail(str(tmp_path / 'a.jpg'), str(tmp_path)) == (sha, name)
+    os.remove(tmp_path / name)
+    assert make_thumbnail(str(tmp_path / 'a.jpg'), str(tmp_path), sha, name) == (sha, name)
+    assert os.path.exists(tmp_path / name)
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.tmp')]
+
+def test_build_is_incremental(dirs):
+    source, out, index_path = dirs
+    assert build(dirs) == {'unchanged': 0, 'processed': 2, 'failed': 0, 'removed': 0, 'pruned': 0}
+    first = load(index_path)
+    assert set(first) == {'1', '2'} and sorted(os.listdir(out)) == sorted(e['file'] for e in first.values())
+    assert build(dirs)['unchanged'] == 2
+
+    # same bytes, new mtime: looked at again, same thumbnail
+    os.utime(source / '1.jpg', ns=(0, 0))
+    assert build(dirs)['processed'] == 1
+    assert load(index_path)['1']['file'] == first['1']['file']
+
+    # new picture: new name, the old file stays until --prune
+    save_image(source / '1.jpg', 'green')
+    assert build(dirs)['processed'] == 1
+    assert load(index_path)['1']['file'] != first['1']['file']
+    assert first['1']['file'] in os.listdir(out)
+    os.remove(source / '2.jpg')
+    counts = build(dirs, prune=True)
+    assert (counts['removed'], counts['pruned']) == (1, 2)
+    assert os.listdir(out) == [load(index_path)['1']['file']]
+
+def test_changed_settings_rebuild(dirs, monkeypatch):
+    build(dirs)
+    monkeypatch.setattr(player_thumbnails, 'QUALITY', 50)
+    assert build(dirs)['processed'] == 2
+
+def test_broken_image_fails_alone(dirs):
+    source, _, index_path = dirs
+    (source / '3.png').write_bytes(b'not a png')
+    counts = build(dirs)
+    assert (counts['processed'], counts['failed']) == (2, 1)
+    assert set(load(index_path)) == {'1', '2'}
+
+def test_thumbnail_file_reloads_index(dirs):
+    source, _, index_path = dirs
+    assert thumbnail_file(1, index_path) is None
+    build(dirs)
+    assert thumbnail_file(1, index_path) == load(index_path)['1']['file']
+    assert thumbnail_file(3, index_path) is None
+    save_image(source / '3.jpg', 'white')
+    build(dirs)
+    assert thumbnail_file('3', index_path) == load(index_path)['3']['file']
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import threading
+from src.repository import ReadPool, Repository
+
+
+def make_db(path, goals=1):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE appearances (player_id INTEGER, goals INTEGER)")
+    conn.execute("INSERT INTO appearances VALUES (1, ?)", (goals,))
+    conn.commit()
+    conn.close()
+    return str(path)
+
+def total(pool):
+    with pool.connection() as conn:
+        return conn.execute("SELECT SUM(goals) FROM appearances").fetchone()[0]
+
+
+def test_immutable_only_for_installed_snapshots(tmp_path):
+    path = make_db(tmp_path / 'clean_football.db')
+    assert not Repository(path, backend='sqlite').pool.immutable
+    with open(f'{path}.sha256', 'w') as f:
+        f.write('abc')
+    assert Repository(path, backend='sqlite').pool.immutable
+
+def test_reader_sees_writes_in_place(tmp_path):
+    # clean_data.py rewrites the file in place, in WAL mode, while the app may be reading it
+    path = make_db(tmp_path / 'clean_football.db')
+    writer = sqlite3.connect(path)
+    writer.execute("PRAGMA journal_mode = WAL")
+    pool = ReadPool(path)
+    assert total(pool) == 1
+    writer.execute("INSERT INTO appearances VALUES (2, 5)")
+    writer.commit()
+    assert total(pool) == 6
+    writer.close()
+
+def test_reopens_replaced_file(tmp_path):
+    path = make_db(tmp_path / 'clean_football.db', goals=1)
+    pool = ReadPool(path, immutable=True)
+    assert total(pool) == 1
+    os.replace(make_db(tmp_path / 'new.db', goals=7), path)
+    assert total(pool) == 7
+
+def test_pool_is_bounded(tmp_path):
+    pool = ReadPool(make_db(tmp_path / 'clean_football.db'), size=2)
+    seen = set()
+
+    def read():
+        with pool.connection() as conn:
+            seen.add(id(conn))
+            conn.execute("SELECT SUM(goals) FROM appearances").fetchone()
+    threads = [threading.Thread(target=read) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pool._opened <= 2 and len(seen) <= 2
@@ -0,0 +1,106 @@
+import os
+import json
+import sqlite3
+import hashlib
+from multiprocessing import Pool
+import pytest
+import requests
+from src.snapshot import make_snapshot, fetch_snapshot, fetch_gdrive, fetch_database, serve
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    # a few hundred KB, half of it incompressible: the snapshot spans several ranges
+    path = str(tmp_path / 'source.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER, name TEXT, data BLOB)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                     [(i, f"player {i}", os.urandom(64)) for i in range(4000)])
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def published(tmp_path, db_file):
+    publish_dir = str(tmp_path / 'publish')
+    manifest = make_snapshot(db_file, publish_dir, level=3)
+    server = serve(publish_dir)
+    yield publish_dir, manifest, server, f"http://127.0.0.1:{server.server_port}/manifest.json"
+    server.shutdown()
+
+def sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _fetch(args):
+    return fetch_snapshot(*args)
+
+
+def test_fetch_installs_snapshot(tmp_path, published):
+    _, manifest, _, manifest_url = published
+    target = str(tmp_path / 'clean_football.db')
+    assert fetch_snapshot(manifest_url, target, range_size=64 * 1024)
+    assert sha256(target) == manifest['db_sha256']
+    with open(f'{target}.sha256') as f:
+        assert f.read() == manifest['db_sha256']
+    assert not os.path.exists(f'{target}.tmp') and not os.path.exists(f'{target}.zst.part')
+    # already installed: no second download
+    assert not fetch_snapshot(manifest_url, target)
+
+def test_fetch_resumes_after_dropped_connection(tmp_path, published):
+    _, manifest, server, manifest_url = published
+    range_size = max(manifest['size'] // 8, 16 * 1024)
+    server.drop_after = range_size // 3
+    target = str(tmp_path / 'clean_football.db')
+    assert fetch_snapshot(manifest_url, target, range_size)
+    assert server.drop_after is None
+    assert sha256(target) == manifest['db_sha256']
+
+def test_concurrent_processes_download_once(tmp_path, published):
+    _, manifest, _, manifest_url = published
+    target = str(tmp_path / 'clean_football.db')
+    range_size = max(manifest['size'] // 8, 16 * 1024)
+    with Pool(4) as pool:
+        downloaded = pool.map(_fetch, [(manifest_url, target, range_size)] * 4)
+    assert sum(downloaded) == 1
+    assert sha256(target) == manifest['db_sha256']
+
+def test_decompressed_checksum_mismatch_cleans_up(tmp_path, published):
+    publish_dir, manifest, _, manifest_url = published
+    with open(os.path.join(publish_dir, 'manifest.json'), 'w') as f:
+        json.dump(dict(manifest, db_sha256='0' * 64), f)
+    target = str(tmp_path / 'clean_football.db')
+    with pytest.raises(ValueError, match="Decompressed"):
+        fetch_snapshot(manifest_url, target)
+    assert not os.path.exists(target) and not os.path.exists(f'{target}.tmp')
+
+def test_compressed_checksum_mismatch_starts_over(tmp_path, published):
+    publish_dir, manifest, _, manifest_url = published
+    with open(os.path.join(publish_dir, 'manifest.json'), 'w') as f:
+        json.dump(dict(manifest, sha256='0' * 64), f)
+    target = str(tmp_path / 'clean_football.db')
+    with pytest.raises(ValueError, match="Snapshot checksum"):
+        fetch_snapshot(manifest_url, target)
+    assert not os.path.exists(f'{target}.tmp') and not os.path.exists(f'{target}.zst.part')
+
+def test_fetch_database_keeps_existing_when_offline(tmp_path):
+    target = tmp_path / 'clean_football.db'
+    target.write_bytes(b'old')
+    # nothing listens on port 9 (discard)
+    assert fetch_database(str(target), "http://127.0.0.1:9/manifest.json") is False
+    assert target.read_bytes() == b'old'
+    with pytest.raises(requests.RequestException):
+        fetch_database(str(tmp_path / 'missing.db'), "http://127.0.0.1:9/manifest.json")
+
+def test_fetch_gdrive_failure_cleans_up(tmp_path, monkeypatch):
+    gdown = pytest.importorskip('gdown')
+
+    def failed_download(url, output, quiet=False):
+        with open(output, 'wb') as f:
+            f.write(b'partial')
+        return None
+    monkeypatch.setattr(gdown, 'download', failed_download)
+    target = str(tmp_path / 'clean_football.db')
+    with pytest.raises(RuntimeError):
+        fetch_gdrive(target)
+    assert not os.path.exists(target) and not os.path.exists(f'{target}.tmp')